@@ -0,0 +1,79 @@
+"""Бенчмарк представлений на засеянной базе.
+
+Запуск: pytest benchmarks/ [--bench-scales=tiny,small]
+[--bench-threshold=0.25] [--bench-baseline=benchmarks/baseline.json]
+[--bench-save-baseline]
+
+Для каждой точки масштаба база очищается и засевается командой seed,
+затем каждый адрес из posts/urls.py, users/urls.py и about/urls.py
+открывается тестовым клиентом. Результаты пишутся в
+benchmarks/results.json; если есть базовый файл, тест падает, когда
+время, число запросов или пик памяти выросли больше порога.
+"""
+import json
+import os
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS = {}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmarks')
+    group.addoption(
+        '--bench-scales', default='tiny',
+        help='Точки масштаба команды seed через запятую.',
+    )
+    group.addoption(
+        '--bench-threshold', type=float, default=0.25,
+        help='Допустимый рост относительно базового файла, доля.',
+    )
+    group.addoption(
+        '--bench-baseline', default=os.path.join(BENCH_DIR, 'baseline.json'),
+    )
+    group.addoption(
+        '--bench-save-baseline', action='store_true',
+        help='Сохранить результаты как новый базовый файл.',
+    )
+
+
+def pytest_generate_tests(metafunc):
+    if 'scale' in metafunc.fixturenames:
+        scales = metafunc.config.getoption('--bench-scales').split(',')
+        metafunc.parametrize('scale', scales, indirect=True, scope='session')
+
+
+@pytest.fixture(scope='session')
+def scale(request, django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        call_command('flush', interactive=False, verbosity=0)
+        call_command('seed', scale=request.param, stdout=StringIO())
+    return request.param
+
+
+@pytest.fixture(scope='session')
+def baseline(pytestconfig):
+    path = pytestconfig.getoption('--bench-baseline')
+    if not os.path.exists(path):
+        return {}
+    with open(path) as file:
+        return json.load(file)
+
+
+@pytest.fixture(scope='session')
+def results():
+    return RESULTS
+
+
+def pytest_sessionfinish(session):
+    if not RESULTS:
+        return
+    config = session.config
+    with open(os.path.join(BENCH_DIR, 'results.json'), 'w') as file:
+        json.dump(RESULTS, file, indent=2, sort_keys=True)
+    if config.getoption('--bench-save-baseline'):
+        with open(config.getoption('--bench-baseline'), 'w') as file:
+            json.dump(RESULTS, file, indent=2, sort_keys=True)
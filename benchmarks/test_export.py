@@ -0,0 +1,56 @@
+"""Память потоковой выгрузки: пик не должен расти с размером таблицы.
+
+Пик каждой точки масштаба сравнивается с пиком самой маленькой из уже
+пройденных точек (--bench-scales=tiny,small): таблица выросла, а пик - не
+больше чем на --bench-threshold. С одной точкой проверяется только
+предел PEAK_LIMIT_KB.
+"""
+import time
+import tracemalloc
+
+import pytest
+
+from posts import export
+
+# Пик памяти выгрузки растёт с размером куска чтения, а не таблицы:
+# кусок фиксирован, предел одинаков для всех точек масштаба
+CHUNK_SIZE = 500
+PEAK_LIMIT_KB = 4 * 1024
+# Шум пика, не зависящий от таблицы: у маленьких наборов он больше доли
+PEAK_NOISE_KB = 64
+
+# {набор: (строк, пик в КБ)} самой маленькой пройденной точки масштаба
+SMALLEST = {}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('dataset', sorted(export.DATASETS))
+def test_export_memory(scale, dataset, results, pytestconfig):
+    started = time.perf_counter()
+    tracemalloc.start()
+    size = lines = 0
+    for chunk in export.stream(dataset, 'jsonl', CHUNK_SIZE):
+        size += len(chunk)
+        lines += chunk.count('\n')
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    peak_kb = peak / 1024
+    results['export:%s:%s' % (scale, dataset)] = {
+        'rows': lines,
+        'seconds': time.perf_counter() - started,
+        'output_kb': size / 1024,
+        'peak_kb': peak_kb,
+    }
+    assert peak_kb < PEAK_LIMIT_KB
+    if dataset not in SMALLEST or lines < SMALLEST[dataset][0]:
+        SMALLEST[dataset] = (lines, peak_kb)
+        return
+    rows, smallest_kb = SMALLEST[dataset]
+    if lines == rows:
+        return
+    threshold = pytestconfig.getoption('--bench-threshold')
+    assert peak_kb <= smallest_kb * (1 + threshold) + PEAK_NOISE_KB, (
+        '%s: %d строк - %.0f КБ, %d строк - %.0f КБ' % (
+            dataset, rows, smallest_kb, lines, peak_kb
+        )
+    )
@@ -0,0 +1,56 @@
+"""Скорость import_posts против вставки постов по одному."""
+import json
+import os
+import time
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from posts.models import Post, User
+
+RECORDS = 2000
+
+
+def make_records(usernames):
+    return [
+        {'text': 'Пост со старой платформы %d' % number,
+         'author': usernames[number % len(usernames)]}
+        for number in range(RECORDS)
+    ]
+
+
+def one_by_one(records):
+    authors = dict(User.objects.values_list('username', 'id'))
+    for record in records:
+        Post.objects.create(
+            text=record['text'], author_id=authors[record['author']]
+        )
+
+
+@pytest.mark.django_db
+def test_import_throughput(scale, results, tmp_path):
+    usernames = list(User.objects.values_list('username', flat=True)[:100])
+    records = make_records(usernames)
+    path = os.path.join(str(tmp_path), 'posts.jsonl')
+    with open(path, 'w', encoding='utf-8') as file:
+        for record in records:
+            file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    started = time.perf_counter()
+    one_by_one(records)
+    single = time.perf_counter() - started
+    started = time.perf_counter()
+    call_command('import_posts', path, workers=1, stdout=StringIO())
+    bulk = time.perf_counter() - started
+
+    results['import:%s' % scale] = {
+        'rows': RECORDS,
+        'single_rows_per_s': RECORDS / single,
+        'bulk_rows_per_s': RECORDS / bulk,
+    }
+    assert Post.objects.filter(
+        text__startswith='Пост со старой платформы'
+    ).count() == 2 * RECORDS
+    # Пачки bulk_create быстрее строки на запрос в разы
+    assert bulk * 3 < single, (bulk, single)
@@ -0,0 +1,72 @@
+"""Запросы к базе на страницах авторизованного пользователя: сессия
+и пользователь из базы против cached_db и CachedModelBackend на общем
+кэше sessions."""
+import pytest
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from benchmarks.test_views import QueryCounter
+from posts.models import Post, User
+
+PROFILES = {
+    'db': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+        'AUTHENTICATION_BACKENDS': [
+            'django.contrib.auth.backends.ModelBackend'
+        ],
+    },
+    'cached': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+        'SESSION_CACHE_ALIAS': 'sessions',
+        'AUTHENTICATION_BACKENDS': ['core.auth.CachedModelBackend'],
+    },
+}
+
+
+def pages():
+    post = Post.objects.order_by('id').first()
+    return {
+        'follow_index': reverse('posts:follow_index'),
+        'post_create': reverse('posts:post_create'),
+        'profile': reverse(
+            'posts:profile', kwargs={'username': post.author.username}
+        ),
+        'post_detail': reverse(
+            'posts:post_detail', kwargs={'post_id': post.id}
+        ),
+    }
+
+
+def count_queries(profile):
+    user = User.objects.annotate(
+        number=Count('follower')).order_by('-number').first()
+    counts = {}
+    with override_settings(**PROFILES[profile]):
+        caches['sessions'].clear()
+        client = Client()
+        client.force_login(user)
+        for name, url in pages().items():
+            # Первый запрос прогревает кэш, считается второй
+            client.get(url)
+            queries = QueryCounter()
+            with connection.execute_wrapper(queries):
+                client.get(url)
+            counts[name] = queries.count
+    return counts
+
+
+@pytest.mark.django_db
+def test_cached_auth_saves_queries(scale, results):
+    counts = {profile: count_queries(profile) for profile in PROFILES}
+    for name in counts['db']:
+        saved = counts['db'][name] - counts['cached'][name]
+        results['auth:%s:%s' % (scale, name)] = {
+            'queries_db': counts['db'][name],
+            'queries_cached': counts['cached'][name],
+            'saved': saved,
+        }
+        # Сессия и пользователь - два запроса на каждой странице
+        assert saved >= 2, name
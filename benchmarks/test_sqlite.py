@@ -0,0 +1,133 @@
+"""Смешанная нагрузка чтение/запись на файловой базе SQLite.
+
+Сравнивает SQLite по умолчанию (журнал отката, без повторов) с
+настройками проекта: SQLITE_PRAGMAS, busy timeout и call_with_retry.
+Запись повторяет шаблон get_or_create в представлениях: транзакция
+начинается с чтения и продолжается вставкой.
+"""
+import random
+import threading
+import time
+
+import pytest
+from django.conf import settings
+from django.db import OperationalError, connections, transaction
+from django.test import override_settings
+
+from core.sqlite import call_with_retry
+
+THREADS = 8
+DURATION = 2
+WRITE_SHARE = 0.2
+ROWS = 5000
+
+PROFILES = {
+    'default': {'pragmas': {}, 'options': {}, 'retry': False},
+    'tuned': {
+        'pragmas': settings.SQLITE_PRODUCTION_PRAGMAS,
+        'options': settings.DATABASES['default'].get('OPTIONS', {}),
+        'retry': True,
+    },
+}
+
+
+def create_schema(alias):
+    with connections[alias].cursor() as cursor:
+        cursor.execute(
+            'CREATE TABLE bench_post ('
+            'id INTEGER PRIMARY KEY, author INTEGER, text TEXT)'
+        )
+        cursor.execute('CREATE INDEX bench_author ON bench_post (author)')
+        cursor.executemany(
+            'INSERT INTO bench_post (author, text) VALUES (%s, %s)',
+            [(number % 100, 'текст %d' % number) for number in range(ROWS)],
+        )
+
+
+def read(alias, rng):
+    with connections[alias].cursor() as cursor:
+        cursor.execute(
+            'SELECT id, text FROM bench_post WHERE author = %s '
+            'ORDER BY id DESC LIMIT 10', [rng.randrange(100)],
+        )
+        cursor.fetchall()
+
+
+def write(alias, rng):
+    author = rng.randrange(100)
+    with connections[alias].cursor() as cursor:
+        cursor.execute(
+            'SELECT COUNT(*) FROM bench_post WHERE author = %s', [author]
+        )
+        cursor.fetchone()
+        cursor.execute(
+            'INSERT INTO bench_post (author, text) VALUES (%s, %s)',
+            [author, 'новый'],
+        )
+
+
+def worker(alias, number, retry, counts, lock):
+    rng = random.Random(number)
+    done = {'reads': 0, 'writes': 0, 'errors': 0}
+    deadline = time.perf_counter() + DURATION
+    try:
+        while time.perf_counter() < deadline:
+            try:
+                if rng.random() >= WRITE_SHARE:
+                    read(alias, rng)
+                    done['reads'] += 1
+                    continue
+                if retry:
+                    call_with_retry(lambda: write(alias, rng), using=alias)
+                else:
+                    with transaction.atomic(using=alias):
+                        write(alias, rng)
+                done['writes'] += 1
+            except OperationalError:
+                done['errors'] += 1
+    finally:
+        connections[alias].close()
+    with lock:
+        for key, value in done.items():
+            counts[key] += value
+
+
+@pytest.mark.parametrize('profile', PROFILES)
+def test_sqlite_mixed_load(profile, tmp_path, django_db_blocker, results):
+    config = PROFILES[profile]
+    alias = 'bench_%s' % profile
+    connections.databases[alias] = dict(
+        settings.DATABASES['default'],
+        NAME=str(tmp_path / 'bench.sqlite3'),
+        OPTIONS=config['options'],
+    )
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+    try:
+        with override_settings(SQLITE_PRAGMAS=config['pragmas']), \
+                django_db_blocker.unblock():
+            create_schema(alias)
+            connections[alias].close()
+            del connections[alias]
+            threads = [
+                threading.Thread(
+                    target=worker,
+                    args=(alias, number, config['retry'], counts, lock),
+                )
+                for number in range(THREADS)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+    finally:
+        del connections.databases[alias]
+    results['sqlite:%s' % profile] = {
+        'reads_per_s': round(counts['reads'] / DURATION, 1),
+        'writes_per_s': round(counts['writes'] / DURATION, 1),
+        'errors': counts['errors'],
+    }
+    if profile == 'tuned':
+        # Единичные отказы после всех повторов возможны при THREADS
+        # писателях без пауз, но не больше процента записей
+        assert counts['errors'] <= counts['writes'] / 100
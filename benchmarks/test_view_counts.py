@@ -0,0 +1,62 @@
+"""Задержка маячка просмотра: без счётчика, с записью на каждый просмотр
+и с буфером view_counts."""
+import statistics
+import time
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from posts import trending, view_counts
+from posts.models import Post
+
+REQUESTS = 300
+
+PROFILES = {
+    'off': lambda post_id: None,
+    'direct': lambda post_id: trending.bump(post_id, 'views'),
+    'buffered': view_counts.record,
+}
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def measure(profile, urls):
+    client = Client()
+    timings = []
+    with mock.patch('posts.view_counts.record', PROFILES[profile]):
+        for number in range(REQUESTS):
+            url = urls[number % len(urls)]
+            started = time.perf_counter()
+            client.get(url)
+            timings.append(time.perf_counter() - started)
+    view_counts.flush()
+    return timings
+
+
+@pytest.mark.django_db
+@override_settings(VIEW_FLUSH_INTERVAL=1)
+def test_buffered_views_keep_latency(scale, results):
+    cache.clear()
+    view_counts.buffer.take()
+    urls = [
+        reverse('posts:post_view', kwargs={'post_id': post_id})
+        for post_id in Post.objects.values_list('id', flat=True)[:20]
+    ]
+    # Прогрев соединения
+    measure('off', urls)
+    timings = {profile: measure(profile, urls) for profile in PROFILES}
+    for profile, values in timings.items():
+        results['views:%s:%s' % (scale, profile)] = {
+            'p50_ms': statistics.median(values) * 1000,
+            'p95_ms': percentile(values, 0.95) * 1000,
+        }
+    off = statistics.median(timings['off'])
+    buffered = statistics.median(timings['buffered'])
+    # Буфер добавляет к ответу только блокировку и сложение
+    assert buffered <= off * 1.15, (buffered, off)
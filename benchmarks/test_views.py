@@ -0,0 +1,116 @@
+import statistics
+import time
+import tracemalloc
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.urls import get_resolver, reverse
+
+from posts.models import Comment, Post, User
+
+NAMESPACES = ('posts', 'users', 'about')
+REPEATS = 5
+
+
+def url_names():
+    resolver = get_resolver()
+    names = []
+    for namespace in NAMESPACES:
+        _, sub_resolver = resolver.namespace_dict[namespace]
+        names.extend(
+            '%s:%s' % (namespace, pattern.name)
+            for pattern in sub_resolver.url_patterns
+        )
+    return names
+
+
+def build_url(name):
+    post = Post.objects.filter(group__isnull=False).order_by('id').first()
+    author = User.objects.annotate(
+        number=Count('posts')).order_by('-number').first()
+    comment = Comment.objects.order_by('id').first()
+    values = {
+        'post_id': post.id,
+        'slug': post.group.slug,
+        'username': author.username,
+        # Отметки «нравится»: posts/<id>/like/ и comments/<id>/like/;
+        # на GET они отвечают 405 и ничего не меняют
+        'object_id': (
+            comment.id if name.split(':')[1].startswith('comment_')
+            else post.id
+        ),
+    }
+    _, sub_resolver = get_resolver().namespace_dict[name.split(':')[0]]
+    pattern = [
+        pattern for pattern in sub_resolver.url_patterns
+        if pattern.name == name.split(':')[1]
+    ][0]
+    kwargs = {key: values[key] for key in pattern.pattern.converters}
+    return reverse(name, kwargs=kwargs)
+
+
+class QueryCounter:
+    """Считает запросы через execute_wrapper: CaptureQueriesContext
+    ошибается, когда queries_log уже заполнен при засеве базы."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def get(client, url):
+    cache.clear()
+    response = client.get(url)
+    if response.streaming:
+        return response.status_code, len(b''.join(response.streaming_content))
+    return response.status_code, len(response.content)
+
+
+def measure(client, url):
+    times = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        get(client, url)
+        times.append(time.perf_counter() - started)
+    queries = QueryCounter()
+    with connection.execute_wrapper(queries):
+        status, size = get(client, url)
+    tracemalloc.start()
+    get(client, url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'status': status,
+        'wall_ms': round(statistics.median(times) * 1000, 3),
+        'queries': queries.count,
+        'bytes': size,
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', url_names())
+def test_view(scale, name, baseline, results, pytestconfig):
+    follower = User.objects.annotate(
+        number=Count('follower')).order_by('-number').first()
+    client = Client()
+    client.force_login(follower)
+    result = measure(client, build_url(name))
+    key = '%s:%s' % (scale, name)
+    results[key] = result
+    previous = baseline.get(key)
+    if previous is None:
+        return
+    threshold = pytestconfig.getoption('--bench-threshold')
+    regressions = [
+        '%s: %s -> %s' % (metric, previous[metric], result[metric])
+        for metric in ('wall_ms', 'queries', 'peak_kb')
+        if result[metric] > previous[metric] * (1 + threshold)
+    ]
+    assert not regressions, 'Регрессия %s: %s' % (key, '; '.join(regressions))
@@ -0,0 +1,11 @@
+"""Общие настройки pytest для tests/ и benchmarks/."""
+import pytest
+
+from core.test_runner import isolated_files
+
+
+@pytest.fixture(scope='session', autouse=True)
+def project_files(tmp_path_factory):
+    """Метрики и файловый кэш тестов пишутся во временный каталог."""
+    with isolated_files(str(tmp_path_factory.mktemp('files'))):
+        yield
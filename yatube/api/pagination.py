@@ -0,0 +1,64 @@
+"""Курсорная пагинация по убыванию (поле сортировки, id).
+
+Курсор - последняя строка страницы, поэтому следующая страница выбирается
+индексом, без OFFSET, и не съезжает при появлении новых записей.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(value, pk):
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    raw = json.dumps([value, pk]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    return value, pk
+
+
+def get_limit(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        limit = DEFAULT_LIMIT
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def cursor_page(queryset, order_field, request):
+    """Возвращает строки страницы и курсор следующей (или None).
+
+    queryset должен быть values()-запросом с полями order_field и id.
+    """
+    limit = get_limit(request)
+    queryset = queryset.order_by('-' + order_field, '-id')
+    cursor = request.GET.get('cursor')
+    if cursor:
+        value, pk = decode_cursor(cursor)
+        try:
+            queryset = queryset.filter(
+                Q(**{order_field + '__lt': value})
+                | Q(**{order_field: value, 'id__lt': pk})
+            )
+        except (ValidationError, ValueError, TypeError):
+            raise InvalidCursor(cursor)
+    rows = list(queryset[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1][order_field], rows[-1]['id'])
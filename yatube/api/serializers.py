@@ -0,0 +1,121 @@
+"""Сериализация строк values() в JSON-совместимые словари.
+
+Связанные авторы, группы и миниатюры загружаются одним запросом
+на всю страницу, а не по одному на каждую запись.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from sorl.thumbnail import get_thumbnail
+
+from core import timing
+from posts.models import Group, User
+
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_TIMEOUT = 60 * 60 * 24
+
+# Поле API -> колонки, которые для него нужно выбрать из базы.
+POST_FIELDS = {
+    'id': ('id',),
+    'text': ('text',),
+    'pub_date': ('pub_date',),
+    'author': ('author_id',),
+    'group': ('group_id',),
+    'image': ('image',),
+    'thumbnail': ('image',),
+}
+COMMENT_FIELDS = {
+    'id': ('id',),
+    'text': ('text',),
+    'created': ('created',),
+    'author': ('author_id',),
+    'post': ('post_id',),
+}
+GROUP_FIELDS = {
+    'id': ('id',),
+    'title': ('title',),
+    'slug': ('slug',),
+    'description': ('description',),
+}
+FOLLOW_FIELDS = {
+    'id': ('id',),
+    'author': ('author_id',),
+}
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def parse_fields(request, allowed):
+    """Поля из ?fields=a,b; по умолчанию - все."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(allowed)
+    fields = [field for field in raw.split(',') if field]
+    unknown = set(fields) - set(allowed)
+    if unknown:
+        raise InvalidFields(', '.join(sorted(unknown)))
+    return fields
+
+
+def get_columns(fields, allowed, order_field):
+    columns = {'id', order_field}
+    for field in fields:
+        columns.update(allowed[field])
+    return sorted(columns)
+
+
+def thumbnail_urls(names):
+    """Адреса миниатюр для всех картинок страницы одним обращением к кэшу."""
+    keys = {
+        'api_thumb:%s' % hashlib.md5(
+            (THUMBNAIL_GEOMETRY + name).encode('utf-8')).hexdigest(): name
+        for name in set(names)
+    }
+    urls = cache.get_many(list(keys))
+    timing.count('cache_hit', len(urls))
+    timing.count('cache_miss', len(keys) - len(urls))
+    missing = {}
+    for key, name in keys.items():
+        if key not in urls:
+            missing[key] = get_thumbnail(
+                name, THUMBNAIL_GEOMETRY, crop='center', upscale=True
+            ).url
+    if missing:
+        cache.set_many(missing, THUMBNAIL_TIMEOUT)
+        urls.update(missing)
+    return {keys[key]: url for key, url in urls.items()}
+
+
+def image_url(row):
+    return default_storage.url(row['image']) if row['image'] else None
+
+
+def serialize(rows, fields):
+    """Строки страницы в словари с полями fields."""
+    getters = {
+        'post': lambda row: row['post_id'],
+        'image': image_url,
+    }
+    if 'author' in fields:
+        authors = dict(User.objects.filter(
+            id__in={row['author_id'] for row in rows}
+        ).values_list('id', 'username'))
+        getters['author'] = lambda row: authors.get(row['author_id'])
+    if 'group' in fields:
+        groups = dict(Group.objects.filter(
+            id__in={row['group_id'] for row in rows if row['group_id']}
+        ).values_list('id', 'slug'))
+        getters['group'] = lambda row: groups.get(row['group_id'])
+    if 'thumbnail' in fields:
+        thumbnails = thumbnail_urls(
+            row['image'] for row in rows if row['image']
+        )
+        getters['thumbnail'] = lambda row: thumbnails.get(row['image'])
+    for row in rows:
+        yield {
+            field: getters[field](row) if field in getters else row[field]
+            for field in fields
+        }
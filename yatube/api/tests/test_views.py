@@ -0,0 +1,119 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def read_json(response):
+    return json.loads(b''.join(response.streaming_content))
+
+
+class ApiViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовое название группы',
+            description='Тестовое описание',
+            slug='slug_test'
+        )
+        cls.user = User.objects.create(username='HasNoName')
+        cls.author = User.objects.create(username='author')
+        Post.objects.bulk_create([
+            Post(
+                text='Тестовый текст поста' + str(i),
+                author=cls.author if i % 2 else cls.user,
+                group=cls.group,
+            )
+            for i in range(15)
+        ])
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_cursor_pagination(self):
+        """Курсор ведёт на следующую страницу без повторов."""
+        url = reverse('api:posts')
+        first = read_json(self.guest_client.get(url))
+        self.assertEqual(len(first['results']), 10)
+        second = read_json(
+            self.guest_client.get(url, {'cursor': first['next']})
+        )
+        self.assertEqual(len(second['results']), 5)
+        self.assertIsNone(second['next'])
+        ids = [post['id'] for post in first['results'] + second['results']]
+        self.assertEqual(len(set(ids)), 15)
+
+    def test_sparse_fields(self):
+        """?fields= ограничивает поля ответа."""
+        response = self.guest_client.get(
+            reverse('api:posts'), {'fields': 'id,author'}
+        )
+        post = read_json(response)['results'][0]
+        self.assertEqual(set(post), {'id', 'author'})
+        response = self.guest_client.get(
+            reverse('api:posts'), {'fields': 'id,password'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_related_loaded_in_bulk(self):
+        """Авторы и группы загружаются одним запросом на страницу."""
+        with self.assertNumQueries(3):
+            results = read_json(
+                self.guest_client.get(reverse('api:posts'))
+            )['results']
+        self.assertEqual(results[0]['group'], self.group.slug)
+
+    def test_hidden_group_posts_hidden(self):
+        """Посты скрытой группы не отдаются по её адресу."""
+        url = reverse('api:posts')
+        response = self.guest_client.get(url, {'group': self.group.slug})
+        self.assertEqual(len(read_json(response)['results']), 10)
+        Group.all_objects.filter(id=self.group.id).update(hidden=True)
+        response = self.guest_client.get(url, {'group': self.group.slug})
+        self.assertEqual(response.status_code, 404)
+
+    def test_etag_not_modified(self):
+        """Повторный запрос с If-None-Match получает 304."""
+        url = reverse('api:groups')
+        etag = self.guest_client.get(url)['ETag']
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_follow_requires_login(self):
+        """Подписки доступны только авторизованному пользователю."""
+        response = self.guest_client.get(reverse('api:follow_posts'))
+        self.assertEqual(response.status_code, 401)
+        results = read_json(
+            self.authorized_client.get(reverse('api:follow_posts'))
+        )['results']
+        self.assertEqual(
+            {post['author'] for post in results}, {self.author.username}
+        )
+
+    def test_deactivated_users_hidden(self):
+        """Комментарии и подписки удаляемых пользователей не отдаются."""
+        gone = User.objects.create(username='gone')
+        post = Post.objects.filter(author=self.author).first()
+        Comment.objects.create(text='Виден', post=post, author=self.user)
+        Comment.objects.create(text='Скрыт', post=post, author=gone)
+        Follow.objects.create(user=self.user, author=gone)
+        User.objects.filter(id=gone.id).update(is_active=False)
+        comments = read_json(self.guest_client.get(
+            reverse('api:post_comments', kwargs={'post_id': post.id})
+        ))['results']
+        self.assertEqual([comment['text'] for comment in comments], ['Виден'])
+        follows = read_json(
+            self.authorized_client.get(reverse('api:follow'))
+        )['results']
+        self.assertEqual(
+            [follow['author'] for follow in follows], [self.author.username]
+        )
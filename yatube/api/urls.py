@@ -0,0 +1,20 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    # Лента постов, фильтры ?group=<slug> и ?author=<username>
+    path('posts/', views.posts, name='posts'),
+    # Посты авторов, на которых подписан пользователь
+    path('posts/follow/', views.follow_posts, name='follow_posts'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
+    path('groups/', views.groups, name='groups'),
+    # Подписки пользователя
+    path('follow/', views.follow, name='follow'),
+]
@@ -0,0 +1,119 @@
+import hashlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import (
+    HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+)
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_safe
+
+from posts.models import Comment, Follow, Group, Post
+
+from .pagination import InvalidCursor, cursor_page
+from .serializers import (
+    COMMENT_FIELDS, FOLLOW_FIELDS, GROUP_FIELDS, POST_FIELDS, InvalidFields,
+    get_columns, parse_fields, serialize
+)
+
+# Размер куска потокового ответа, символов
+CHUNK_SIZE = 16 * 1024
+
+
+def error(detail, status):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def stream_json(items, next_cursor):
+    """Кодирует ответ кусками, не собирая весь JSON в памяти."""
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    chunk = ['{"results": [']
+    size = 0
+    for number, item in enumerate(items):
+        encoded = encoder.encode(item)
+        if number:
+            encoded = ', ' + encoded
+        chunk.append(encoded)
+        size += len(encoded)
+        if size >= CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+            size = 0
+    chunk.append('], "next": %s}' % encoder.encode(next_cursor))
+    yield ''.join(chunk)
+
+
+def page_response(request, queryset, order_field, allowed):
+    """Страница queryset с курсором, ?fields= и ETag."""
+    try:
+        fields = parse_fields(request, allowed)
+        columns = get_columns(fields, allowed, order_field)
+        rows, next_cursor = cursor_page(
+            queryset.values(*columns), order_field, request
+        )
+    except InvalidFields as e:
+        return error('Неизвестные поля: %s' % e, 400)
+    except InvalidCursor:
+        return error('Неверный курсор', 400)
+    # ETag считается по выбранным строкам, поэтому ответ 304 отдаётся
+    # до загрузки связанных объектов, миниатюр и кодирования JSON.
+    etag = '"%s"' % hashlib.md5(
+        repr((request.get_full_path(), rows)).encode('utf-8')
+    ).hexdigest()
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = StreamingHttpResponse(
+            stream_json(serialize(rows, fields), next_cursor),
+            content_type='application/json',
+        )
+    response['ETag'] = etag
+    return response
+
+
+@require_safe
+def posts(request):
+    queryset = Post.objects.all()
+    if request.GET.get('group'):
+        # Группа ищется через Group.objects: посты скрытой группы
+        # не отдаются, как и её страница
+        group = Group.objects.filter(slug=request.GET['group']).first()
+        if group is None:
+            return error('Группа не найдена', 404)
+        queryset = queryset.filter(group=group)
+    if request.GET.get('author'):
+        queryset = queryset.filter(author__username=request.GET['author'])
+    return page_response(request, queryset, 'pub_date', POST_FIELDS)
+
+
+@require_safe
+def follow_posts(request):
+    if not request.user.is_authenticated:
+        return error('Требуется авторизация', 401)
+    queryset = Post.objects.filter(author__following__user=request.user)
+    return page_response(request, queryset, 'pub_date', POST_FIELDS)
+
+
+@require_safe
+def post_comments(request, post_id):
+    if not Post.objects.filter(id=post_id).exists():
+        return error('Пост не найден', 404)
+    # Комментарии удаляемых пользователей скрыты до их удаления
+    queryset = Comment.objects.filter(
+        post_id=post_id, author__is_active=True
+    )
+    return page_response(request, queryset, 'created', COMMENT_FIELDS)
+
+
+@require_safe
+def groups(request):
+    return page_response(request, Group.objects.all(), 'id', GROUP_FIELDS)
+
+
+@require_safe
+def follow(request):
+    if not request.user.is_authenticated:
+        return error('Требуется авторизация', 401)
+    queryset = Follow.objects.filter(
+        user=request.user, author__is_active=True
+    )
+    return page_response(request, queryset, 'id', FOLLOW_FIELDS)
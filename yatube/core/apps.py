@@ -3,3 +3,15 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_save
+
+        from . import auth, sqlite, timing
+        timing.instrument_templates()
+        connection_created.connect(sqlite.apply_pragmas)
+        user_model = get_user_model()
+        post_save.connect(auth.forget_user, sender=user_model)
+        post_delete.connect(auth.forget_user, sender=user_model)
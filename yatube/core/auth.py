@@ -0,0 +1,37 @@
+"""Бэкенд аутентификации с кэшем пользователя.
+
+AuthenticationMiddleware на каждом запросе авторизованного посетителя
+загружает пользователя по id из сессии. CachedModelBackend берёт его из
+общего кэша sessions; запись сбрасывается при любом сохранении или
+удалении пользователя, в том числе при смене пароля, блокировке и входе
+(обновляется last_login). Кэш общий для процессов, поэтому изменение в
+одном процессе видно всем.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+
+def user_key(user_id):
+    return 'auth_user:%s' % user_id
+
+
+def user_cache():
+    return caches[settings.SESSION_CACHE_ALIAS]
+
+
+def forget_user(sender, instance, **kwargs):
+    """Обработчик post_save и post_delete модели пользователя."""
+    user_cache().delete(user_key(instance.pk))
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        key = user_key(user_id)
+        user = user_cache().get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            user_cache().set(key, user, settings.USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,63 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from . import fragments, replicas, timing
+
+
+def page_key(path, key_prefix):
+    digest = hashlib.md5(path.encode('utf-8')).hexdigest()
+    return 'shared_page:%s:%s' % (key_prefix, digest)
+
+
+def expire_page(path, key_prefix):
+    """Удаляет из кэша общий рендер страницы."""
+    cache.delete(page_key(path, key_prefix))
+
+
+def shared_cache_page(key_prefix):
+    """Кэширует страницу одну на всех посетителей.
+
+    В отличие от cache_page, в кэш попадает рендер с метками вместо
+    персональных фрагментов, поэтому кэш работает и для авторизованных.
+    Время жизни берётся из settings.PAGE_CACHE_TIMEOUTS[key_prefix].
+
+    Посетитель, закреплённый за основной базой после записи, не читает
+    кэш: там может лежать рендер с отстающей реплики без его записи.
+    Его свежий рендер кэшируется как обычно.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            timeout = settings.PAGE_CACHE_TIMEOUTS.get(key_prefix, 0)
+            if not timeout or request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+            key = page_key(request.get_full_path(), key_prefix)
+            cached = None
+            if not replicas.is_pinned(request):
+                cached = cache.get(key)
+            if cached is not None:
+                timing.count('cache_hit')
+                content, headers = cached
+                response = HttpResponse(fragments.splice(request, content))
+                for header, value in headers:
+                    response[header] = value
+                return response
+            timing.count('cache_miss')
+            request.defer_fragments = True
+            try:
+                response = view_func(request, *args, **kwargs)
+            finally:
+                request.defer_fragments = False
+            if response.streaming:
+                return response
+            content = response.content.decode(response.charset)
+            if response.status_code == 200 and not response.cookies:
+                cache.set(key, (content, list(response.items())), timeout)
+            response.content = fragments.splice(request, content)
+            return response
+        return wrapper
+    return decorator
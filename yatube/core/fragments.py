@@ -0,0 +1,62 @@
+"""Персональные фрагменты страниц (в стиле ESI).
+
+Общий рендер страницы хранится в кэше один на всех посетителей, а вместо
+кусков, зависящих от пользователя (шапка, кнопка подписки, форма
+комментария), в нём стоят метки. При ответе метки заменяются фрагментами,
+отрисованными для текущего пользователя.
+"""
+import re
+from urllib.parse import parse_qsl, urlencode
+
+from django.template.loader import render_to_string
+
+PLACEHOLDER_RE = re.compile(
+    r'<!--fragment:(?P<name>[\w-]+)(?:\?(?P<params>[^>]*?))?-->'
+)
+
+_registry = {}
+
+
+def register(name, template_name):
+    """Регистрирует фрагмент.
+
+    Декорируемая функция получает request и параметры метки
+    и возвращает контекст шаблона фрагмента.
+    """
+    def decorator(get_context):
+        _registry[name] = (template_name, get_context)
+        return get_context
+    return decorator
+
+
+def placeholder(name, **params):
+    query = urlencode(sorted(params.items()))
+    if query:
+        return '<!--fragment:%s?%s-->' % (name, query)
+    return '<!--fragment:%s-->' % name
+
+
+def render(request, name, **params):
+    template_name, get_context = _registry[name]
+    return render_to_string(
+        template_name, get_context(request, **params), request=request
+    )
+
+
+def splice(request, content):
+    """Подставляет в общий рендер фрагменты текущего пользователя."""
+    rendered = {}
+
+    def replace(match):
+        key = match.group(0)
+        if key not in rendered:
+            params = dict(parse_qsl(match.group('params') or ''))
+            rendered[key] = render(request, match.group('name'), **params)
+        return rendered[key]
+
+    return PLACEHOLDER_RE.sub(replace, content)
+
+
+@register('header', 'includes/header.html')
+def header(request):
+    return {}
@@ -0,0 +1,193 @@
+"""Очередь фоновых задач в базе проекта.
+
+Задача - функция с декоратором task в модуле tasks.py любого
+приложения. Постановка в очередь - строка Job в той же транзакции, что
+и остальные записи запроса: откатился запрос - задачи нет. Выполняет
+задачи команда manage.py worker.
+
+Воркер забирает готовые задачи (run_at наступил) и помечает их своими
+на visibility timeout задачи. Не успел за это время (упал, завис) -
+задачу возьмёт другой воркер. Поэтому задача выполняется хотя бы раз,
+но может и дважды, и должна быть идемпотентной. Ошибка - повтор через
+паузу, растущую вдвое с каждой попыткой, после max_attempts попыток
+задача остаётся со статусом failed и текстом ошибки. Так же кончается
+задача, которая max_attempts раз не уложилась в visibility timeout.
+"""
+import json
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+from .sqlite import call_with_retry
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+class Task:
+    def __init__(self, func, name, max_attempts, timeout):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Ставит задачу в очередь с аргументами args и kwargs."""
+        return enqueue(self, args, kwargs)
+
+
+def task(func=None, name=None, max_attempts=None, timeout=None):
+    """Регистрирует функцию как задачу.
+
+    @task или @task(max_attempts=3, timeout=60); timeout - visibility
+    timeout в секундах. Функция вызывается и напрямую, как раньше.
+    """
+    def decorator(func):
+        job_task = Task(
+            func,
+            name or '%s.%s' % (func.__module__, func.__qualname__),
+            max_attempts or settings.JOB_MAX_ATTEMPTS,
+            timeout or settings.JOB_VISIBILITY_TIMEOUT,
+        )
+        _registry[job_task.name] = job_task
+        return job_task
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def get_task(name):
+    if name not in _registry:
+        autodiscover_modules('tasks')
+    return _registry[name]
+
+
+def enqueue(job_task, args=(), kwargs=None, key=None, run_at=None,
+            countdown=None):
+    """Ставит задачу в очередь и возвращает Job.
+
+    run_at или countdown (секунды) откладывают запуск. С key повторная
+    постановка возвращает уже существующую задачу.
+    """
+    if run_at is None:
+        run_at = timezone.now() + timedelta(seconds=countdown or 0)
+    fields = {
+        'name': job_task.name,
+        'payload': json.dumps(
+            {'args': list(args), 'kwargs': kwargs or {}},
+            cls=DjangoJSONEncoder,
+        ),
+        'run_at': run_at,
+        'max_attempts': job_task.max_attempts,
+    }
+    if key is None:
+        return Job.objects.create(**fields)
+    try:
+        with transaction.atomic():
+            return Job.objects.create(key=key, **fields)
+    except IntegrityError:
+        return Job.objects.get(key=key)
+
+
+EXPIRED_ERROR = 'Не выполнена за visibility timeout'
+
+
+def claim(worker, limit):
+    """Забирает до limit готовых задач для воркера worker."""
+    now = timezone.now()
+    expired = Q(status=Job.RUNNING, locked_until__lt=now)
+    exhausted = Q(attempts__gte=F('max_attempts'))
+    ready = Q(status=Job.QUEUED, run_at__lte=now) | (expired & ~exhausted)
+
+    def take():
+        # Попытки кончились, а воркер так и не отчитался - больше не брать
+        Job.objects.filter(expired & exhausted).update(
+            status=Job.FAILED,
+            locked_by='',
+            locked_until=None,
+            last_error=EXPIRED_ERROR,
+            finished=now,
+        )
+        claimed = []
+        # SQLite пропускает FOR UPDATE: там писатель и так один
+        candidates = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(ready).order_by('run_at')
+            .values_list('id', 'name')[:limit]
+        )
+        for job_id, name in candidates:
+            # Условие повторяется: задачу мог перехватить другой воркер
+            if Job.objects.filter(ready, id=job_id).update(
+                status=Job.RUNNING,
+                locked_by=worker,
+                locked_until=now + timedelta(seconds=timeout_of(name)),
+                attempts=F('attempts') + 1,
+            ):
+                claimed.append(job_id)
+        return claimed
+
+    return call_with_retry(take)
+
+
+def timeout_of(name):
+    try:
+        return get_task(name).timeout
+    except KeyError:
+        return settings.JOB_VISIBILITY_TIMEOUT
+
+
+def retry_delay(attempts):
+    delay = settings.JOB_RETRY_DELAY * 2 ** (attempts - 1)
+    return delay * random.uniform(0.5, 1)
+
+
+def run(job_id, worker):
+    """Выполняет взятую задачу; True, если она завершилась успешно."""
+    job = Job.objects.get(id=job_id)
+    outcome = {'locked_by': '', 'locked_until': None}
+    try:
+        payload = json.loads(job.payload)
+        get_task(job.name)(*payload['args'], **payload['kwargs'])
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Задача %s не выполнена:\n%s', job, error)
+        outcome['last_error'] = error
+        if job.attempts < job.max_attempts:
+            outcome['status'] = Job.QUEUED
+            outcome['run_at'] = timezone.now() + timedelta(
+                seconds=retry_delay(job.attempts)
+            )
+        else:
+            outcome['status'] = Job.FAILED
+            outcome['finished'] = timezone.now()
+    else:
+        outcome['status'] = Job.DONE
+        outcome['finished'] = timezone.now()
+    # Если задачу уже отдали другому воркеру, её исход запишет он
+    call_with_retry(
+        lambda: Job.objects.filter(id=job_id, locked_by=worker)
+        .update(**outcome)
+    )
+    return outcome['status'] == Job.DONE
+
+
+def prune():
+    """Удаляет выполненные задачи старше JOB_KEEP_SECONDS."""
+    border = timezone.now() - timedelta(seconds=settings.JOB_KEEP_SECONDS)
+    deleted, _ = Job.objects.filter(
+        status=Job.DONE, finished__lt=border
+    ).delete()
+    return deleted
@@ -0,0 +1,151 @@
+"""Исходящая почта через очередь.
+
+EMAIL_BACKEND проекта - OutboxBackend: send_mail(), сброс пароля и
+остальные отправители не ждут почтовый сервер, а кладут письма в
+OutgoingEmail в транзакции запроса. Доставкой занимается фоновая
+задача deliver_outbox (core/tasks.py): письма, пришедшие за
+OUTBOX_BATCH_DELAY секунд, уходят одной задачей, пачками по
+OUTBOX_BATCH_SIZE через одно соединение с настоящим бэкендом
+OUTBOX_BACKEND. Неотправленное письмо повторяется с растущей паузой,
+после OUTBOX_MAX_ATTEMPTS попыток остаётся со статусом failed.
+"""
+import json
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db.models import F, Min
+from django.utils import timezone
+
+from . import jobs
+from .models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxBackend(BaseEmailBackend):
+    """Почтовый бэкенд, который только ставит письма в очередь."""
+
+    def send_messages(self, email_messages):
+        rows = [to_row(message) for message in email_messages]
+        if not rows:
+            return 0
+        OutgoingEmail.objects.bulk_create(rows)
+        schedule(timezone.now())
+        return len(rows)
+
+
+def to_row(message):
+    html = ''
+    for content, mimetype in getattr(message, 'alternatives', ()):
+        if mimetype == 'text/html':
+            html = content
+    return OutgoingEmail(
+        subject=message.subject,
+        body=message.body,
+        from_email=message.from_email or settings.DEFAULT_FROM_EMAIL,
+        to=json.dumps(list(message.to)),
+        cc=json.dumps(list(message.cc)),
+        bcc=json.dumps(list(message.bcc)),
+        html=html,
+        send_after=timezone.now(),
+    )
+
+
+def to_message(row, connection):
+    message = EmailMultiAlternatives(
+        row.subject, row.body, row.from_email, json.loads(row.to),
+        cc=json.loads(row.cc), bcc=json.loads(row.bcc),
+        connection=connection,
+    )
+    if row.html:
+        message.attach_alternative(row.html, 'text/html')
+    return message
+
+
+def schedule(moment):
+    """Ставит доставку на конец окна OUTBOX_BATCH_DELAY, где лежит moment.
+
+    Ключ задачи - номер окна: сколько бы писем ни пришло за окно,
+    доставка одна.
+    """
+    from .tasks import deliver_outbox
+
+    delay = settings.OUTBOX_BATCH_DELAY
+    window = int(moment.timestamp() // delay) + 1
+    run_at = datetime.fromtimestamp(window * delay, timezone.utc)
+    jobs.enqueue(deliver_outbox, key='outbox:%d' % window, run_at=run_at)
+
+
+def claim(limit):
+    """Забирает до limit писем, которым пора уйти, на OUTBOX_LOCK_SECONDS.
+
+    Отправитель, упавший посреди пачки, не держит письма дольше: потом
+    их заберёт следующая доставка.
+    """
+    now = timezone.now()
+    locked = now + timedelta(seconds=settings.OUTBOX_LOCK_SECONDS)
+    due = OutgoingEmail.objects.filter(
+        status=OutgoingEmail.QUEUED, send_after__lte=now
+    )
+    ids = list(due.order_by('send_after').values_list('id', flat=True)[:limit])
+    # Параллельная доставка могла забрать часть писем
+    due.filter(id__in=ids).update(
+        send_after=locked, attempts=F('attempts') + 1
+    )
+    return list(OutgoingEmail.objects.filter(id__in=ids, send_after=locked))
+
+
+def retry_delay(attempts):
+    delay = settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+    return delay * random.uniform(0.5, 1)
+
+
+def send_batch(rows, connection):
+    sent = []
+    for row in rows:
+        try:
+            connection.send_messages([to_message(row, connection)])
+        except Exception as error:
+            logger.warning('Письмо %d не отправлено: %r', row.id, error)
+            row.last_error = repr(error)
+            if row.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                row.status = OutgoingEmail.FAILED
+            else:
+                row.send_after = timezone.now() + timedelta(
+                    seconds=retry_delay(row.attempts)
+                )
+            row.save(update_fields=['last_error', 'status', 'send_after'])
+        else:
+            sent.append(row.id)
+    OutgoingEmail.objects.filter(id__in=sent).update(
+        status=OutgoingEmail.SENT
+    )
+    return len(sent)
+
+
+def deliver():
+    """Отправляет всё, чему пора; возвращает число отправленных писем."""
+    started = time.monotonic()
+    connection = get_connection(settings.OUTBOX_BACKEND)
+    total = 0
+    with connection:
+        while True:
+            rows = claim(settings.OUTBOX_BATCH_SIZE)
+            if not rows:
+                break
+            total += send_batch(rows, connection)
+    logger.info(
+        'Отправлено писем: %d за %.1f с', total, time.monotonic() - started
+    )
+    # Письма, ждущие повтора, доставит следующая задача
+    retry_at = OutgoingEmail.objects.filter(
+        status=OutgoingEmail.QUEUED
+    ).aggregate(first=Min('send_after'))['first']
+    if retry_at is not None:
+        schedule(retry_at)
+    return total
@@ -0,0 +1,342 @@
+"""Нагрузочный прогон с заданной смесью запросов.
+
+По умолчанию запросы идут прямо в yatube.wsgi.application в этом же
+процессе, с --url - в запущенный сервер. Сессии авторизованных
+пользователей создаются в базе напрямую, поэтому сервер должен
+работать с той же базой.
+"""
+import io
+import math
+import random
+import string
+import threading
+import time
+from collections import Counter, defaultdict
+from http.cookies import SimpleCookie
+from importlib import import_module
+from urllib.parse import urlencode, urlsplit
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                 SESSION_KEY)
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.db.models import Count
+from django.urls import reverse
+
+from posts.models import Post, User
+
+DEFAULT_MIX = 'index=60,follow=25,post=5,comment=10'
+# Сценарии, которым нужна авторизация
+AUTHORIZED = {'follow', 'post', 'comment'}
+PERCENTILES = (50, 95, 99)
+
+
+def parse_mix(value):
+    """'index=60,follow=25' -> {'index': 60.0, 'follow': 25.0}."""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in SCENARIOS:
+            raise CommandError('Неизвестный сценарий: %s' % name)
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise CommandError('Неверный вес сценария: %s' % part)
+    if not sum(mix.values()) > 0:
+        raise CommandError('Сумма весов должна быть больше нуля.')
+    return mix
+
+
+def percentile(values, rank):
+    """Перцентиль по ближайшему рангу; values отсортированы."""
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(rank / 100 * len(values)) - 1)]
+
+
+def make_session(user):
+    """Cookie сессии авторизованного пользователя, как после входа."""
+    store = import_module(settings.SESSION_ENGINE).SessionStore()
+    store[SESSION_KEY] = user._meta.pk.value_to_string(user)
+    store[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    store[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    store.save()
+    return store.session_key
+
+
+def csrf_token(rng):
+    # Формат токена Django: 64 символа из букв и цифр
+    return ''.join(
+        rng.choice(string.ascii_letters + string.digits) for _ in range(64)
+    )
+
+
+class WSGIClient:
+    """Вызывает WSGI-приложение в этом процессе."""
+
+    def __init__(self, application):
+        self.application = application
+
+    def request(self, method, path, cookies, data=None, headers=None):
+        body = urlencode(data or {}).encode()
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'HTTP_COOKIE': '; '.join(
+                '%s=%s' % item for item in cookies.items()
+            ),
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': io.BytesIO(body),
+        }
+        for name, value in (headers or {}).items():
+            environ['HTTP_' + name.upper().replace('-', '_')] = value
+        setup_testing_defaults(environ)
+        status = []
+
+        def start_response(line, response_headers, exc_info=None):
+            status.append(int(line.split()[0]))
+            for name, value in response_headers:
+                if name.lower() == 'set-cookie':
+                    for morsel in SimpleCookie(value).values():
+                        cookies[morsel.key] = morsel.value
+
+        result = self.application(environ, start_response)
+        try:
+            size = sum(len(chunk) for chunk in result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return status[0], size
+
+
+class HTTPClient:
+    """Шлёт запросы в запущенный сервер."""
+
+    def __init__(self, base_url):
+        import requests
+
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+
+    def request(self, method, path, cookies, data=None, headers=None):
+        response = self.session.request(
+            method, self.base_url + path, data=data, headers=headers,
+            cookies=cookies, allow_redirects=False,
+        )
+        cookies.update(response.cookies.get_dict())
+        return response.status_code, len(response.content)
+
+
+def index(user, rng):
+    return 'GET', reverse('posts:index'), None
+
+
+def follow(user, rng):
+    return 'GET', reverse('posts:follow_index'), None
+
+
+def post(user, rng):
+    return 'POST', reverse('posts:post_create'), {
+        'text': 'Пост нагрузочного теста %d' % rng.randrange(10 ** 9),
+    }
+
+
+def comment(user, rng):
+    post_id = rng.choice(user.post_ids)
+    return 'POST', reverse('posts:add_comment', args=[post_id]), {
+        'text': 'Комментарий нагрузочного теста',
+    }
+
+
+SCENARIOS = {
+    'index': index,
+    'follow': follow,
+    'post': post,
+    'comment': comment,
+}
+
+
+class VirtualUser:
+    """Посетитель со своими cookie: анонимный или авторизованный."""
+
+    def __init__(self, client, session_key, post_ids, rng):
+        self.client = client
+        self.post_ids = post_ids
+        self.token = csrf_token(rng)
+        self.cookies = {settings.CSRF_COOKIE_NAME: self.token}
+        self.session = {}
+        if session_key:
+            self.session[settings.SESSION_COOKIE_NAME] = session_key
+
+    def run(self, scenario, rng):
+        method, path, data = SCENARIOS[scenario](self, rng)
+        cookies = dict(self.cookies)
+        if scenario in AUTHORIZED:
+            cookies.update(self.session)
+        headers = {'X-CSRFToken': self.token} if method == 'POST' else None
+        return self.client.request(method, path, cookies, data, headers)
+
+
+class Stats:
+    """Задержки и ошибки всех потоков плюс общий лимит запросов."""
+
+    def __init__(self, limit=None):
+        self.lock = threading.Lock()
+        self.left = limit
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.causes = Counter()
+
+    def take(self):
+        """Резервирует запрос из лимита; False, если лимит исчерпан."""
+        with self.lock:
+            if self.left is None:
+                return True
+            if self.left <= 0:
+                return False
+            self.left -= 1
+            return True
+
+    def record(self, scenario, elapsed, status):
+        # status - код ответа или имя исключения
+        with self.lock:
+            self.latencies[scenario].append(elapsed)
+            if not isinstance(status, int) or status >= 400:
+                self.errors[scenario] += 1
+                self.causes[status] += 1
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный прогон: пропускная способность и задержки.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', default=None,
+            help='Адрес запущенного сервера; без него - WSGI в процессе.',
+        )
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--duration', type=float, default=30,
+            help='Длительность прогона, с.',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=None,
+            help='Остановиться после стольких запросов.',
+        )
+        parser.add_argument(
+            '--mix', type=parse_mix, default=DEFAULT_MIX,
+            help='Веса сценариев, по умолчанию %s.' % DEFAULT_MIX,
+        )
+        parser.add_argument(
+            '--think-time', type=float, default=0,
+            help='Средняя пауза между запросами посетителя, мс.',
+        )
+        parser.add_argument(
+            '--users', type=int, default=50,
+            help='Сколько авторизованных пользователей задействовать.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        mix = options['mix']
+        if isinstance(mix, str):
+            mix = parse_mix(mix)
+        sessions, post_ids = self.prepare(mix, options['users'])
+        make_client = self.client_factory(options['url'])
+        stats = Stats(options['requests'])
+        deadline = time.perf_counter() + options['duration']
+
+        def worker(number):
+            rng = random.Random('%s:%d' % (options['seed'], number))
+            session = sessions[number % len(sessions)] if sessions else None
+            user = VirtualUser(make_client(), session, post_ids, rng)
+            try:
+                self.work(
+                    user, rng, mix, options['think_time'], deadline, stats
+                )
+            finally:
+                close_old_connections()
+
+        threads = [
+            threading.Thread(target=worker, args=(number,))
+            for number in range(options['concurrency'])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.report(stats, time.perf_counter() - started)
+
+    def prepare(self, mix, count):
+        if not AUTHORIZED & {name for name, weight in mix.items() if weight}:
+            return [], []
+        # Самые активные читатели: у них самая тяжёлая лента
+        users = list(
+            User.objects.annotate(follows=Count('follower'))
+            .order_by('-follows', 'id')[:count]
+        )
+        if not users:
+            raise CommandError('Нет пользователей; запустите seed.')
+        post_ids = list(
+            Post.objects.order_by('-id').values_list('id', flat=True)[:1000]
+        )
+        if mix.get('comment') and not post_ids:
+            raise CommandError('Нет постов для комментариев.')
+        return [make_session(user) for user in users], post_ids
+
+    def client_factory(self, url):
+        if url:
+            if not urlsplit(url).scheme:
+                raise CommandError('Укажите адрес со схемой: http://...')
+            return lambda: HTTPClient(url)
+        from yatube.wsgi import application
+
+        return lambda: WSGIClient(application)
+
+    def work(self, user, rng, mix, think_time, deadline, stats):
+        names, weights = list(mix), list(mix.values())
+        while time.perf_counter() < deadline and stats.take():
+            scenario = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                status, _ = user.run(scenario, rng)
+            except Exception as error:
+                status = type(error).__name__
+            stats.record(scenario, time.perf_counter() - started, status)
+            if think_time:
+                time.sleep(rng.expovariate(1000 / think_time))
+
+    def report(self, stats, elapsed):
+        self.stdout.write(
+            '%-8s %8s %8s %7s %8s %8s %8s' % (
+                'scenario', 'requests', 'rps', 'errors',
+                'p50 ms', 'p95 ms', 'p99 ms',
+            )
+        )
+        rows = sorted(stats.latencies.items())
+        rows.append(('total', [
+            value for values in stats.latencies.values() for value in values
+        ]))
+        for name, latencies in rows:
+            count = len(latencies)
+            failed = (
+                sum(stats.errors.values()) if name == 'total'
+                else stats.errors[name]
+            )
+            latencies = sorted(latencies)
+            self.stdout.write(
+                '%-8s %8d %8.1f %6.1f%% %8.1f %8.1f %8.1f' % (
+                    name, count, count / elapsed if elapsed else 0,
+                    100 * failed / count if count else 0,
+                    *(percentile(latencies, rank) * 1000
+                      for rank in PERCENTILES),
+                )
+            )
+        if stats.causes:
+            self.stderr.write('Ошибки: %s' % ', '.join(
+                '%s=%d' % item for item in stats.causes.most_common()
+            ))
@@ -0,0 +1,86 @@
+import glob
+import json
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+NORMALIZE = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+def fingerprint(sql):
+    """SQL без конкретных значений: одинаковые запросы с разными
+    параметрами дают один отпечаток."""
+    for pattern, replacement in NORMALIZE:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip().lower()
+
+
+def read_records(path):
+    # Сначала самые старые ротированные файлы: path.N, ..., path.1, path
+    backups = sorted(
+        glob.glob(path + '.*'),
+        key=lambda name: int(name.rsplit('.', 1)[1])
+        if name.rsplit('.', 1)[1].isdigit() else 0,
+        reverse=True,
+    )
+    for filename in backups + [path]:
+        try:
+            with open(filename, encoding='utf-8') as file:
+                for line in file:
+                    if line.strip():
+                        yield json.loads(line)
+        except FileNotFoundError:
+            continue
+
+
+class Command(BaseCommand):
+    help = 'Рейтинг медленных запросов из журнала SLOW_QUERY_LOG.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--order', choices=('total', 'count', 'max'), default='total',
+            help='Сортировка: суммарное время, число или максимум.',
+        )
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--log', default=None, help='Путь к журналу.')
+
+    def handle(self, *args, **options):
+        groups = defaultdict(lambda: {
+            'count': 0, 'total': 0.0, 'max': 0.0,
+            'views': set(), 'sql': '', 'plan': None,
+        })
+        for record in read_records(options['log'] or settings.SLOW_QUERY_LOG):
+            group = groups[fingerprint(record['sql'])]
+            group['count'] += 1
+            group['total'] += record['duration_ms']
+            group['views'].add(record['view'])
+            if record['duration_ms'] >= group['max']:
+                group['max'] = record['duration_ms']
+                group['sql'] = record['sql']
+                group['plan'] = record['plan']
+        ranked = sorted(
+            groups.values(), key=lambda group: group[options['order']],
+            reverse=True,
+        )
+        for number, group in enumerate(ranked[:options['limit']], 1):
+            self.stdout.write(
+                '%d. count=%d total=%.1fms max=%.1fms mean=%.1fms' % (
+                    number, group['count'], group['total'], group['max'],
+                    group['total'] / group['count'],
+                )
+            )
+            views = ', '.join(sorted(group['views']))
+            self.stdout.write('   views: %s' % views)
+            self.stdout.write('   sql: %s' % group['sql'])
+            for row in group['plan'] or ():
+                self.stdout.write('   plan: %s' % row)
+        if not groups:
+            self.stdout.write('Медленных запросов нет.')
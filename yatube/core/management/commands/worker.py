@@ -0,0 +1,105 @@
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from collections import Counter
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import jobs
+
+
+def run_job(job_id, worker):
+    try:
+        return jobs.run(job_id, worker)
+    finally:
+        # Потоки пула живут долго: соединение закрывается после задачи
+        connections.close_all()
+
+
+def make_pool(kind, size):
+    if kind == 'process':
+        # spawn, а не fork: потомок открывает свои соединения с базой,
+        # а не наследует соединение родителя
+        return ProcessPoolExecutor(
+            size, multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        )
+    return ThreadPoolExecutor(size)
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.JOB_CONCURRENCY,
+            help='Сколько задач выполнять одновременно.',
+        )
+        parser.add_argument(
+            '--pool', choices=('thread', 'process'), default='thread',
+            help='Потоки для задач с вводом-выводом, процессы - для '
+                 'задач, занятых вычислениями.',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float,
+            default=settings.JOB_POLL_INTERVAL,
+            help='Пауза между проверками пустой очереди, с.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти.',
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        self.results = Counter()
+        signal.signal(signal.SIGTERM, self.stop)
+        worker = '%s:%d' % (socket.gethostname(), os.getpid())
+        concurrency = options['concurrency']
+        pool = make_pool(options['pool'], concurrency)
+        running = set()
+        try:
+            while not self.stopping:
+                free = concurrency - len(running)
+                job_ids = jobs.claim(worker, free) if free else []
+                for job_id in job_ids:
+                    running.add(pool.submit(run_job, job_id, worker))
+                if not running:
+                    if options['once']:
+                        break
+                    jobs.prune()
+                    time.sleep(options['poll_interval'])
+                    continue
+                finished, running = wait(
+                    running, timeout=options['poll_interval'],
+                    return_when=FIRST_COMPLETED,
+                )
+                for future in finished:
+                    self.collect(future)
+        except KeyboardInterrupt:
+            self.stdout.write('Остановка, ждём начатые задачи...')
+        finally:
+            pool.shutdown(wait=True)
+        self.stdout.write('Выполнено: %d, с ошибкой: %d' % (
+            self.results[True], self.results[False]
+        ))
+
+    def collect(self, future):
+        try:
+            succeeded = future.result()
+        except Exception as error:
+            # Исход не записан: задачу повторит другой воркер
+            # по истечении её visibility timeout
+            self.stderr.write('Сбой воркера: %r' % error)
+            succeeded = False
+        self.results[succeeded] += 1
+
+    def stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,211 @@
+"""Метрики в текстовом формате Prometheus, общие для всех процессов.
+
+Каждый процесс копит значения в памяти (одна короткая блокировка на
+запрос) и не чаще раза в METRICS_FLUSH_INTERVAL секунд сбрасывает их
+в свой файл в METRICS_DIR. /metrics суммирует файлы всех процессов.
+
+Файл процесса называется по pid и времени старта: процесс с
+повторно выданным pid не затрёт файл прежнего. Файлы умерших процессов
+переносятся в общий архивный файл, поэтому счётчики не убывают, а
+каталог не копит файлы.
+"""
+import fcntl
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+LE_RE = re.compile(r'le="([^"]*)",?')
+PROCESS_FILE_RE = re.compile(r'^metrics_(\d+)_\w+\.json$')
+ARCHIVE_FILE = 'metrics_archive.json'
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+METRICS = {
+    'yatube_requests_total': (
+        'counter', 'Запросы по представлению и статусу ответа.'),
+    'yatube_request_duration_seconds': (
+        'histogram', 'Время ответа по представлению.'),
+    'yatube_db_queries_total': (
+        'counter', 'Запросы к БД по представлению.'),
+    'yatube_cache_hits_total': (
+        'counter', 'Попадания в кэш по представлению.'),
+    'yatube_cache_misses_total': (
+        'counter', 'Промахи кэша по представлению.'),
+    'yatube_cache_hit_ratio': (
+        'gauge', 'Доля попаданий в кэш по представлению.'),
+}
+
+
+def escape(value):
+    return (
+        str(value).replace('\\', r'\\').replace('"', r'\"')
+        .replace('\n', r'\n')
+    )
+
+
+def sample(name, **labels):
+    """Имя сэмпла с метками: name{a="1",b="2"}."""
+    if not labels:
+        return name
+    return '%s{%s}' % (name, ','.join(
+        '%s="%s"' % (label, escape(value))
+        for label, value in sorted(labels.items())
+    ))
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = defaultdict(float)
+        self.flushed = time.monotonic()
+        self.pid = None
+        self.filename = None
+
+    def observe_request(self, view, status, duration, queries,
+                        cache_hits, cache_misses):
+        name = 'yatube_request_duration_seconds'
+        updates = [
+            (sample('yatube_requests_total', view=view, status=status), 1),
+            (sample(name + '_bucket', view=view, le='+Inf'), 1),
+            (sample(name + '_sum', view=view), duration),
+            (sample(name + '_count', view=view), 1),
+            (sample('yatube_db_queries_total', view=view), queries),
+            (sample('yatube_cache_hits_total', view=view), cache_hits),
+            (sample('yatube_cache_misses_total', view=view), cache_misses),
+        ]
+        for bucket in BUCKETS:
+            if duration <= bucket:
+                updates.append(
+                    (sample(name + '_bucket', view=view, le=bucket), 1)
+                )
+        with self.lock:
+            for key, value in updates:
+                self.values[key] += value
+        if time.monotonic() - self.flushed >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """Сохраняет накопленные значения процесса в его файл."""
+        with self.lock:
+            snapshot = dict(self.values)
+            self.flushed = time.monotonic()
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        if self.pid != os.getpid():
+            # Первый сброс или процесс-потомок после fork
+            self.pid = os.getpid()
+            self.filename = 'metrics_%d_%x.json' % (
+                self.pid, int(time.time() * 1e6)
+            )
+        path = os.path.join(settings.METRICS_DIR, self.filename)
+        with open(path + '.tmp', 'w') as file:
+            json.dump(snapshot, file)
+        os.replace(path + '.tmp', path)
+
+
+registry = Registry()
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def load(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def archive(path):
+    """Переносит значения умершего процесса в архивный файл."""
+    claimed = path + '.dead'
+    try:
+        # Переименование удаётся одному процессу: файл не сложится дважды
+        os.rename(path, claimed)
+    except FileNotFoundError:
+        return
+    archive_path = os.path.join(settings.METRICS_DIR, ARCHIVE_FILE)
+    with open(archive_path + '.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        totals = defaultdict(float, load(archive_path))
+        for key, value in load(claimed).items():
+            totals[key] += value
+        with open(archive_path + '.tmp', 'w') as file:
+            json.dump(totals, file)
+        os.replace(archive_path + '.tmp', archive_path)
+        os.remove(claimed)
+
+
+def collect():
+    """Сумма значений всех процессов, живых и умерших."""
+    registry.flush()
+    for filename in os.listdir(settings.METRICS_DIR):
+        match = PROCESS_FILE_RE.match(filename)
+        if match and not is_alive(int(match.group(1))):
+            archive(os.path.join(settings.METRICS_DIR, filename))
+    totals = defaultdict(float)
+    for filename in os.listdir(settings.METRICS_DIR):
+        if not (filename.startswith('metrics_')
+                and filename.endswith('.json')):
+            continue
+        values = load(os.path.join(settings.METRICS_DIR, filename))
+        for key, value in values.items():
+            totals[key] += value
+    return totals
+
+
+def hit_ratios(totals):
+    hits = 'yatube_cache_hits_total'
+    ratios = {}
+    for key, value in totals.items():
+        if not key.startswith(hits + '{'):
+            continue
+        labels = key[len(hits):]
+        lookups = value + totals.get('yatube_cache_misses_total' + labels, 0)
+        if lookups:
+            ratios['yatube_cache_hit_ratio' + labels] = value / lookups
+    return ratios
+
+
+def family(key):
+    name = key.split('{', 1)[0]
+    for suffix in ('_bucket', '_sum', '_count'):
+        if name.endswith(suffix) and name[:-len(suffix)] in METRICS:
+            return name[:-len(suffix)]
+    return name
+
+
+def sort_key(key):
+    """Бакеты гистограммы идут по возрастанию le."""
+    match = LE_RE.search(key)
+    if not match:
+        return key, 0
+    return LE_RE.sub('', key), float(match.group(1))
+
+
+def render(totals):
+    totals = dict(totals, **hit_ratios(totals))
+    families = defaultdict(list)
+    for key in sorted(totals, key=sort_key):
+        families[family(key)].append(key)
+    lines = []
+    for name, (kind, description) in METRICS.items():
+        if name not in families:
+            continue
+        lines.append('# HELP %s %s' % (name, description))
+        lines.append('# TYPE %s %s' % (name, kind))
+        for key in families[name]:
+            lines.append('%s %r' % (key, totals[key]))
+    return '\n'.join(lines) + '\n'
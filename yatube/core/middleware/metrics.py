@@ -0,0 +1,30 @@
+import time
+
+from core import metrics, timing
+
+
+class MetricsMiddleware:
+    """Записывает запрос в метрики Prometheus.
+
+    Должен стоять сразу после ServerTimingMiddleware: число запросов к БД
+    и попадания в кэш берутся из её счётчиков.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        duration = time.perf_counter() - started
+        stats = timing.current()
+        match = getattr(request, 'resolver_match', None)
+        metrics.registry.observe_request(
+            view=match.view_name if match else 'unresolved',
+            status=response.status_code,
+            duration=duration,
+            queries=stats.timings['db'][0] if stats else 0,
+            cache_hits=stats.counters['cache_hit'] if stats else 0,
+            cache_misses=stats.counters['cache_miss'] if stats else 0,
+        )
+        return response
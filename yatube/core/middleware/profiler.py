@@ -0,0 +1,25 @@
+from core import profiler
+
+
+class ProfilerMiddleware:
+    """Профилирует запрос сотрудника с подписанным токеном.
+
+    Должен стоять после AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = (
+            request.GET.get('profile')
+            or request.META.get('HTTP_X_YATUBE_PROFILE')
+        )
+        if not token or not request.user.is_staff:
+            return self.get_response(request)
+        if not profiler.check_token(token, request.path):
+            return self.get_response(request)
+        with profiler.RequestProfile() as profile:
+            response = self.get_response(request)
+        response['X-Yatube-Profile'] = profile.save(request, response)
+        return response
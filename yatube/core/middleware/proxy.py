@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+
+
+class ProxyCacheMiddleware:
+    """Выставляет заголовки кэширования для ответов с Surrogate-Key.
+
+    Анонимные ответы без cookie становятся публичными, и из Vary
+    убирается Cookie: прокси обходит кэш для запросов с cookie сессии,
+    так что кэш у всех анонимов общий. Ответы авторизованным - private.
+    Должен стоять в MIDDLEWARE выше SessionMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not response.has_header('Surrogate-Key'):
+            return response
+        if (
+            request.method in ('GET', 'HEAD')
+            and response.status_code == 200
+            and not response.cookies
+            and not request.user.is_authenticated
+        ):
+            patch_cache_control(
+                response,
+                public=True,
+                max_age=0,
+                s_maxage=settings.PROXY_CACHE_MAX_AGE,
+            )
+            self.drop_vary_cookie(response)
+        else:
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    @staticmethod
+    def drop_vary_cookie(response):
+        vary = [
+            header.strip()
+            for header in response.get('Vary', '').split(',')
+            if header.strip() and header.strip().lower() != 'cookie'
+        ]
+        if vary:
+            response['Vary'] = ', '.join(vary)
+        elif response.has_header('Vary'):
+            del response['Vary']
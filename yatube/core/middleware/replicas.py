@@ -0,0 +1,22 @@
+from core import replicas
+
+
+class ReplicaMiddleware:
+    """Состояние маршрутизации БД на время запроса, см. core/replicas.py.
+
+    Должен стоять в MIDDLEWARE выше SessionMiddleware, чтобы запись
+    сессии тоже закрепляла посетителя за основной базой.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state, token = replicas.start(replicas.is_pinned(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            replicas.stop(token)
+        if state.wrote:
+            replicas.pin(response)
+        return response
@@ -0,0 +1,74 @@
+import json
+import logging
+from contextlib import ExitStack
+
+from django.db import connections
+
+from core import slow_queries, timing
+
+logger = logging.getLogger('yatube.timing')
+
+# Виды работы в порядке вывода в Server-Timing
+METRICS = (
+    ('db', 'queries'),
+    ('tpl', 'renders'),
+    ('thumb', 'thumbnails'),
+)
+
+# Обёртки запросов к БД на время запроса, от внешней к внутренней
+WRAPPERS = (slow_queries.record_slow_query, timing.query_timer)
+
+
+class ServerTimingMiddleware:
+    """Замеряет запрос и отдаёт итоги в Server-Timing и в лог.
+
+    Должен стоять в MIDDLEWARE первым, чтобы total покрывал весь запрос.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats, token = timing.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    for wrapper in WRAPPERS:
+                        stack.enter_context(
+                            connection.execute_wrapper(wrapper)
+                        )
+                response = self.get_response(request)
+        finally:
+            timing.stop(token)
+        response['Server-Timing'] = self.header(stats)
+        logger.info(json.dumps(self.record(request, response, stats)))
+        return response
+
+    @staticmethod
+    def header(stats):
+        parts = ['total;dur=%.1f' % (stats.total * 1000)]
+        for name, description in METRICS:
+            number, seconds = stats.timings.get(name, (0, 0.0))
+            parts.append('%s;dur=%.1f;desc="%d %s"' % (
+                name, seconds * 1000, number, description
+            ))
+        parts.append('cache;desc="hit=%d miss=%d"' % (
+            stats.counters['cache_hit'], stats.counters['cache_miss']
+        ))
+        return ', '.join(parts)
+
+    @staticmethod
+    def record(request, response, stats):
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(stats.total * 1000, 1),
+            'cache_hit': stats.counters['cache_hit'],
+            'cache_miss': stats.counters['cache_miss'],
+        }
+        for name, _ in METRICS:
+            number, seconds = stats.timings.get(name, (0, 0.0))
+            record[name + '_count'] = number
+            record[name + '_ms'] = round(seconds * 1000, 1)
+        return record
@@ -11,3 +11,73 @@ class CreatedModel(models.Model):
     class Meta:
         # Это абстрактная модель:
         abstract = True
+
+
+class Job(models.Model):
+    """Фоновая задача в очереди, см. core/jobs.py."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Не выполнена'),
+    )
+
+    name = models.CharField(max_length=200)
+    # Аргументы задачи в JSON: {"args": [...], "kwargs": {...}}
+    payload = models.TextField(default='{}')
+    # Ключ идемпотентности: вторая постановка с тем же ключом не создаёт
+    # новую задачу, пока старая не удалена
+    key = models.CharField(max_length=200, unique=True, blank=True, null=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    # Не раньше этого времени: отложенный запуск и пауза перед повтором
+    run_at = models.DateTimeField()
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField()
+    # Кто взял задачу и до какого времени; после - её может взять другой
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_at'])]
+
+    def __str__(self):
+        return '%s #%d' % (self.name, self.id)
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в исходящих, см. core/mail.py."""
+    QUEUED = 'queued'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Не отправлено'),
+    )
+
+    subject = models.TextField()
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    # Списки адресов в JSON
+    to = models.TextField()
+    cc = models.TextField(default='[]')
+    bcc = models.TextField(default='[]')
+    # HTML-версия письма, если есть
+    html = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    # Не раньше этого времени: пауза перед повтором и время, на которое
+    # письмо забрал отправитель
+    send_after = models.DateTimeField()
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'send_after'])]
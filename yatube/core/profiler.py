@@ -0,0 +1,138 @@
+"""Профилирование отдельных запросов по подписанному запросу сотрудника.
+
+Запрос профилируется, если сотрудник передал в ?profile= или в заголовке
+X-Yatube-Profile токен, подписанный для этого пути (make_token). Во время
+запроса работают cProfile и поток-сэмплер стеков; результат сохраняется
+в PROFILER_DIR как .pstats, .collapsed (для flamegraph.pl/speedscope)
+и .json с описанием.
+"""
+import cProfile
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+SALT = 'yatube.profiler'
+NAME_RE = re.compile(r'^[\w.-]+$')
+
+
+def make_token(path):
+    return signing.TimestampSigner(salt=SALT).sign(path)
+
+
+def check_token(token, path):
+    try:
+        signed_path = signing.TimestampSigner(salt=SALT).unsign(
+            token, max_age=settings.PROFILER_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return signed_path == path
+
+
+class StackSampler(threading.Thread):
+    """Раз в interval секунд снимает стек потока thread_id."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append('%s:%s' % (
+                    os.path.basename(code.co_filename), code.co_name
+                ))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class RequestProfile:
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler(
+            threading.get_ident(), settings.PROFILER_SAMPLE_INTERVAL
+        )
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self.sampler.start()
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profile.disable()
+        self.sampler.stop()
+        self.duration = time.perf_counter() - self.started
+
+    def save(self, request, response):
+        """Сохраняет профиль и возвращает имя записи."""
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        created = timezone.now()
+        name = '%s-%s' % (
+            created.strftime('%Y%m%d-%H%M%S-%f'), re.sub(r'\W', '_', view)
+        )
+        base = os.path.join(settings.PROFILER_DIR, name)
+        os.makedirs(settings.PROFILER_DIR, exist_ok=True)
+        self.profile.dump_stats(base + '.pstats')
+        with open(base + '.collapsed', 'w') as file:
+            for stack, samples in self.sampler.stacks.most_common():
+                file.write('%s %d\n' % (stack, samples))
+        with open(base + '.json', 'w') as file:
+            json.dump({
+                'name': name,
+                'view': view,
+                'path': request.get_full_path(),
+                'user': request.user.get_username(),
+                'status': response.status_code,
+                'duration_ms': round(self.duration * 1000, 1),
+                'created': created.isoformat(),
+            }, file, ensure_ascii=False)
+        return name
+
+
+def recent_profiles(view=None, limit=100):
+    """Описания последних профилей, новые первыми."""
+    if not os.path.isdir(settings.PROFILER_DIR):
+        return []
+    names = sorted(
+        (name for name in os.listdir(settings.PROFILER_DIR)
+         if name.endswith('.json')),
+        reverse=True,
+    )
+    profiles = []
+    for name in names:
+        with open(os.path.join(settings.PROFILER_DIR, name)) as file:
+            profile = json.load(file)
+        if view is None or profile['view'] == view:
+            profiles.append(profile)
+        if len(profiles) >= limit:
+            break
+    return profiles
+
+
+def profile_file(name, extension):
+    """Путь к файлу профиля или None, если имя недопустимо."""
+    if not NAME_RE.match(name) or extension not in ('pstats', 'collapsed'):
+        return None
+    path = os.path.join(settings.PROFILER_DIR, '%s.%s' % (name, extension))
+    return path if os.path.exists(path) else None
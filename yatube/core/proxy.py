@@ -0,0 +1,36 @@
+"""Работа с кэширующим обратным прокси перед Yatube.
+
+Публичные ответы помечаются заголовком Surrogate-Key, а при записи
+прокси получает PURGE-запрос со списком ключей устаревших страниц.
+"""
+import logging
+
+import requests
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+def set_surrogate_keys(response, *keys):
+    response['Surrogate-Key'] = ' '.join(keys)
+    return response
+
+
+def purge(*keys):
+    """Сбрасывает в прокси страницы с ключами keys после коммита."""
+    if not settings.PROXY_PURGE_URL or not keys:
+        return
+    transaction.on_commit(lambda: send_purge(keys))
+
+
+def send_purge(keys):
+    try:
+        requests.request(
+            'PURGE',
+            settings.PROXY_PURGE_URL,
+            headers={'Surrogate-Key': ' '.join(keys)},
+            timeout=settings.PROXY_PURGE_TIMEOUT,
+        )
+    except requests.RequestException:
+        logger.warning('Не удалось сбросить ключи %s в прокси', keys)
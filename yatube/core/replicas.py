@@ -0,0 +1,109 @@
+"""Чтение с реплик и запись в основную базу.
+
+Реплики - псевдонимы из settings.DATABASE_REPLICAS. На них уходят только
+чтения внутри представлений с декоратором read_replica и только моделей
+приложений из REPLICA_APPS; всё остальное читается из default.
+
+Реплика может отставать, поэтому после любой записи ReplicaMiddleware
+ставит cookie REPLICA_PIN_COOKIE, и следующие REPLICA_PIN_SECONDS секунд
+запросы этого посетителя читают из default: он сразу видит свой пост,
+комментарий или подписку. Запись в модели из REPLICA_PIN_EXEMPT (счётчики,
+которые посетитель не ждёт увидеть сразу) не закрепляет.
+"""
+import contextvars
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_current = contextvars.ContextVar('replica_routing', default=None)
+
+
+class RoutingState:
+    def __init__(self, pinned):
+        # Посетитель недавно писал и читает из default
+        self.pinned = pinned
+        # Выполняется представление с read_replica
+        self.read_only = False
+        # В этом запросе уже была запись
+        self.wrote = False
+
+    @property
+    def use_replica(self):
+        return self.read_only and not (self.pinned or self.wrote)
+
+
+def start(pinned):
+    state = RoutingState(pinned)
+    return state, _current.set(state)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def is_pinned(request):
+    try:
+        until = float(request.COOKIES[settings.REPLICA_PIN_COOKIE])
+    except (KeyError, ValueError):
+        return False
+    return until > time.time()
+
+
+def pin(response):
+    """Закрепляет посетителя за основной базой на REPLICA_PIN_SECONDS."""
+    seconds = settings.REPLICA_PIN_SECONDS
+    response.set_cookie(
+        settings.REPLICA_PIN_COOKIE, '%.3f' % (time.time() + seconds),
+        max_age=seconds, httponly=True, samesite='Lax',
+    )
+
+
+def read_replica(view_func):
+    """Разрешает представлению, которое только читает, ходить в реплики."""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        state = _current.get()
+        if state is None:
+            return view_func(request, *args, **kwargs)
+        state.read_only = True
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            state.read_only = False
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _current.get()
+        replicas = settings.DATABASE_REPLICAS
+        if (
+            state is None
+            or not state.use_replica
+            or not replicas
+            or model._meta.app_label not in settings.REPLICA_APPS
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _current.get()
+        if (
+            state is not None
+            and model._meta.label_lower not in settings.REPLICA_PIN_EXEMPT
+        ):
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На репликах те же данные, что и в default
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема попадает на реплики репликацией
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,119 @@
+"""Журнал медленных запросов к БД с планом выполнения.
+
+Обёртку на время каждого запроса ставит ServerTimingMiddleware, как и
+учёт времени: обёртка, добавленная при открытии подключения, снималась
+вместо чужой, если подключение открывалось посреди запроса. Запрос
+дольше SLOW_QUERY_THRESHOLD_MS из представлений posts/views.py или из
+админки пишется строкой JSON в SLOW_QUERY_LOG (с ротацией) вместе с
+параметрами, представлением, стеком и планом EXPLAIN.
+"""
+import contextvars
+import json
+import logging
+import os
+import time
+import traceback
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.utils import timezone
+
+EXPLAIN = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+    'mysql': 'EXPLAIN ',
+}
+
+# Файлы, из которых вызываются интересующие нас представления
+VIEW_SOURCES = (
+    os.path.join('posts', 'views.py'),
+    os.path.join('django', 'contrib', 'admin', ''),
+)
+
+_explaining = contextvars.ContextVar('explaining', default=False)
+_handlers = {}
+
+
+def record_slow_query(execute, sql, params, many, context):
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    if threshold is None or _explaining.get():
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = (time.perf_counter() - started) * 1000
+    if duration >= threshold:
+        stack = traceback.extract_stack()[:-1]
+        view = find_view(stack)
+        if view is not None:
+            write({
+                'time': timezone.now().isoformat(),
+                'duration_ms': round(duration, 3),
+                'sql': sql,
+                'params': [repr(param) for param in params or ()],
+                'view': view,
+                'stack': summarize(stack),
+                'plan': None if many else explain(
+                    context['connection'], sql, params
+                ),
+            })
+    return result
+
+
+def find_view(stack):
+    """Представление, из которого пришёл запрос, или None."""
+    # Внешний кадр posts/views.py - само представление, а не его помощники
+    for frame in stack:
+        if frame.filename.endswith(VIEW_SOURCES[0]):
+            return 'posts.views.%s' % frame.name
+    for frame in reversed(stack):
+        if VIEW_SOURCES[1] in frame.filename:
+            return 'admin.%s' % frame.name
+    return None
+
+
+def summarize(stack):
+    """Кадры стека из кода проекта, без Django и библиотек."""
+    return [
+        '%s:%d in %s' % (
+            os.path.relpath(frame.filename, settings.BASE_DIR),
+            frame.lineno,
+            frame.name,
+        )
+        for frame in stack
+        if frame.filename.startswith(settings.BASE_DIR)
+        and 'site-packages' not in frame.filename
+    ]
+
+
+def explain(connection, sql, params):
+    prefix = EXPLAIN.get(connection.vendor)
+    if prefix is None:
+        return None
+    token = _explaining.set(True)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return [list(row) for row in cursor.fetchall()]
+    except Exception as error:
+        return ['EXPLAIN не выполнен: %s' % error]
+    finally:
+        _explaining.reset(token)
+
+
+def write(record):
+    path = settings.SLOW_QUERY_LOG
+    if path not in _handlers:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handler = RotatingFileHandler(
+            path,
+            maxBytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+            backupCount=settings.SLOW_QUERY_LOG_BACKUP_COUNT,
+            encoding='utf-8',
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        _handlers[path] = handler
+    _handlers[path].handle(logging.makeLogRecord({
+        'msg': json.dumps(record, ensure_ascii=False, default=str),
+        'levelno': logging.WARNING,
+        'levelname': 'WARNING',
+    }))
@@ -0,0 +1,79 @@
+"""Настройка подключений SQLite и повтор записи при блокировке.
+
+PRAGMA из settings.SQLITE_PRAGMAS выполняются на каждом новом
+подключении (сигнал connection_created). В режиме WAL читатели не ждут
+писателя, но писатели по-прежнему идут по одному: обычно блокировку
+дожидается busy timeout (OPTIONS['timeout']), а когда SQLite отказывает
+сразу - например, транзакция начала с чтения и данные успели
+измениться - call_with_retry повторяет её целиком. Повторяется только
+запись в базу: представления оборачивают в него свой блок записи, а
+файлы, сброс кэша и прокси делают вне его.
+"""
+import random
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, transaction
+from django.db.models import FileField
+
+from . import timing
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    """Обработчик connection_created."""
+    if connection.vendor != 'sqlite':
+        return
+    cursor = connection.connection.cursor()
+    try:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute('PRAGMA %s = %s' % (name, value))
+    finally:
+        cursor.close()
+
+
+def is_locked(error):
+    message = str(error)
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def call_with_retry(func, using=DEFAULT_DB_ALIAS):
+    """Выполняет func() в транзакции, повторяя её при блокировке базы.
+
+    Пауза растёт вдвое с каждой попыткой и случайно сдвигается, чтобы
+    столкнувшиеся писатели не повторили попытку одновременно.
+    """
+    retries = settings.SQLITE_LOCK_RETRIES
+    for attempt in range(retries + 1):
+        try:
+            with transaction.atomic(using=using):
+                return func()
+        except OperationalError as error:
+            if attempt == retries or not is_locked(error):
+                raise
+        timing.count('lock_retry')
+        time.sleep(
+            settings.SQLITE_LOCK_RETRY_DELAY * 2 ** attempt * random.random()
+        )
+
+
+def save_with_retry(instance):
+    """instance.save() через call_with_retry.
+
+    Загруженные файлы пишутся в хранилище один раз, до транзакции: повтор
+    записи не сохраняет их снова, а если запись так и не удалась, файлы
+    удаляются.
+    """
+    stored = []
+    for field in instance._meta.concrete_fields:
+        if not isinstance(field, FileField):
+            continue
+        file = getattr(instance, field.attname)
+        if file and not file._committed:
+            file.save(file.name, file.file, save=False)
+            stored.append(file)
+    try:
+        call_with_retry(instance.save)
+    except Exception:
+        for file in stored:
+            file.delete(save=False)
+        raise
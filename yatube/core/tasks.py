@@ -0,0 +1,8 @@
+from . import mail
+from .jobs import task
+
+
+@task
+def deliver_outbox():
+    """Отправляет письма из исходящих, см. core/mail.py."""
+    mail.deliver()
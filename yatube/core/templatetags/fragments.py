@@ -0,0 +1,15 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from core import fragments
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def fragment(context, name, **params):
+    """Персональный фрагмент: метка для общего кэша или готовый HTML."""
+    request = context.get('request')
+    if getattr(request, 'defer_fragments', False):
+        return mark_safe(fragments.placeholder(name, **params))
+    return mark_safe(fragments.render(request, name, **params))
@@ -0,0 +1,36 @@
+"""Запуск тестов с отдельным каталогом для файлов проекта.
+
+Все запросы тестов проходят через MetricsMiddleware, а сессии и
+пользователи лежат в файловом кэше sessions: без подмены тесты писали
+бы в настоящие METRICS_DIR и каталог кэша.
+"""
+import copy
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+def isolated_files(root):
+    """override_settings, переносящий файлы проекта в каталог root."""
+    caches = copy.deepcopy(settings.CACHES)
+    caches['sessions']['LOCATION'] = os.path.join(root, 'sessions')
+    return override_settings(
+        METRICS_DIR=os.path.join(root, 'metrics'), CACHES=caches
+    )
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.files_dir = tempfile.mkdtemp(prefix='yatube-tests-')
+        self.files_settings = isolated_files(self.files_dir)
+        self.files_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.files_settings.disable()
+        shutil.rmtree(self.files_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,70 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.auth import user_key
+
+User = get_user_model()
+SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
+
+
+class CachedAuthTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='HasNoName', password='old-password'
+        )
+
+    def setUp(self):
+        caches['sessions'].clear()
+        self.authorized_client = Client()
+        self.authorized_client.login(
+            username='HasNoName', password='old-password'
+        )
+        self.url = reverse('posts:follow_index')
+        self.assertEqual(self.authorized_client.get(self.url).status_code, 200)
+
+    def other_process_cache(self):
+        """Кэш sessions так, как его видит другой процесс."""
+        return FileBasedCache(settings.CACHES['sessions']['LOCATION'], {})
+
+    def test_session_and_user_from_cache(self):
+        """Повторный запрос не читает сессию и пользователя из базы."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('"django_session"', sql)
+        self.assertNotIn('FROM "auth_user" WHERE', sql)
+
+    def test_password_change_invalidates(self):
+        """Смена пароля сбрасывает кэш и завершает старые сессии."""
+        self.assertIsNotNone(caches['sessions'].get(user_key(self.user.pk)))
+        self.user.set_password('new-password')
+        self.user.save()
+        self.assertIsNone(caches['sessions'].get(user_key(self.user.pk)))
+        response = self.authorized_client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+
+    def test_deactivation_invalidates(self):
+        self.user.is_active = False
+        self.user.save(update_fields=['is_active'])
+        response = self.authorized_client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+
+    def test_logout_in_other_process(self):
+        """Выход в другом процессе виден этому: кэш общий."""
+        session_key = self.authorized_client.session.session_key
+        self.other_process_cache().delete(SessionStore(session_key).cache_key)
+        Session.objects.filter(session_key=session_key).delete()
+        response = self.authorized_client.get(self.url)
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,139 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+
+CALLS = []
+
+
+@jobs.task
+def record(value, suffix=''):
+    CALLS.append(value + suffix)
+
+
+@jobs.task(max_attempts=2)
+def explode():
+    raise ValueError('Ошибка задачи')
+
+
+@override_settings(JOB_RETRY_DELAY=60)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_enqueue_and_run(self):
+        """Задача ставится с аргументами и выполняется воркером."""
+        job = record.delay('пост', suffix='!')
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(jobs.claim('w1', 10), [job.id])
+        self.assertEqual(jobs.claim('w2', 10), [])
+        self.assertTrue(jobs.run(job.id, 'w1'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 1))
+        self.assertEqual(CALLS, ['пост!'])
+
+    def test_idempotency_key(self):
+        """Повтор с тем же ключом возвращает уже поставленную задачу."""
+        first = jobs.enqueue(record, ['a'], key='record:a')
+        second = jobs.enqueue(record, ['a'], key='record:a')
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_scheduled(self):
+        """Отложенная задача не берётся до своего времени."""
+        job = jobs.enqueue(record, ['later'], countdown=60)
+        self.assertEqual(jobs.claim('w1', 10), [])
+        Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        self.assertEqual(jobs.claim('w1', 10), [job.id])
+
+    def test_retry_with_backoff_then_fail(self):
+        """Ошибка - повтор позже, после max_attempts - failed."""
+        job = explode.delay()
+        jobs.claim('w1', 1)
+        self.assertFalse(jobs.run(job.id, 'w1'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('Ошибка задачи', job.last_error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=29))
+        self.assertEqual(jobs.claim('w1', 1), [])
+        Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        jobs.claim('w1', 1)
+        jobs.run(job.id, 'w1')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_visibility_timeout(self):
+        """Задачу зависшего воркера берёт другой, исход пишет он."""
+        job = record.delay('x')
+        jobs.claim('w1', 1)
+        Job.objects.filter(id=job.id).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(jobs.claim('w2', 1), [job.id])
+        jobs.run(job.id, 'w1')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), (Job.RUNNING, 'w2'))
+        jobs.run(job.id, 'w2')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 2))
+
+    def test_expired_without_attempts_fails(self):
+        """Задача, исчерпавшая попытки по таймауту, не берётся снова."""
+        job = explode.delay()
+        for worker in ('w1', 'w2'):
+            self.assertEqual(jobs.claim(worker, 1), [job.id])
+            Job.objects.filter(id=job.id).update(
+                locked_until=timezone.now() - timedelta(seconds=1)
+            )
+        self.assertEqual(jobs.claim('w3', 1), [])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertEqual(job.last_error, jobs.EXPIRED_ERROR)
+        self.assertIsNotNone(job.finished)
+
+    def test_rolled_back_request_has_no_job(self):
+        """Задача ставится в транзакции вызывающего кода."""
+        try:
+            with transaction.atomic():
+                record.delay('lost')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertFalse(Job.objects.exists())
+
+    def test_prune(self):
+        """Старые выполненные задачи удаляются, остальные - нет."""
+        old = record.delay('old')
+        record.delay('queued')
+        Job.objects.filter(id=old.id).update(
+            status=Job.DONE, finished=timezone.now() - timedelta(days=30)
+        )
+        self.assertEqual(jobs.prune(), 1)
+        self.assertEqual(Job.objects.count(), 1)
+
+
+class WorkerCommandTests(TransactionTestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_thread_pool_drains_queue(self):
+        """worker --once выполняет готовые задачи и выходит."""
+        for number in range(6):
+            record.delay(str(number))
+        explode.delay()
+        jobs.enqueue(record, ['later'], countdown=60)
+        out = StringIO()
+        # В тестовой базе в памяти писатели блокируют друг друга без
+        # ожидания, поэтому задачи идут по одной
+        call_command('worker', once=True, concurrency=1, stdout=out)
+        self.assertEqual(sorted(CALLS), [str(number) for number in range(6)])
+        self.assertIn('Выполнено: 6, с ошибкой: 1', out.getvalue())
+        self.assertEqual(
+            Job.objects.filter(status=Job.QUEUED).count(), 2
+        )
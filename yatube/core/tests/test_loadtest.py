@@ -0,0 +1,43 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+from core.management.commands.loadtest import percentile
+from posts.models import Comment, Follow, Post
+
+User = get_user_model()
+
+
+class LoadTestCommandTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username='author')
+        self.reader = User.objects.create(username='reader')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(text='Тестовый текст поста', author=self.author)
+
+    def test_percentile(self):
+        """Перцентиль считается по ближайшему рангу."""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_in_process_run(self):
+        """Прогон в процессе выполняет смесь без ошибок и пишет отчёт."""
+        out = StringIO()
+        call_command(
+            'loadtest', requests=40, concurrency=1, users=1,
+            mix='index=1,follow=1,post=1,comment=1', stdout=out,
+        )
+        report = out.getvalue()
+        total = report.splitlines()[-1].split()
+        self.assertEqual(total[:2], ['total', '40'])
+        self.assertEqual(total[3], '0.0%')
+        self.assertTrue(
+            Post.objects.filter(author=self.reader).exists()
+            or Comment.objects.filter(author=self.reader).exists()
+        )
@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import mail as outbox
+from core.models import Job, OutgoingEmail
+
+User = get_user_model()
+
+
+class CountingBackend(EmailBackend):
+    """locmem, который считает соединения и не принимает адреса fail@."""
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        for message in messages:
+            if any(address.startswith('fail@') for address in message.to):
+                raise ConnectionError('Сервер отклонил письмо')
+        return super().send_messages(messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.OutboxBackend',
+    OUTBOX_BACKEND='core.tests.test_mail.CountingBackend',
+    OUTBOX_BATCH_SIZE=2,
+    OUTBOX_MAX_ATTEMPTS=2,
+)
+class OutboxTests(TestCase):
+    def setUp(self):
+        CountingBackend.opened = 0
+
+    def test_password_reset_queued(self):
+        """Сброс пароля кладёт письмо в исходящие и не отправляет его."""
+        User.objects.create(username='reader', email='reader@example.com')
+        response = self.client.post(
+            reverse('users:password_reset'),
+            {'email': 'reader@example.com'},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutgoingEmail.objects.count(), 1)
+        self.assertTrue(Job.objects.filter(
+            name='core.tasks.deliver_outbox', key__startswith='outbox:'
+        ).exists())
+        self.assertEqual(outbox.deliver(), 1)
+        self.assertEqual(mail.outbox[0].to, ['reader@example.com'])
+        self.assertEqual(
+            OutgoingEmail.objects.get().status, OutgoingEmail.SENT
+        )
+
+    def test_batches_over_one_connection(self):
+        """Пачки писем уходят через одно соединение, доставка - одна."""
+        for number in range(5):
+            mail.send_mail(
+                'Тема', 'Текст', None, ['user%d@example.com' % number]
+            )
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertEqual(outbox.deliver(), 5)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(CountingBackend.opened, 1)
+        self.assertEqual(outbox.deliver(), 0)
+
+    def test_failed_message_retried(self):
+        """Ошибка - повтор позже, после OUTBOX_MAX_ATTEMPTS - failed."""
+        mail.send_mail('Тема', 'Текст', None, ['fail@example.com'])
+        mail.send_mail('Тема', 'Текст', None, ['ok@example.com'])
+        self.assertEqual(outbox.deliver(), 1)
+        failed = OutgoingEmail.objects.get(to='["fail@example.com"]')
+        self.assertEqual(failed.status, OutgoingEmail.QUEUED)
+        self.assertIn('Сервер отклонил', failed.last_error)
+        self.assertGreater(failed.send_after, timezone.now())
+        # Повтор запланирован отдельной задачей на время письма
+        self.assertEqual(Job.objects.count(), 2)
+        OutgoingEmail.objects.filter(id=failed.id).update(
+            send_after=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(outbox.deliver(), 0)
+        failed.refresh_from_db()
+        self.assertEqual(
+            (failed.status, failed.attempts), (OutgoingEmail.FAILED, 2)
+        )
@@ -0,0 +1,96 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+
+from core import metrics
+
+User = get_user_model()
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.metrics_dir = tempfile.mkdtemp()
+        cls.metrics_settings = override_settings(METRICS_DIR=cls.metrics_dir)
+        cls.metrics_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.metrics_settings.disable()
+        shutil.rmtree(cls.metrics_dir, ignore_errors=True)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.staff_client = Client()
+        self.staff_client.force_login(
+            User.objects.create(username='staff', is_staff=True)
+        )
+        cache.clear()
+
+    def test_metrics_summed_across_processes(self):
+        """Счётчики всех процессов суммируются, гистограмма заполнена."""
+        other = 'yatube_requests_total{status="200",view="posts:index"}'
+        path = os.path.join(self.metrics_dir, 'metrics_1.json')
+        with open(path, 'w') as file:
+            json.dump({other: 1000}, file)
+        self.guest_client.get('/')
+        response = self.staff_client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        lines = response.content.decode().splitlines()
+        total = [line for line in lines if line.startswith(other)][0]
+        self.assertGreater(float(total.split()[-1]), 1000)
+        self.assertIn(
+            '# TYPE yatube_request_duration_seconds histogram', lines
+        )
+        buckets = [
+            line for line in lines
+            if line.startswith('yatube_request_duration_seconds_bucket')
+            and 'view="posts:index"' in line
+        ]
+        self.assertTrue(buckets[-1].startswith(
+            'yatube_request_duration_seconds_bucket{le="+Inf"'
+        ))
+        self.assertTrue(any(
+            line.startswith('yatube_cache_hit_ratio{view="posts:index"}')
+            for line in lines
+        ))
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_need_staff_or_token(self):
+        """Адрес 127.0.0.1 (так приходит всё через прокси) не пропуск."""
+        response = self.guest_client.get('/metrics', REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, 403)
+        response = self.guest_client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer wrong'
+        )
+        self.assertEqual(response.status_code, 403)
+        response = self.guest_client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_dead_process_archived(self):
+        """Файл умершего процесса переносится в архив и считается раз."""
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        process.wait()
+        key = 'yatube_requests_total{status="200",view="posts:group"}'
+        path = os.path.join(
+            self.metrics_dir, 'metrics_%d_1.json' % process.pid
+        )
+        with open(path, 'w') as file:
+            json.dump({key: 7}, file)
+        self.assertEqual(metrics.collect()[key], 7)
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(
+            os.path.join(self.metrics_dir, metrics.ARCHIVE_FILE)
+        ))
+        self.assertEqual(metrics.collect()[key], 7)
@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.profiler import make_token
+
+PROFILER_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+@override_settings(PROFILER_DIR=PROFILER_DIR)
+class ProfilerTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create(
+            username='staff', is_staff=True, is_superuser=True
+        )
+        cls.user = User.objects.create(username='HasNoName')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(PROFILER_DIR, ignore_errors=True)
+
+    def setUp(self):
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def test_staff_request_profiled(self):
+        """Запрос сотрудника с токеном сохраняет pstats и collapsed."""
+        response = self.staff_client.get('/', {'profile': make_token('/')})
+        name = response['X-Yatube-Profile']
+        self.assertIn('posts_index', name)
+        for extension in ('pstats', 'collapsed', 'json'):
+            self.assertTrue(os.path.exists(
+                os.path.join(PROFILER_DIR, '%s.%s' % (name, extension))
+            ))
+        response = self.staff_client.get(reverse('profiles'))
+        self.assertContains(response, name)
+        response = self.staff_client.get(
+            reverse('profile_download', args=[name, 'pstats'])
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_profiling_requires_staff_and_valid_token(self):
+        """Без прав сотрудника или с чужим токеном профиля нет."""
+        response = self.authorized_client.get(
+            '/', {'profile': make_token('/')}
+        )
+        self.assertFalse(response.has_header('X-Yatube-Profile'))
+        response = self.staff_client.get(
+            '/', HTTP_X_YATUBE_PROFILE=make_token('/follow/')
+        )
+        self.assertFalse(response.has_header('X-Yatube-Profile'))
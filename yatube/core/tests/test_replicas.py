@@ -0,0 +1,68 @@
+import shutil
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username='author')
+        Post.objects.create(text='Старый пост', author=self.author)
+        # Копия базы в файле - реплика, застывшая на этом моменте
+        self.replica_dir = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        path = str(Path(self.replica_dir) / 'replica.sqlite3')
+        connection.ensure_connection()
+        with sqlite3.connect(path) as replica:
+            connection.connection.backup(replica)
+        connections.databases['replica'] = dict(
+            connection.settings_dict, NAME=path
+        )
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def tearDown(self):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.databases['replica']
+        shutil.rmtree(self.replica_dir, ignore_errors=True)
+
+    def test_reads_go_to_replica(self):
+        """Читающие представления берут данные с реплики."""
+        Post.objects.create(text='Пост после копии', author=self.author)
+        url = reverse('posts:profile', kwargs={'username': 'author'})
+        response = self.guest_client.get(url)
+        self.assertContains(response, 'Старый пост')
+        self.assertNotContains(response, 'Пост после копии')
+
+    def test_read_your_writes(self):
+        """После записи автор читает из основной базы, другие - нет."""
+        response = self.author_client.post(
+            reverse('posts:post_create'), data={'text': 'Свежий пост'}
+        )
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        url = reverse('posts:profile', kwargs={'username': 'author'})
+        self.assertContains(self.author_client.get(url), 'Свежий пост')
+        self.assertNotContains(self.guest_client.get(url), 'Свежий пост')
+
+    def test_pin_expires(self):
+        """Закрепление за основной базой кончается через заданное время."""
+        with override_settings(REPLICA_PIN_SECONDS=0):
+            self.author_client.post(
+                reverse('posts:post_create'), data={'text': 'Свежий пост'}
+            )
+        url = reverse('posts:profile', kwargs={'username': 'author'})
+        self.assertNotContains(self.author_client.get(url), 'Свежий пост')
@@ -0,0 +1,85 @@
+import json
+import re
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.management.commands.slow_queries import fingerprint
+
+User = get_user_model()
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+class SlowQueryLogTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.log_dir = tempfile.mkdtemp()
+        cls.log = Path(cls.log_dir) / 'slow_queries.jsonl'
+        cls.log_settings = override_settings(SLOW_QUERY_LOG=str(cls.log))
+        cls.log_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.log_settings.disable()
+        shutil.rmtree(cls.log_dir, ignore_errors=True)
+
+    def setUp(self):
+        self.log.write_text('')
+        cache.clear()
+
+    def read_log(self):
+        return [json.loads(line) for line in self.log.read_text().splitlines()]
+
+    def test_view_queries_logged_with_plan(self):
+        """Запросы представлений попадают в журнал с планом и стеком."""
+        Client().get('/profile/nobody/')
+        User.objects.count()
+        records = self.read_log()
+        self.assertTrue(records)
+        self.assertEqual(
+            {record['view'] for record in records}, {'posts.views.profile'}
+        )
+        self.assertTrue(records[0]['plan'])
+        self.assertTrue(
+            any('posts/views.py' in frame for frame in records[0]['stack'])
+        )
+
+    def test_connection_opened_inside_request(self):
+        """Подключение, открытое посреди запроса, не теряет журнал."""
+        client = Client()
+        for _ in range(3):
+            connection.close()
+            logged = len(self.read_log())
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get('/profile/nobody/')
+            number = re.search(
+                r'db;[^,]*desc="(\d+) queries"', response['Server-Timing']
+            ).group(1)
+            self.assertEqual(int(number), len(queries))
+            self.assertGreater(len(self.read_log()), logged)
+            self.assertEqual(connection.execute_wrappers, [])
+
+    def test_command_ranks_fingerprints(self):
+        """Команда группирует запросы по отпечатку."""
+        Client().get('/profile/nobody/')
+        Client().get('/profile/somebody/')
+        out = StringIO()
+        call_command('slow_queries', stdout=out)
+        self.assertIn('1. count=2', out.getvalue())
+        self.assertIn('posts.views.profile', out.getvalue())
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (1, 2) AND s = 'x'"),
+            fingerprint('SELECT * FROM t WHERE id IN (%s)  AND s = %s'),
+        )
@@ -0,0 +1,105 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TestCase, override_settings
+
+from core.sqlite import call_with_retry, save_with_retry
+from posts.models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x00\x00\x00\x21'
+    b'\xf9\x04\x01\x00\x00\x00\x00\x2c\x00\x00\x00\x00\x01\x00'
+    b'\x01\x00\x00\x02\x00\x3b'
+)
+
+
+@override_settings(SQLITE_LOCK_RETRY_DELAY=0, MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SQLiteTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    @override_settings(SQLITE_PRAGMAS=settings.SQLITE_PRODUCTION_PRAGMAS)
+    def test_pragmas_applied(self):
+        """PRAGMA профиля production действуют на новом подключении."""
+        wrapper = DatabaseWrapper(dict(
+            connection.settings_dict,
+            NAME=os.path.join(TEMP_MEDIA_ROOT, 'pragmas.sqlite3'),
+        ))
+        self.addCleanup(wrapper.close)
+        with wrapper.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -64000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+
+    def test_retry_on_lock(self):
+        """Блокировка базы повторяется, другие ошибки - нет."""
+        calls = []
+
+        def locked_twice():
+            calls.append(1)
+            if len(calls) < 3:
+                raise OperationalError('database is locked')
+            return 'ok'
+
+        self.assertEqual(call_with_retry(locked_twice), 'ok')
+        self.assertEqual(len(calls), 3)
+
+        def broken():
+            calls.append(1)
+            raise OperationalError('no such table: posts_post')
+
+        calls.clear()
+        with self.assertRaises(OperationalError):
+            call_with_retry(broken)
+        self.assertEqual(len(calls), 1)
+
+    @override_settings(SQLITE_LOCK_RETRIES=1)
+    def test_retries_limited(self):
+        """После SQLITE_LOCK_RETRIES повторов ошибка пробрасывается."""
+        calls = []
+
+        def always_locked():
+            calls.append(1)
+            raise OperationalError('database is locked')
+
+        with self.assertRaises(OperationalError):
+            call_with_retry(always_locked)
+        self.assertEqual(len(calls), 2)
+
+    def test_save_with_retry_stores_file_once(self):
+        """Повтор записи не сохраняет загруженный файл второй раз."""
+        post = Post(
+            text='Пост',
+            author=get_user_model().objects.create(username='author'),
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        save = Post.save
+        calls = []
+
+        def locked_once(instance, *args, **kwargs):
+            calls.append(1)
+            if len(calls) == 1:
+                raise OperationalError('database is locked')
+            return save(instance, *args, **kwargs)
+
+        with mock.patch.object(Post, 'save', locked_once):
+            save_with_retry(post)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(
+            os.listdir(os.path.join(TEMP_MEDIA_ROOT, 'posts')), ['small.gif']
+        )
+        self.assertEqual(Post.objects.get().image.name, 'posts/small.gif')
@@ -0,0 +1,33 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+
+class ServerTimingTests(TestCase):
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    @override_settings(PAGE_CACHE_TIMEOUTS={'index_page': 60})
+    def test_server_timing_header(self):
+        """Ответ содержит Server-Timing с БД, шаблонами и кэшем."""
+        response = self.guest_client.get('/')
+        header = response['Server-Timing']
+        self.assertRegex(header, r'total;dur=[\d.]+')
+        self.assertRegex(header, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertRegex(header, r'tpl;dur=[\d.]+;desc="\d+ renders"')
+        self.assertIn('cache;desc="hit=0 miss=1"', header)
+        response = self.guest_client.get('/')
+        self.assertIn('hit=1 miss=0', response['Server-Timing'])
+
+    def test_query_count(self):
+        """Число запросов в заголовке совпадает с реальным."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get('/group/missing/')
+        number = re.search(
+            r'db;[^,]*desc="(\d+) queries"', response['Server-Timing']
+        ).group(1)
+        self.assertEqual(int(number), len(queries))
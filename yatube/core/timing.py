@@ -0,0 +1,106 @@
+"""Учёт времени текущего запроса: БД, шаблоны, миниатюры, кэш.
+
+Счётчики живут в contextvar и заполняются, только пока запрос обёрнут
+ServerTimingMiddleware; вне запроса все хуки сводятся к одной проверке.
+"""
+import contextvars
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.template.base import Template
+from sorl.thumbnail.base import ThumbnailBackend
+
+_current = contextvars.ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        # вид работы -> [количество, секунды]
+        self.timings = defaultdict(lambda: [0, 0.0])
+        self.counters = defaultdict(int)
+        self.template_depth = 0
+
+    def add(self, name, seconds):
+        timing = self.timings[name]
+        timing[0] += 1
+        timing[1] += seconds
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.started
+
+
+def start():
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def count(name, number=1):
+    stats = _current.get()
+    if stats is not None:
+        stats.counters[name] += number
+
+
+@contextmanager
+def timed(name):
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.add(name, time.perf_counter() - started)
+
+
+def query_timer(execute, sql, params, many, context):
+    """Обёртка для connection.execute_wrapper()."""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add('db', time.perf_counter() - started)
+
+
+def instrument_templates():
+    """Считает время отрисовки шаблонов верхнего уровня.
+
+    Вложенные include не учитываются отдельно, чтобы не считать их дважды.
+    """
+    original_render = Template.render
+
+    def render(self, context):
+        stats = _current.get()
+        if stats is None or stats.template_depth:
+            return original_render(self, context)
+        stats.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return original_render(self, context)
+        finally:
+            stats.template_depth -= 1
+            stats.add('tpl', time.perf_counter() - started)
+
+    Template.render = render
+
+
+class TimedThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl-thumbnail, учитывающий время работы с миниатюрами."""
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        with timed('thumb'):
+            return super().get_thumbnail(file_, geometry_string, **options)
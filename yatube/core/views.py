@@ -1,5 +1,17 @@
+import hmac
+import os
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib import admin
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseForbidden
+)
 from django.shortcuts import render
 
+from . import metrics as yatube_metrics
+from . import profiler
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +27,53 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def has_metrics_token(request):
+    token = settings.METRICS_TOKEN
+    if not token:
+        return False
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    return hmac.compare_digest(header.encode(), b'Bearer ' + token.encode())
+
+
+def metrics(request):
+    """Метрики для Prometheus: сотрудникам или по METRICS_TOKEN."""
+    if not (request.user.is_staff or has_metrics_token(request)):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        yatube_metrics.render(yatube_metrics.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+def profiles(request):
+    """Страница админки: последние профили и ссылка для профилирования."""
+    view = request.GET.get('view') or None
+    path = request.GET.get('path', '').strip()
+    profile_link = None
+    if path.startswith('/'):
+        token = profiler.make_token(path.split('?', 1)[0])
+        separator = '&' if '?' in path else '?'
+        profile_link = path + separator + urlencode({'profile': token})
+    context = dict(
+        admin.site.each_context(request),
+        title='Профили запросов',
+        profiles=profiler.recent_profiles(view),
+        views=sorted({
+            profile['view'] for profile in profiler.recent_profiles()
+        }),
+        view=view,
+        path=path,
+        profile_link=profile_link,
+    )
+    return render(request, 'core/profiles.html', context)
+
+
+def profile_download(request, name, extension):
+    path = profiler.profile_file(name, extension)
+    if path is None:
+        raise Http404
+    return FileResponse(
+        open(path, 'rb'), as_attachment=True, filename=os.path.basename(path)
+    )
@@ -1,20 +1,67 @@
 from django.contrib import admin
 
-from .models import Comment, Follow, Group, Post
+from . import deletion
+from .models import Comment, Deletion, Follow, Group, Post, PostImport
 
+# delete_selected удалил бы выбранное каскадом в одной транзакции
+admin.site.disable_action('delete_selected')
 
-class PostAdmin(admin.ModelAdmin):
+
+def delete_in_background(delete):
+    def action(modeladmin, request, queryset):
+        for obj in queryset:
+            delete(obj)
+        modeladmin.message_user(
+            request, 'Скрыто: %d, удаление идёт в фоне.' % len(queryset)
+        )
+    action.short_description = 'Удалить в фоне'
+    return action
+
+
+class BackgroundDeleteMixin:
+    """Удаление со страницы объекта тоже идёт в фоне, см. deletion.py.
+
+    background_delete - staticmethod из deletion: delete_post и т. п.
+    """
+    background_delete = None
+
+    def delete_model(self, request, obj):
+        self.background_delete(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.background_delete(obj)
+
+    def get_deleted_objects(self, objs, request):
+        # Страница подтверждения не обходит каскад: у плодовитого автора
+        # это те же минуты, что и само удаление
+        perms_needed = set()
+        if not self.has_delete_permission(request):
+            perms_needed.add(self.opts.verbose_name)
+        return (
+            [str(obj) for obj in objs],
+            {self.opts.verbose_name_plural: len(objs)},
+            perms_needed,
+            [],
+        )
+
+
+class PostAdmin(BackgroundDeleteMixin, admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
     list_editable = ('group',)
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
+    actions = [delete_in_background(deletion.delete_post)]
+    background_delete = staticmethod(deletion.delete_post)
 
 
-class GroupAdmin(admin.ModelAdmin):
+class GroupAdmin(BackgroundDeleteMixin, admin.ModelAdmin):
     list_display = ('title', 'description',)
     search_fields = ('title', 'description',)
     list_filter = ('title',)
+    actions = [delete_in_background(deletion.delete_group)]
+    background_delete = staticmethod(deletion.delete_group)
 
 
 class FollowAdmin(admin.ModelAdmin):
@@ -27,7 +74,22 @@ class CommentAdmin(admin.ModelAdmin):
     list_filter = ('author',)
 
 
+class DeletionAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'kind', 'object_id', 'done', 'total', 'created',
+                    'finished')
+    list_filter = ('kind',)
+    empty_value_display = '-пусто-'
+
+
+class PostImportAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'source', 'done', 'imported', 'skipped', 'created',
+                    'finished')
+    empty_value_display = '-пусто-'
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Follow, FollowAdmin)
 admin.site.register(Comment, CommentAdmin)
+admin.site.register(Deletion, DeletionAdmin)
+admin.site.register(PostImport, PostImportAdmin)
@@ -3,3 +3,16 @@ from django.apps import AppConfig
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from django.core.signals import request_finished
+        from django.db.models.signals import post_delete, post_save
+
+        # Регистрируем персональные фрагменты страниц.
+        from . import fragments  # noqa: F401
+        from . import digests, recommendations, view_counts
+        from .models import Follow, Post
+        post_save.connect(recommendations.follow_changed, sender=Follow)
+        post_delete.connect(recommendations.follow_changed, sender=Follow)
+        request_finished.connect(view_counts.flush_if_due)
+        post_save.connect(digests.new_post, sender=Post)
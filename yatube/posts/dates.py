@@ -0,0 +1,19 @@
+"""Даты постов и комментариев при массовой вставке (seed, import_posts)."""
+from contextlib import contextmanager
+
+from .models import Comment, Post
+
+
+@contextmanager
+def explicit_dates():
+    """Позволяет задать pub_date и created вместо auto_now_add."""
+    fields = [
+        Post._meta.get_field('pub_date'), Comment._meta.get_field('created')
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
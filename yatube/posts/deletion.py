@@ -0,0 +1,193 @@
+"""Удаление пользователей, постов и групп в фоне.
+
+Обычный delete() каскадом удаляет (или обнуляет ссылки) во всех
+связанных строках одной транзакцией; у плодовитого автора это блокирует
+базу на минуты. Здесь удаление в два шага.
+
+Сразу, в запросе: объект скрывается. Пост и группа получают hidden=True
+и пропадают из менеджера objects; пользователь становится неактивным (не
+войдёт, профиль не откроется), его посты скрываются одним UPDATE.
+
+Потом, в задаче purge_deleted: связанные строки удаляются или обнуляются
+пачками по PURGE_BATCH_SIZE, каждая пачка - своя короткая транзакция,
+между ними пишут остальные. Строки под удаляемыми постами и
+комментариями (комментарии, отметки, счётчики, активность) удаляются
+своими шагами раньше постов, и delete() поста ничего не каскадит.
+Картинки постов и их миниатюры удаляются после фиксации пачки постов.
+Ход работы - в Deletion.done из Deletion.total. Задача работает не
+дольше PURGE_JOB_SECONDS и, если не закончила, ставит себя в очередь
+снова.
+"""
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from sorl.thumbnail import delete as delete_image
+
+from core import jobs
+from core.proxy import purge
+from core.sqlite import call_with_retry
+
+from . import likes
+from .models import (Comment, Deletion, Follow, Group, Like, LikeCount,
+                     Post, PostActivity, Recommendation, User)
+
+
+def schedule(kind, object_id):
+    from .tasks import purge_deleted
+
+    deletion = Deletion.objects.create(kind=kind, object_id=object_id)
+    deletion.total = sum(queryset.count() for queryset, _ in steps(deletion))
+    deletion.save(update_fields=['total'])
+    jobs.enqueue(purge_deleted, [deletion.id])
+    return deletion
+
+
+def delete_user(user):
+    user.is_active = False
+    user.save(update_fields=['is_active'])
+    Post.all_objects.filter(author=user).update(hidden=True)
+    purge('index', 'author-%d' % user.id)
+    return schedule(Deletion.USER, user.id)
+
+
+def delete_post(post):
+    Post.all_objects.filter(id=post.id).update(hidden=True)
+    keys = ['index', 'post-%d' % post.id, 'author-%d' % post.author_id]
+    if post.group_id:
+        keys.append('group-%d' % post.group_id)
+    purge(*keys)
+    return schedule(Deletion.POST, post.id)
+
+
+def delete_group(group):
+    Group.all_objects.filter(id=group.id).update(hidden=True)
+    purge('group-%d' % group.id)
+    return schedule(Deletion.GROUP, group.id)
+
+
+def delete_rows(queryset):
+    queryset.delete()
+
+
+def delete_likes(queryset):
+    """Удаляет отметки, вычитая их из счётчиков."""
+    for kind in likes.KINDS:
+        field = kind + '_id'
+        counts = queryset.filter(**{field + '__isnull': False}).values(
+            field).annotate(number=Count('id')).values_list(field, 'number')
+        for object_id, number in counts:
+            likes.add(kind, object_id, -number)
+    queryset.delete()
+
+
+def delete_posts(queryset):
+    """Удаляет посты, а после фиксации - их картинки и миниатюры.
+
+    Пачка выполняется в call_with_retry: файлы, удалённые до фиксации,
+    пропали бы у постов, которые откат транзакции вернул.
+    """
+    images = [
+        post.image
+        for post in queryset.exclude(image='').only('id', 'image')
+    ]
+    queryset.delete()
+    if images:
+        transaction.on_commit(lambda: delete_images(images))
+
+
+def delete_images(images):
+    for image in images:
+        delete_image(image)
+
+
+def unset_group(queryset):
+    queryset.update(group=None)
+
+
+def lookup(prefix, conditions):
+    return Q(**{prefix + field: value for field, value in conditions.items()})
+
+
+def dependent_steps(posts, comments=None):
+    """Шаги для строк под постами и комментариями, которые удаляются.
+
+    posts и comments - условия на пост и комментарий, {'author_id': 1}.
+    """
+    comments = comments or {}
+    doomed_comments = lookup('post__', posts) | lookup('', comments)
+    liked = (
+        lookup('post__', posts) | lookup('comment__post__', posts)
+        | lookup('comment__', comments)
+    )
+    return [
+        (Like.objects.filter(liked), delete_rows),
+        (LikeCount.objects.filter(liked), delete_rows),
+        (Comment.objects.filter(doomed_comments), delete_rows),
+        (PostActivity.objects.filter(lookup('post__', posts)), delete_rows),
+    ]
+
+
+def steps(deletion):
+    """Шаги удаления: (что осталось обработать, что с ним сделать)."""
+    object_id = deletion.object_id
+    if deletion.kind == Deletion.USER:
+        return [
+            (Like.objects.filter(user_id=object_id), delete_likes),
+            *dependent_steps(
+                {'author_id': object_id}, {'author_id': object_id}
+            ),
+            (Follow.objects.filter(
+                Q(user_id=object_id) | Q(author_id=object_id)
+            ), delete_rows),
+            (Recommendation.objects.filter(
+                Q(user_id=object_id) | Q(author_id=object_id)
+            ), delete_rows),
+            (Post.all_objects.filter(author_id=object_id), delete_posts),
+            (User.objects.filter(id=object_id), delete_rows),
+        ]
+    if deletion.kind == Deletion.POST:
+        return [
+            *dependent_steps({'id': object_id}),
+            (Post.all_objects.filter(id=object_id), delete_posts),
+        ]
+    return [
+        (Post.all_objects.filter(group_id=object_id), unset_group),
+        (Group.all_objects.filter(id=object_id), delete_rows),
+    ]
+
+
+def run_batch(queryset, action):
+    """Одна пачка шага в своей транзакции; возвращает её размер."""
+    def batch():
+        ids = list(
+            queryset.order_by().values_list('id', flat=True)
+            [:settings.PURGE_BATCH_SIZE]
+        )
+        if ids:
+            action(queryset.model._base_manager.filter(id__in=ids))
+        return len(ids)
+    return call_with_retry(batch)
+
+
+def run(deletion, seconds):
+    """Обрабатывает пачки до конца или до seconds секунд.
+
+    True, если удаление закончено.
+    """
+    started = time.monotonic()
+    for queryset, action in steps(deletion):
+        while True:
+            if time.monotonic() - started >= seconds:
+                return False
+            processed = run_batch(queryset, action)
+            if not processed:
+                break
+            Deletion.objects.filter(id=deletion.id).update(
+                done=deletion.done + processed
+            )
+            deletion.done += processed
+    Deletion.objects.filter(id=deletion.id).update(finished=timezone.now())
+    return True
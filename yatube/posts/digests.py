@@ -0,0 +1,171 @@
+"""Рассылка подписчикам о новых постах.
+
+Новый пост не отправляет письма сам: он ставит задачу send_digests на
+конец окна DIGEST_INTERVAL (одна задача на окно, см. core/jobs.py).
+Задача собирает все посты, появившиеся после прошлой рассылки, и
+отправляет каждому подписчику с адресом одно письмо со всеми новыми
+постами его авторов - а не письмо на каждый пост. Письма уходят через
+исходящие (core/mail.py).
+
+Новый пост - это id после прошлой рассылки и дата публикации не раньше
+её времени минус DIGEST_INTERVAL (Digest.since). Вторая половина
+условия отсекает старые посты, загруженные import_posts со своими
+датами: их id новые, но письма о них не нужны.
+
+Задача выполняется хотя бы раз, но может и дважды, поэтому рассылка
+сначала забирает окно постов строкой Digest (окно уникально), а потом
+шлёт письма пачками по SEND_CHUNK: каждая пачка - своя транзакция
+вместе с продвижением Digest.last_user_id. Второй запуск того же окна
+продолжает с первого подписчика без письма и не шлёт писем дважды.
+"""
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from core import jobs
+
+from .models import Digest, Follow, Post
+
+# Столько писем складывается в исходящие за раз
+SEND_CHUNK = 500
+
+
+def schedule():
+    from .tasks import send_digests
+
+    interval = settings.DIGEST_INTERVAL
+    window = int(time.time() // interval) + 1
+    jobs.enqueue(
+        send_digests, key='digest:%d' % window,
+        run_at=datetime.fromtimestamp(window * interval, timezone.utc),
+    )
+
+
+def new_post(sender, instance, created, raw=False, **kwargs):
+    """Обработчик post_save поста."""
+    if created and not raw:
+        schedule()
+
+
+def claim():
+    """Незаконченная рассылка или новое окно постов; None - слать нечего."""
+    digest = Digest.objects.filter(finished__isnull=True).order_by(
+        'id'
+    ).first()
+    if digest is not None:
+        return digest
+    previous = Digest.objects.order_by('-last_post_id').first()
+    after_post_id = previous.last_post_id if previous else 0
+    # В самый первый раз рассылаются посты за DIGEST_INTERVAL
+    since = (previous.created if previous else timezone.now()) - timedelta(
+        seconds=settings.DIGEST_INTERVAL
+    )
+    last_post_id = Post.objects.filter(
+        id__gt=after_post_id, pub_date__gte=since
+    ).aggregate(last=Max('id'))['last']
+    if last_post_id is None:
+        return None
+    try:
+        with transaction.atomic():
+            return Digest.objects.create(
+                after_post_id=after_post_id,
+                last_post_id=last_post_id,
+                since=since,
+            )
+    except IntegrityError:
+        # Окно уже забрал параллельный запуск
+        return None
+
+
+def new_posts(digest):
+    """Посты окна рассылки digest по авторам."""
+    posts = Post.objects.filter(
+        id__gt=digest.after_post_id,
+        id__lte=digest.last_post_id,
+        pub_date__gte=digest.since,
+    ).order_by('id')
+    by_author = defaultdict(list)
+    for post in posts.values(
+        'id', 'author_id', 'author__username', 'excerpt'
+    ):
+        post['author'] = post['author__username']
+        by_author[post['author_id']].append(post)
+    return by_author
+
+
+def message(username, email, posts):
+    posts.sort(key=lambda post: post['id'], reverse=True)
+    limit = settings.DIGEST_MAX_POSTS
+    body = render_to_string('posts/email/digest.txt', {
+        'username': username,
+        'posts': posts[:limit],
+        'more': max(0, len(posts) - limit),
+        'site_url': settings.SITE_URL,
+    })
+    return EmailMessage(
+        'Новые посты: %d' % len(posts), body, to=[email]
+    )
+
+
+def recipients(by_author, after_user_id=0):
+    """(id, имя, адрес, посты) подписчиков с адресом после after_user_id.
+
+    Неактивные подписчики и авторы (удаляются в фоне) пропускаются.
+    """
+    follows = Follow.objects.filter(
+        author_id__in=list(by_author), user_id__gt=after_user_id,
+        user__is_active=True, author__is_active=True,
+    ).exclude(user__email='').order_by('user_id').values_list(
+        'user_id', 'user__username', 'user__email', 'author_id'
+    )
+    current, posts = None, []
+    for user_id, username, email, author_id in follows.iterator():
+        if current is not None and current[0] != user_id:
+            yield current + (posts,)
+            posts = []
+        current = (user_id, username, email)
+        posts.extend(by_author[author_id])
+    if current is not None:
+        yield current + (posts,)
+
+
+def chunks(rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == SEND_CHUNK:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def send():
+    """Рассылает письма о новых постах; возвращает число писем."""
+    digest = claim()
+    if digest is None:
+        return 0
+    connection = get_connection()
+    sent = 0
+    for chunk in chunks(recipients(new_posts(digest), digest.last_user_id)):
+        messages = [message(*row[1:]) for row in chunk]
+        with transaction.atomic():
+            # Условие на курсор: пачку мог разослать параллельный запуск
+            if not Digest.objects.filter(
+                id=digest.id, last_user_id=digest.last_user_id
+            ).update(
+                last_user_id=chunk[-1][0],
+                recipients=F('recipients') + len(messages),
+            ):
+                return sent
+            sent += connection.send_messages(messages)
+        digest.last_user_id = chunk[-1][0]
+    Digest.objects.filter(id=digest.id).update(finished=timezone.now())
+    return sent
@@ -0,0 +1,73 @@
+"""Выгрузка постов, комментариев, подписок и групп в CSV или JSONL.
+
+Строки читаются из базы кусками (iterator(chunk_size=EXPORT_CHUNK_SIZE))
+и сразу кодируются в куски текста, поэтому память не зависит от размера
+таблицы. Один генератор служит и команде export, и
+StreamingHttpResponse в представлении для персонала.
+"""
+import csv
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Follow, Group, Post
+
+DATASETS = {
+    'posts': (
+        Post, ('id', 'author_id', 'group_id', 'pub_date', 'views', 'text'),
+    ),
+    'comments': (
+        Comment, ('id', 'post_id', 'author_id', 'created', 'text'),
+    ),
+    'follows': (Follow, ('id', 'user_id', 'author_id')),
+    'groups': (Group, ('id', 'slug', 'title', 'description')),
+}
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+# Столько строк кодируется в один кусок вывода
+LINES_PER_CHUNK = 500
+
+
+class Echo:
+    """Файл для csv.writer, который возвращает строку, а не пишет её."""
+
+    def write(self, value):
+        return value
+
+
+def rows(dataset, chunk_size=None):
+    model, fields = DATASETS[dataset]
+    return model.objects.order_by('id').values_list(*fields).iterator(
+        chunk_size=chunk_size or settings.EXPORT_CHUNK_SIZE
+    )
+
+
+def csv_lines(fields, values):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in values:
+        yield writer.writerow(row)
+
+
+def jsonl_lines(fields, values):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in values:
+        yield encoder.encode(dict(zip(fields, row))) + '\n'
+
+
+def stream(dataset, fmt, chunk_size=None):
+    """Куски текста выгрузки dataset в формате fmt."""
+    _, fields = DATASETS[dataset]
+    encode = csv_lines if fmt == 'csv' else jsonl_lines
+    chunk = []
+    for line in encode(fields, rows(dataset, chunk_size)):
+        chunk.append(line)
+        if len(chunk) == LINES_PER_CHUNK:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
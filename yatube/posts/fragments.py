@@ -0,0 +1,66 @@
+from core import fragments
+
+from . import likes, recommendations
+from .forms import CommentForm
+from .models import Follow
+
+
+@fragments.register('follow_button', 'posts/includes/follow_button.html')
+def follow_button(request, author, author_id):
+    known = getattr(request, 'known_follows', {})
+    if author in known:
+        following = known[author]
+    else:
+        following = request.user.is_authenticated and (
+            Follow.objects.filter(
+                user=request.user, author_id=author_id).exists()
+        )
+    return {
+        'author_username': author,
+        'following': following,
+    }
+
+
+@fragments.register('comment_form', 'posts/includes/comment_form.html')
+def comment_form(request, post_id):
+    return {
+        'post_id': post_id,
+        'form': CommentForm(),
+    }
+
+
+@fragments.register('like_batch', 'posts/includes/like_batch.html')
+def like_batch(request, kind, batch=''):
+    """Ничего не выводит: узнаёт отметки зрителя для кнопок списка.
+
+    Ставится один раз перед кнопками like_button списка; batch - их id.
+    """
+    likes.prefetch(request, kind, batch)
+    return {}
+
+
+@fragments.register('like_button', 'posts/includes/like_button.html')
+def like_button(request, kind, object_id, count):
+    return {
+        'kind': kind,
+        'object_id': object_id,
+        'count': count,
+        'liked': likes.is_liked(request, kind, object_id),
+    }
+
+
+@fragments.register('suggestions', 'posts/includes/suggestions.html')
+def suggestions(request, author_id=None):
+    """На кого подписаться: в ленте и в собственном профиле."""
+    user = request.user
+    if not user.is_authenticated or (
+        author_id is not None and int(author_id) != user.id
+    ):
+        return {'suggestions': []}
+    return {'suggestions': recommendations.for_user(user)}
+
+
+@fragments.register('switcher', 'posts/includes/switcher.html')
+def switcher(request, active=''):
+    """Вкладки лент; active - index, follow или trending."""
+    return {'active': active}
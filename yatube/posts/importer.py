@@ -0,0 +1,239 @@
+"""Массовая загрузка постов со старой платформы (manage.py import_posts).
+
+Файл - JSONL или CSV, запись - пост с полями text, author (username),
+group (slug, необязательно), pub_date (ISO 8601, необязательно) и image
+(путь к картинке от каталога картинок, необязательно). Авторы и группы
+ищутся в словарях, прочитанных из базы один раз, посты вставляются
+пачками через bulk_create. Картинки проверяются, копируются в
+MEDIA_ROOT и получают миниатюру лент в пуле процессов: это вычисления,
+и потоки упёрлись бы в GIL.
+
+Пачка постов и контрольная точка (PostImport.done) пишутся в одной
+транзакции, поэтому прерванная загрузка продолжается с первой
+незаписанной пачки и не вставляет посты дважды. Записи с неверным
+JSON, неизвестным автором или группой и с негодной картинкой
+пропускаются с причиной в отчёте.
+
+post_save не отправляется, а рассылка (digests.py) берёт только посты с
+датой публикации после прошлой рассылки, поэтому о старых постах
+подписчики писем не получат. Запись без pub_date получает текущее время
+и в рассылку попадёт.
+"""
+import csv
+import json
+import logging
+import os
+from itertools import islice
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.validators import validate_image_file_extension
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from PIL import Image
+from sorl.thumbnail import get_thumbnail
+
+from core.proxy import purge
+from core.sqlite import call_with_retry
+
+from .dates import explicit_dates
+from .models import Group, Post, PostImport, User
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('jsonl', 'csv')
+
+# Поля записи: в JSONL, как и в CSV, каждое - строка
+FIELDS = ('text', 'author', 'group', 'pub_date', 'image')
+
+# Миниатюра лент и страницы поста, как в шаблонах
+THUMBNAIL = ('960x339', {'crop': 'center', 'upscale': True})
+
+
+def format_of(path):
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    return extension if extension in FORMATS else 'jsonl'
+
+
+class InvalidRecord(ValueError):
+    """Запись, которую не удалось прочитать; build() её пропускает."""
+
+
+def parse_line(line):
+    try:
+        record = json.loads(line)
+    except ValueError as error:
+        return InvalidRecord('неверный JSON: %s' % error)
+    if not isinstance(record, dict):
+        return InvalidRecord('запись - не объект JSON')
+    return record
+
+
+def read(path, fmt):
+    """Записи файла по одной, не читая его целиком.
+
+    Нечитаемая строка JSONL отдаётся как InvalidRecord, чтобы нумерация
+    записей и контрольная точка не сбились.
+    """
+    with open(path, encoding='utf-8', newline='') as file:
+        if fmt == 'csv':
+            yield from csv.DictReader(file)
+            return
+        for line in file:
+            if line.strip():
+                yield parse_line(line)
+
+
+def batches(records, size):
+    records = iter(records)
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+
+def load_maps():
+    """Словари username -> id автора и slug -> id группы."""
+    return {
+        'author': dict(
+            User.objects.values_list('username', 'id').iterator()
+        ),
+        'group': dict(Group.objects.values_list('slug', 'id').iterator()),
+    }
+
+
+def parse_date(value):
+    if not value:
+        return timezone.now()
+    moment = parse_datetime(value)
+    if moment is None:
+        raise ValueError('неверная дата %r' % value)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def build(record, maps):
+    """Пост без картинки из записи; ValueError с причиной, если нельзя."""
+    if isinstance(record, InvalidRecord):
+        raise record
+    for field in FIELDS:
+        value = record.get(field)
+        if value is not None and not isinstance(value, str):
+            raise ValueError('поле %s - не строка: %r' % (field, value))
+    text = (record.get('text') or '').strip()
+    if not text:
+        raise ValueError('пустой текст')
+    author = maps['author'].get(record.get('author'))
+    if author is None:
+        raise ValueError('нет автора %r' % record.get('author'))
+    group = None
+    if record.get('group'):
+        group = maps['group'].get(record['group'])
+        if group is None:
+            raise ValueError('нет группы %r' % record['group'])
+    post = Post(
+        text=text,
+        author_id=author,
+        group_id=group,
+        pub_date=parse_date(record.get('pub_date')),
+    )
+    post.set_excerpt()
+    return post
+
+
+def image_name(checkpoint, number, path):
+    """Имя картинки в хранилище; одно и то же при повторе пачки."""
+    return 'posts/import/%d/%d_%s' % (
+        checkpoint.id, number, os.path.basename(path)
+    )
+
+
+def ingest_image(args):
+    """Проверяет картинку, кладёт в хранилище и строит миниатюру.
+
+    Выполняется в процессе пула; возвращает (имя, ошибка или '').
+    """
+    source, name = args
+    try:
+        validate_image_file_extension(File(None, name))
+        with Image.open(source) as image:
+            image.verify()
+        if not default_storage.exists(name):
+            with open(source, 'rb') as file:
+                name = default_storage.save(name, File(file))
+    # Любая ошибка картинки пропускает одну запись, а не всю загрузку
+    except Exception as error:
+        return name, repr(error)
+    geometry, options = THUMBNAIL
+    try:
+        get_thumbnail(name, geometry, **options)
+    except Exception:
+        # Не беда: миниатюру построит первый показ страницы
+        logger.warning('Миниатюра %s не построена', name, exc_info=True)
+    return name, ''
+
+
+def import_batch(checkpoint, records, maps, images_dir, map_images):
+    """Загружает пачку записей, продвигая контрольную точку.
+
+    Возвращает [(номер записи, причина пропуска)].
+    """
+    skipped = []
+    built = []
+    for number, record in enumerate(records, checkpoint.done + 1):
+        try:
+            built.append((number, build(record, maps), record.get('image')))
+        except ValueError as error:
+            skipped.append((number, str(error)))
+    with_images = [item for item in built if item[2]]
+    results = map_images(ingest_image, [
+        (os.path.join(images_dir, path), image_name(checkpoint, number, path))
+        for number, _, path in with_images
+    ])
+    failed = set()
+    for (number, post, _), (name, error) in zip(with_images, results):
+        if error:
+            skipped.append((number, error))
+            failed.add(number)
+        else:
+            post.image = name
+    posts = [post for number, post, _ in built if number not in failed]
+
+    def write():
+        with explicit_dates():
+            Post.objects.bulk_create(posts)
+        PostImport.objects.filter(id=checkpoint.id).update(
+            done=checkpoint.done + len(records),
+            imported=F('imported') + len(posts),
+            skipped=F('skipped') + len(skipped),
+        )
+        keys = set()
+        for post in posts:
+            keys.add('author-%d' % post.author_id)
+            if post.group_id:
+                keys.add('group-%d' % post.group_id)
+        purge('index', *sorted(keys))
+
+    call_with_retry(write)
+    checkpoint.done += len(records)
+    checkpoint.imported += len(posts)
+    checkpoint.skipped += len(skipped)
+    return sorted(skipped)
+
+
+def run(checkpoint, records, batch_size, images_dir, map_images=map):
+    """Загружает записи после контрольной точки; отдаёт пропуски пачек.
+
+    map_images - map или imap пула процессов для ingest_image.
+    """
+    maps = load_maps()
+    records = islice(records, checkpoint.done, None)
+    for batch in batches(records, batch_size):
+        yield from import_batch(
+            checkpoint, batch, maps, images_dir, map_images
+        )
+    checkpoint.finished = timezone.now()
+    checkpoint.save(update_fields=['finished'])
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from posts.export import DATASETS, FORMATS, stream
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты, комментарии, подписки или группы.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(DATASETS))
+        parser.add_argument(
+            '--format', choices=sorted(FORMATS), default='csv',
+        )
+        parser.add_argument(
+            '--output', default='-',
+            help='Файл выгрузки; по умолчанию - стандартный вывод.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=None,
+            help='Сколько строк читать из базы за раз.',
+        )
+
+    def handle(self, *args, **options):
+        chunks = stream(
+            options['dataset'], options['format'], options['chunk_size']
+        )
+        if options['output'] == '-':
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as file:
+            for chunk in chunks:
+                file.write(chunk)
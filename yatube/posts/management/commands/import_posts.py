@@ -0,0 +1,77 @@
+import multiprocessing
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from posts import importer
+from posts.models import PostImport
+
+
+class Command(BaseCommand):
+    help = 'Загружает посты из JSONL или CSV, см. posts/importer.py.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Файл с постами.')
+        parser.add_argument(
+            '--format', choices=importer.FORMATS,
+            help='Формат файла; по умолчанию - по расширению.',
+        )
+        parser.add_argument(
+            '--images',
+            help='Каталог картинок; по умолчанию - каталог файла.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.IMPORT_BATCH_SIZE,
+            help='Сколько постов вставлять одной транзакцией.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Процессы для картинок; 1 - без пула.',
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать файл сначала, забыв контрольную точку.',
+        )
+
+    def handle(self, *args, **options):
+        source = os.path.abspath(options['source'])
+        if not os.path.isfile(source):
+            raise CommandError('Нет файла %s' % source)
+        if options['restart']:
+            PostImport.objects.filter(source=source).delete()
+        checkpoint, _ = PostImport.objects.get_or_create(source=source)
+        if checkpoint.done:
+            self.stdout.write(
+                'Продолжение с записи %d' % (checkpoint.done + 1)
+            )
+        records = importer.read(
+            source, options['format'] or importer.format_of(source)
+        )
+        images_dir = options['images'] or os.path.dirname(source)
+        started = time.perf_counter()
+        if options['workers'] <= 1:
+            self.report(importer.run(
+                checkpoint, records, options['batch_size'], images_dir
+            ))
+        else:
+            # Процессы пула открывают свои соединения с базой
+            connections.close_all()
+            with multiprocessing.Pool(options['workers']) as pool:
+                self.report(importer.run(
+                    checkpoint, records, options['batch_size'], images_dir,
+                    pool.imap,
+                ))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            'Записей: %d, загружено: %d, пропущено: %d за %.1f с' % (
+                checkpoint.done, checkpoint.imported, checkpoint.skipped,
+                elapsed,
+            )
+        )
+
+    def report(self, skipped):
+        for number, reason in skipped:
+            self.stderr.write('Запись %d пропущена: %s' % (number, reason))
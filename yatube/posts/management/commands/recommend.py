@@ -0,0 +1,55 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.models import PendingRecommendation
+from posts.recommendations import FollowGraph, store
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации авторов по графу подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pending', action='store_true',
+            help='Только пользователи, чьи подписки изменились.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=10000,
+            help='Сколько подписок читать из базы за раз.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько пользователей записывать одной транзакцией.',
+        )
+        parser.add_argument('--limit', type=int, default=None)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        # Отметки, поставленные во время расчёта, доживут до следующего
+        pending = list(
+            PendingRecommendation.objects.values_list('user_id', flat=True)
+        )
+        if options['pending'] and not pending:
+            self.stdout.write('Нет пользователей для пересчёта.')
+            return
+        graph = FollowGraph(options['chunk_size'])
+        if options['pending']:
+            user_ids = sorted(pending)
+        else:
+            user_ids = sorted(set(graph.following) | set(pending))
+        limit = options['limit'] or settings.RECOMMEND_LIMIT
+        batch_size = options['batch_size']
+        rows = 0
+        for start in range(0, len(user_ids), batch_size):
+            rows += store(graph, user_ids[start:start + batch_size], limit)
+        for start in range(0, len(pending), batch_size):
+            PendingRecommendation.objects.filter(
+                user_id__in=pending[start:start + batch_size]
+            ).delete()
+        self.stdout.write(
+            'Пользователей: %d, рекомендаций: %d, %.1f с' % (
+                len(user_ids), rows, time.perf_counter() - started
+            )
+        )
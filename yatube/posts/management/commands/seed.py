@@ -0,0 +1,335 @@
+"""Заполнение базы синтетическими данными в масштабе продакшена.
+
+Данные детерминированы: каждый кусок строк генерируется своим
+random.Random(seed, таблица, номер куска), поэтому результат не зависит
+от числа процессов. Даты отсчитываются от постоянного END, а не от
+текущего времени, хеш пароля заранее посчитан: один seed на пустой базе
+даёт одни и те же строки байт в байт. id задаются явно, внешние ключи
+считаются без запросов к базе.
+"""
+import multiprocessing
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections
+from django.db.models import Max
+from django.utils import timezone
+
+from posts.dates import explicit_dates
+from posts.models import Comment, Follow, Group, Post, User
+
+# Точки масштаба для сравнимых замеров
+SCALES = {
+    'tiny': dict(
+        users=100, groups=5, posts=1000, comments=2000, follows=1000),
+    'small': dict(
+        users=1000, groups=20, posts=20000, comments=50000, follows=20000),
+    'medium': dict(
+        users=10000, groups=50, posts=200000, comments=500000,
+        follows=200000),
+    'large': dict(
+        users=100000, groups=200, posts=2000000, comments=5000000,
+        follows=2000000),
+    'xl': dict(
+        users=1000000, groups=1000, posts=10000000, comments=20000000,
+        follows=10000000),
+}
+TABLES = ('users', 'groups', 'posts', 'comments', 'follows')
+MODELS = {
+    'users': User,
+    'groups': Group,
+    'posts': Post,
+    'comments': Comment,
+    'follows': Follow,
+}
+# Показатель степенного распределения: чем больше, тем сильнее перекос
+SKEW = 3
+# Попыток случайного выбора на одну подписку, см. make_follows
+SAMPLE_ATTEMPTS = 20
+# Посты выходят сериями по BURST_SIZE в среднем
+BURST_SIZE = 5
+HISTORY_DAYS = 365
+# Конец истории засеянных данных
+END = datetime(2026, 1, 1, tzinfo=timezone.utc)
+# make_password('seed-password', salt='yatubeseed'): хеш медленный
+# намеренно, а со случайной солью он разный при каждом запуске
+PASSWORD = (
+    'pbkdf2_sha256$150000$yatubeseed$'
+    'WlDPgNec9grvchc+tH61uhaarlpVtwIFiRQQMl5u0nA='
+)
+WORDS = (
+    'лето зима город река дом друг время утро вечер книга музыка дорога '
+    'море небо кот собака работа отпуск фото новости идея проект'
+).split()
+FIRST_NAMES = ('Анна', 'Иван', 'Мария', 'Пётр', 'Ольга', 'Лев', 'Нина')
+LAST_NAMES = ('Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Соколов')
+
+
+def skewed(rng, count):
+    """Индекс в [0, count) с перекосом к началу: малая доля объектов
+    получает большую часть связей (подписчиков, постов, комментариев)."""
+    return int(count * rng.random() ** SKEW)
+
+
+def sentence(rng, low, high):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+def make_users(plan, rng, start, stop):
+    return [
+        User(
+            id=plan['first']['users'] + number,
+            username='seed_user_%d' % number,
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES),
+            password=PASSWORD,
+            date_joined=plan['epoch'],
+        )
+        for number in range(start, stop)
+    ]
+
+
+def make_groups(plan, rng, start, stop):
+    return [
+        Group(
+            id=plan['first']['groups'] + number,
+            title='Группа %d' % number,
+            slug='seed-group-%d' % number,
+            description=sentence(rng, 5, 20),
+        )
+        for number in range(start, stop)
+    ]
+
+
+def make_posts(plan, rng, start, stop):
+    counts, first = plan['counts'], plan['first']
+    posts = []
+    burst_left = 0
+    for number in range(start, stop):
+        if burst_left == 0:
+            moment = rng.random() * plan['span']
+            burst_left = 1 + int(rng.expovariate(1 / BURST_SIZE))
+        burst_left -= 1
+        moment += rng.expovariate(1 / 300)
+        group = None
+        if counts['groups'] and rng.random() < 0.7:
+            group = first['groups'] + skewed(rng, counts['groups'])
+        image = ''
+        if plan['images'] and rng.random() < plan['image_fraction']:
+            image = rng.choice(plan['images'])
+        post = Post(
+            id=first['posts'] + number,
+            text=sentence(rng, 5, 200),
+            author_id=first['users'] + skewed(rng, counts['users']),
+            group_id=group,
+            image=image,
+            pub_date=plan['epoch'] + timedelta(seconds=moment),
+        )
+        post.set_excerpt()
+        posts.append(post)
+    return posts
+
+
+def make_comments(plan, rng, start, stop):
+    counts, first = plan['counts'], plan['first']
+    return [
+        Comment(
+            id=first['comments'] + number,
+            text=sentence(rng, 2, 40),
+            post_id=first['posts'] + skewed(rng, counts['posts']),
+            author_id=first['users'] + rng.randrange(counts['users']),
+            created=plan['epoch'] + timedelta(
+                seconds=rng.random() * plan['span']
+            ),
+        )
+        for number in range(start, stop)
+    ]
+
+
+def make_follows(plan, rng, start, stop):
+    """Подписки кусков подписчиков: [start, stop) - номера подписчиков.
+
+    Каждый подписан примерно на follows / users разных авторов, авторы
+    выбираются со степенным перекосом. Когда нужны почти все авторы,
+    перекошенная выборка редко попадает в хвост: после SAMPLE_ATTEMPTS
+    попыток на подписку недостающие авторы берутся по порядку.
+    """
+    counts, first = plan['counts'], plan['first']
+    users, total = counts['users'], counts['follows']
+    follows = []
+    for follower in range(start, stop):
+        wanted = total * (follower + 1) // users - total * follower // users
+        wanted = min(wanted, users - 1)
+        authors = set()
+        for _ in range(wanted * SAMPLE_ATTEMPTS):
+            if len(authors) == wanted:
+                break
+            author = skewed(rng, users)
+            if author != follower:
+                authors.add(author)
+        for author in range(users):
+            if len(authors) == wanted:
+                break
+            if author != follower:
+                authors.add(author)
+        follows.extend(
+            Follow(
+                user_id=first['users'] + follower,
+                author_id=first['users'] + author,
+            )
+            for author in sorted(authors)
+        )
+    return follows
+
+
+def check_counts(counts):
+    """Строкам со внешними ключами нужны строки, на которые ссылаться."""
+    needs = {
+        'posts': ('users',),
+        'comments': ('posts', 'users'),
+        'follows': ('users',),
+    }
+    for table, targets in needs.items():
+        for target in targets:
+            if counts[table] and not counts[target]:
+                raise CommandError('%s без %s: нечем заполнить ссылки' % (
+                    table, target
+                ))
+    if counts['follows'] and counts['users'] < 2:
+        raise CommandError('Для подписок нужны хотя бы два пользователя')
+
+
+FACTORIES = {
+    'users': make_users,
+    'groups': make_groups,
+    'posts': make_posts,
+    'comments': make_comments,
+    'follows': make_follows,
+}
+
+
+def make_chunk(plan, table, start, stop):
+    rng = random.Random('%s:%s:%d' % (plan['seed'], table, start))
+    return FACTORIES[table](plan, rng, start, stop)
+
+
+def insert_chunk(args):
+    plan, table, start, stop = args
+    model = MODELS[table]
+    with explicit_dates():
+        objects = make_chunk(plan, table, start, stop)
+        # Django 2.2 не ограничивает явный batch_size пределом бэкенда
+        batch_size = min(plan['batch_size'], connection.ops.bulk_batch_size(
+            model._meta.concrete_fields, objects
+        ))
+        model.objects.bulk_create(objects, batch_size=batch_size)
+    return len(objects)
+
+
+def make_images(count, seed):
+    """Несколько картинок-образцов в MEDIA_ROOT/posts/seed/."""
+    from PIL import Image
+
+    rng = random.Random('%s:images' % seed)
+    directory = os.path.join(settings.MEDIA_ROOT, 'posts', 'seed')
+    os.makedirs(directory, exist_ok=True)
+    names = []
+    for number in range(count):
+        name = 'posts/seed/seed_%d.jpg' % number
+        color = tuple(rng.randrange(256) for _ in range(3))
+        Image.new('RGB', (1200, 800), color).save(
+            os.path.join(settings.MEDIA_ROOT, name)
+        )
+        names.append(name)
+    return names
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу синтетическими пользователями, постами и т.д.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', choices=SCALES, default='tiny',
+            help='Точка масштаба; отдельные числа ниже её переопределяют.',
+        )
+        for table in TABLES:
+            parser.add_argument('--%s' % table, type=int)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Число процессов (для SQLite имеет смысл 1).',
+        )
+        parser.add_argument(
+            '--images', type=float, default=0,
+            help='Доля постов с картинкой, от 0 до 1.',
+        )
+
+    def handle(self, *args, **options):
+        counts = dict(SCALES[options['scale']])
+        for table in TABLES:
+            if options[table] is not None:
+                counts[table] = options[table]
+        check_counts(counts)
+        plan = self.make_plan(counts, options)
+        for table in TABLES:
+            started = time.perf_counter()
+            rows = self.insert(plan, table, options['workers'])
+            elapsed = time.perf_counter() - started
+            self.stdout.write('%s: %d строк за %.1f с (%d строк/с)' % (
+                table, rows, elapsed, rows / elapsed if elapsed else 0
+            ))
+        self.reset_sequences()
+
+    def make_plan(self, counts, options):
+        first = {
+            table: (
+                MODELS[table]._base_manager.aggregate(last=Max('id'))['last']
+                or 0
+            ) + 1
+            for table in TABLES
+        }
+        epoch = END - timedelta(days=HISTORY_DAYS)
+        images = []
+        if options['images'] > 0:
+            images = make_images(8, options['seed'])
+        return {
+            'seed': options['seed'],
+            'counts': counts,
+            'first': first,
+            'batch_size': options['batch_size'],
+            'epoch': epoch,
+            'span': (END - epoch).total_seconds(),
+            'images': images,
+            'image_fraction': options['images'],
+        }
+
+    def insert(self, plan, table, workers):
+        # Подписки режутся по подписчикам, остальное - по строкам
+        total = plan['counts']['users' if table == 'follows' else table]
+        step = plan['batch_size']
+        if table == 'follows' and plan['counts']['users']:
+            per_user = plan['counts']['follows'] / plan['counts']['users']
+            step = max(1, int(step / max(per_user, 1)))
+        chunks = [
+            (plan, table, start, min(start + step, total))
+            for start in range(0, total, step)
+        ]
+        if workers <= 1:
+            return sum(map(insert_chunk, chunks))
+        connections.close_all()
+        with multiprocessing.Pool(workers) as pool:
+            return sum(pool.imap_unordered(insert_chunk, chunks))
+
+    def reset_sequences(self):
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), list(MODELS.values())
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
@@ -0,0 +1,22 @@
+# Generated by Django 2.2.16 on 2026-10-19 11:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_likes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Digest',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('last_post_id', models.PositiveIntegerField()),
+                ('recipients', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 2.2.16 on 2026-10-19 11:32
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+EXCERPT_LENGTH = 300
+BATCH_SIZE = 1000
+
+
+def fill_excerpts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.only('id', 'text').order_by('id')
+    batch = []
+    for post in posts.iterator(chunk_size=BATCH_SIZE):
+        post.excerpt = Truncator(post.text).chars(EXCERPT_LENGTH)
+        post.truncated = post.excerpt != post.text
+        batch.append(post)
+        if len(batch) == BATCH_SIZE:
+            Post.objects.bulk_update(batch, ['excerpt', 'truncated'])
+            batch = []
+    Post.objects.bulk_update(batch, ['excerpt', 'truncated'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_post_import'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=300),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='truncated',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
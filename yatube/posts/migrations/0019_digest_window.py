@@ -0,0 +1,35 @@
+# Generated by Django 2.2.16 on 2026-10-19 12:40
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def finish_sent(apps, schema_editor):
+    Digest = apps.get_model('posts', 'Digest')
+    Digest.objects.update(finished=F('created'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_post_excerpt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='digest',
+            name='after_post_id',
+            field=models.PositiveIntegerField(null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='digest',
+            name='finished',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='digest',
+            name='last_user_id',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(finish_sent, migrations.RunPython.noop),
+    ]
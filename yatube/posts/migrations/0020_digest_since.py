@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-19 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_digest_window'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='digest',
+            name='since',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
@@ -1,18 +1,37 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils.text import Truncator
 
 
 User = get_user_model()
 
+# Длина выдержки поста в лентах, символов
+EXCERPT_LENGTH = 300
+
+
+class VisibleManager(models.Manager):
+    """Менеджер по умолчанию: без скрытого до удаления, см. deletion.py."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(hidden=False)
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    # Группа удаляется в фоне и уже не видна
+    hidden = models.BooleanField(default=False, editable=False)
+
+    objects = VisibleManager()
+    all_objects = models.Manager()
 
     def __str__(self):
         return self.title
 
+    class Meta:
+        base_manager_name = 'all_objects'
+
 
 class Post(models.Model):
     text = models.TextField()
@@ -34,12 +53,44 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    # Копится в памяти процессов и сбрасывается пачками, см. view_counts.py
+    views = models.PositiveIntegerField(default=0, editable=False)
+    # Пост (или весь автор) удаляется в фоне и уже не виден
+    hidden = models.BooleanField(default=False, editable=False)
+    # Начало текста для лент: они не читают text (defer), см. set_excerpt
+    excerpt = models.CharField(
+        max_length=EXCERPT_LENGTH, blank=True, editable=False
+    )
+    # Текст не уместился в выдержку: в ленте нужна ссылка «Читать дальше»
+    truncated = models.BooleanField(default=False, editable=False)
+
+    objects = VisibleManager()
+    all_objects = models.Manager()
 
     def __str__(self):
         return self.text
 
+    def set_excerpt(self):
+        """Пересчитывает выдержку; bulk_create сам её не вызовет."""
+        self.excerpt = Truncator(self.text).chars(EXCERPT_LENGTH)
+        self.truncated = self.excerpt != self.text
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        text_changes = 'text' not in self.get_deferred_fields() and (
+            update_fields is None or 'text' in update_fields
+        )
+        if text_changes:
+            self.set_excerpt()
+            if update_fields is not None:
+                kwargs['update_fields'] = {
+                    *update_fields, 'excerpt', 'truncated'
+                }
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ['-pub_date']
+        base_manager_name = 'all_objects'
 
 
 class Comment(models.Model):
@@ -68,3 +119,157 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='following'
     )
+
+
+class Recommendation(models.Model):
+    """Автор, которого стоит предложить пользователю (команда recommend)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommendations'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['-score']
+        indexes = [models.Index(fields=['user', '-score'])]
+
+
+class PendingRecommendation(models.Model):
+    """Пользователь, чьи подписки изменились после расчёта рекомендаций.
+
+    Просто id, без внешнего ключа: отметку ставит и каскадное удаление
+    подписок при удалении самого пользователя.
+    """
+    user_id = models.IntegerField(primary_key=True)
+
+
+class PostActivity(models.Model):
+    """Комментарии и просмотры поста за один интервал, см. trending.py."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='activity'
+    )
+    # Номер интервала: время в секундах // TRENDING_BUCKET_SECONDS
+    bucket = models.IntegerField(db_index=True)
+    comments = models.PositiveIntegerField(default=0)
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('post', 'bucket')
+
+
+class Like(models.Model):
+    """Отметка «нравится» на посте или комментарии, одна на пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='likes'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='likes',
+        blank=True,
+        null=True,
+    )
+    comment = models.ForeignKey(
+        Comment,
+        on_delete=models.CASCADE,
+        related_name='likes',
+        blank=True,
+        null=True,
+    )
+
+    class Meta:
+        unique_together = (('user', 'post'), ('user', 'comment'))
+
+
+class LikeCount(models.Model):
+    """Часть счётчика отметок, см. likes.py.
+
+    Счётчик поста или комментария разбит на LIKE_SHARDS строк, и
+    одновременные отметки прибавляют к разным строкам, а не ждут друг
+    друга на одной. Отдельная строка после снятия отметок может уйти
+    в минус, верна только сумма.
+    """
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='like_counts',
+        blank=True,
+        null=True,
+    )
+    comment = models.ForeignKey(
+        Comment,
+        on_delete=models.CASCADE,
+        related_name='like_counts',
+        blank=True,
+        null=True,
+    )
+    shard = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = (('post', 'shard'), ('comment', 'shard'))
+
+
+class Digest(models.Model):
+    """Рассылка подписчикам о новых постах, см. digests.py."""
+    created = models.DateTimeField(auto_now_add=True)
+    # Окно рассылки - посты с id больше after_post_id и до last_post_id
+    # включительно и с датой публикации не раньше since. Окно начинается
+    # там, где кончилось прошлое, поэтому уникальность не даёт двум
+    # запускам разослать одни и те же посты.
+    after_post_id = models.PositiveIntegerField(null=True, unique=True)
+    last_post_id = models.PositiveIntegerField()
+    since = models.DateTimeField(null=True)
+    # Подписчики с id до этого включительно уже получили письмо
+    last_user_id = models.PositiveIntegerField(default=0)
+    recipients = models.PositiveIntegerField(default=0)
+    finished = models.DateTimeField(null=True, blank=True)
+
+
+class Deletion(models.Model):
+    """Фоновое удаление пользователя, поста или группы, см. deletion.py."""
+    USER = 'user'
+    POST = 'post'
+    GROUP = 'group'
+    KINDS = (
+        (USER, 'Пользователь'),
+        (POST, 'Пост'),
+        (GROUP, 'Группа'),
+    )
+
+    kind = models.CharField(max_length=10, choices=KINDS)
+    object_id = models.PositiveIntegerField()
+    # Строк удалить или изменить: оценка при постановке и сделано
+    total = models.PositiveIntegerField(default=0)
+    done = models.PositiveIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return '%s %d: %d/%d' % (self.kind, self.object_id, self.done,
+                                 self.total)
+
+
+class PostImport(models.Model):
+    """Загрузка постов из файла командой import_posts, см. importer.py."""
+    # Абсолютный путь файла: по нему повторный запуск находит свою запись
+    source = models.CharField(max_length=500, unique=True)
+    # Контрольная точка: столько записей файла уже обработано
+    done = models.PositiveIntegerField(default=0)
+    imported = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return '%s: %d' % (self.source, self.done)
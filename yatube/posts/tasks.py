@@ -0,0 +1,29 @@
+from django.conf import settings
+
+from core.jobs import task
+
+from . import deletion, digests, trending
+from .models import Deletion
+
+
+@task
+def send_digests():
+    """Письма подписчикам о новых постах, см. posts/digests.py."""
+    digests.send()
+
+
+@task
+def purge_deleted(deletion_id):
+    """Удаляет скрытое пачками, см. posts/deletion.py."""
+    pending = Deletion.objects.get(id=deletion_id)
+    if pending.finished:
+        return
+    if not deletion.run(pending, settings.PURGE_JOB_SECONDS):
+        # Продолжение - новой задачей, чтобы не пережить visibility timeout
+        purge_deleted.delay(deletion_id)
+
+
+@task
+def prune_activity():
+    """Удаляет активность вне окна популярного, см. posts/trending.py."""
+    trending.prune()
@@ -0,0 +1,13 @@
+from django import template
+
+register = template.Library()
+
+
+@register.simple_tag
+def id_batch(objects):
+    """id объектов через запятую для фрагмента like_batch.
+
+    {% id_batch page_obj as batch %}
+    {% fragment 'like_batch' kind='post' batch=batch %}
+    """
+    return ','.join(str(obj.id) for obj in objects)
@@ -0,0 +1,86 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+PAGE_CACHE_TIMEOUTS = {
+    'index_page': 60,
+    'group_page': 60,
+    'profile_page': 60,
+    'post_page': 60,
+}
+
+
+@override_settings(PAGE_CACHE_TIMEOUTS=PAGE_CACHE_TIMEOUTS)
+class SharedPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.post = Post.objects.create(
+            text='Тестовый текст поста',
+            author=cls.author,
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        cache.clear()
+
+    def test_index_shared_between_users(self):
+        """Общий рендер главной отдаётся всем, шапка у каждого своя."""
+        self.guest_client.get(reverse('posts:index'))
+        Post.objects.create(text='Новый пост', author=self.author)
+        response = self.reader_client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Новый пост')
+        self.assertContains(response, 'Пользователь: reader')
+        self.assertNotContains(response, '<!--fragment:')
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Пользователь: author')
+
+    def test_pinned_visitor_skips_cache(self):
+        """После записи посетитель не получает рендер из кэша."""
+        self.guest_client.get(reverse('posts:index'))
+        Post.objects.create(text='Новый пост', author=self.author)
+        self.author_client.cookies[settings.REPLICA_PIN_COOKIE] = (
+            '%.3f' % (time.time() + 10)
+        )
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Новый пост')
+        response = self.reader_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Новый пост')
+
+    def test_profile_follow_button_per_user(self):
+        """Кнопка подписки в общем рендере профиля зависит от зрителя."""
+        url = reverse('posts:profile', kwargs={'username': self.author})
+        unfollow = reverse(
+            'posts:profile_unfollow', kwargs={'username': self.author}
+        )
+        response = self.guest_client.get(url)
+        self.assertNotContains(response, unfollow)
+        response = self.reader_client.get(url)
+        self.assertContains(response, unfollow)
+
+    def test_comment_expires_post_page(self):
+        """Новый комментарий сразу виден на странице поста."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        self.reader_client.get(url)
+        self.reader_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            data={'text': 'Свежий комментарий'},
+        )
+        response = self.guest_client.get(url)
+        self.assertContains(response, 'Свежий комментарий')
+        self.assertNotContains(response, 'Добавить комментарий')
@@ -0,0 +1,207 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from core.models import Job
+from posts import deletion, likes
+from posts.models import (Comment, Deletion, Follow, Group, Like, LikeCount,
+                          Post, PostActivity)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT, PURGE_BATCH_SIZE=2, PAGE_CACHE_TIMEOUTS={}
+)
+class DeletionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.author = User.objects.create(username='prolific')
+        cls.reader = User.objects.create(username='reader')
+        cls.posts = [
+            Post.objects.create(
+                text='Пост %d' % number, author=cls.author, group=cls.group
+            )
+            for number in range(5)
+        ]
+        cls.other = Post.objects.create(text='Чужой пост', author=cls.reader)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Comment.objects.create(
+            text='Комментарий', post=cls.other, author=cls.author
+        )
+        Comment.objects.create(
+            text='Ответ', post=cls.posts[0], author=cls.reader
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_user_hidden_then_purged_in_batches(self):
+        """Автор скрыт сразу, строки удаляются пачками с прогрессом."""
+        likes.like(self.author, self.other)
+        likes.like(self.reader, self.posts[1])
+        likes.like(self.reader, Comment.objects.get(post=self.other))
+        PostActivity.objects.create(post=self.posts[2], bucket=1, views=1)
+        pending = deletion.delete_user(self.author)
+        self.assertFalse(Post.objects.filter(author=self.author).exists())
+        self.assertEqual(self.client.get(reverse(
+            'posts:profile', kwargs={'username': 'prolific'}
+        )).status_code, 404)
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(list(response.context['page_obj']), [self.other])
+        # Отметка автора; две отметки и два счётчика под его постом и
+        # комментарием; его комментарий и комментарий к его посту;
+        # активность, подписка, 5 постов, пользователь
+        self.assertEqual(pending.total, 15)
+        self.assertTrue(Job.objects.filter(
+            name='posts.tasks.purge_deleted'
+        ).exists())
+        self.assertFalse(deletion.run(pending, 0))
+        self.assertTrue(deletion.run(pending, 60))
+        pending.refresh_from_db()
+        self.assertEqual(pending.done, 15)
+        self.assertIsNotNone(pending.finished)
+        self.assertFalse(User.objects.filter(username='prolific').exists())
+        self.assertFalse(Post.all_objects.filter(
+            id__in=[post.id for post in self.posts]).exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Like.objects.exists())
+        self.assertEqual(sum(LikeCount.objects.filter(
+            post=self.other).values_list('count', flat=True)), 0)
+        self.assertFalse(LikeCount.objects.exclude(post=self.other).exists())
+        self.assertFalse(PostActivity.objects.exists())
+
+    def test_posts_delete_nothing_else(self):
+        """Строки под постом удаляются своими шагами до поста."""
+        post = self.posts[0]
+        likes.like(self.reader, post)
+        pending = deletion.delete_post(post)
+        # Отметка, счётчик, комментарий и сам пост
+        self.assertEqual(pending.total, 4)
+        *dependent, (posts, delete_posts) = deletion.steps(pending)
+        for queryset, action in dependent:
+            while deletion.run_batch(queryset, action):
+                pass
+        # Каскаду поста удалять уже нечего
+        self.assertFalse(Like.objects.exists())
+        self.assertFalse(LikeCount.objects.filter(post=post).exists())
+        self.assertFalse(Comment.objects.filter(post=post).exists())
+        self.assertEqual(deletion.run_batch(posts, delete_posts), 1)
+        self.assertFalse(Post.all_objects.filter(id=post.id).exists())
+
+    def test_group_posts_kept(self):
+        """Группа пропадает сразу, посты остаются без группы."""
+        deletion.run(deletion.delete_group(self.group), 60)
+        self.assertEqual(self.client.get(reverse(
+            'posts:group_posts', kwargs={'slug': 'group'}
+        )).status_code, 404)
+        self.assertFalse(Group.all_objects.exists())
+        self.assertEqual(
+            Post.objects.filter(author=self.author, group=None).count(), 5
+        )
+
+    def test_post_comments_removed(self):
+        """Вместе с постом удаляются комментарии."""
+        post = self.posts[0]
+        pending = deletion.delete_post(post)
+        self.assertEqual(self.client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': post.id}
+        )).status_code, 404)
+        deletion.run(pending, 60)
+        self.assertFalse(Comment.objects.filter(post_id=post.id).exists())
+        self.assertEqual(Deletion.objects.get().done, 2)
+
+    def test_admin_deletes_in_background(self):
+        """Админка только скрывает объект и ставит удаление в очередь."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        actions = response.context['action_form'].fields['action'].choices
+        self.assertNotIn('delete_selected', dict(actions))
+        url = reverse('admin:auth_user_delete', args=[self.author.id])
+        self.assertContains(self.client.get(url), 'prolific')
+        self.client.post(url, {'post': 'yes'})
+        post = self.other
+        self.client.post(
+            reverse('admin:posts_post_delete', args=[post.id]), {'post': 'yes'}
+        )
+        self.assertTrue(User.objects.filter(
+            id=self.author.id, is_active=False
+        ).exists())
+        self.assertTrue(Post.all_objects.filter(id=post.id).exists())
+        self.assertFalse(Post.objects.filter(id=post.id).exists())
+        self.assertEqual(
+            sorted(Deletion.objects.values_list('kind', 'object_id')),
+            sorted([
+                (Deletion.USER, self.author.id), (Deletion.POST, post.id)
+            ]),
+        )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, SQLITE_LOCK_RETRY_DELAY=0)
+class ImageDeletionTests(TransactionTestCase):
+    """Картинки удаляются после фиксации: нужны настоящие транзакции."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_image_kept_until_commit(self):
+        """Откат пачки постов не теряет картинку, фиксация удаляет."""
+        post = Post.objects.create(
+            text='С картинкой',
+            author=User.objects.create(username='author'),
+            image=SimpleUploadedFile(
+                'small.gif', SMALL_GIF, content_type='image/gif'
+            ),
+        )
+        path = post.image.path
+        pending = deletion.delete_post(post)
+        attempts = []
+        delete_posts = deletion.delete_posts
+
+        def locked_once(queryset):
+            delete_posts(queryset)
+            attempts.append(os.path.exists(path))
+            if len(attempts) == 1:
+                raise OperationalError('database is locked')
+
+        with mock.patch.object(deletion, 'delete_posts', locked_once):
+            deletion.run(pending, 60)
+        self.assertEqual(attempts, [True, True])
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(Post.all_objects.exists())
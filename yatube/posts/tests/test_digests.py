@@ -0,0 +1,128 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail import get_connection
+from django.test import TestCase, override_settings
+
+from core import mail as outbox
+from core.models import Job
+from posts import digests
+from posts.models import Digest, Follow, Post
+
+User = get_user_model()
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.OutboxBackend',
+    OUTBOX_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    DIGEST_MAX_POSTS=2,
+)
+class DigestTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.authors = [
+            User.objects.create(username='author%d' % number)
+            for number in range(2)
+        ]
+        cls.reader = User.objects.create(
+            username='reader', email='reader@example.com'
+        )
+        cls.fan = User.objects.create(username='fan', email='fan@example.com')
+        cls.silent = User.objects.create(username='silent')
+        for author in cls.authors:
+            Follow.objects.create(user=cls.reader, author=author)
+            Follow.objects.create(user=cls.silent, author=author)
+        Follow.objects.create(user=cls.fan, author=cls.authors[1])
+
+    def test_one_message_per_recipient(self):
+        """Один подписчик - одно письмо со всеми новыми постами."""
+        for number in range(3):
+            Post.objects.create(
+                text='Пост %d' % number, author=self.authors[number % 2]
+            )
+        # Одна рассылка на окно, сколько бы постов ни вышло
+        self.assertEqual(
+            Job.objects.filter(name='posts.tasks.send_digests').count(), 1
+        )
+        self.assertEqual(digests.send(), 2)
+        outbox.deliver()
+        messages = {message.to[0]: message for message in mail.outbox}
+        self.assertEqual(set(messages), {
+            'reader@example.com', 'fan@example.com'
+        })
+        reader = messages['reader@example.com']
+        self.assertEqual(reader.subject, 'Новые посты: 3')
+        self.assertIn('Пост 2', reader.body)
+        self.assertIn('И ещё постов: 1', reader.body)
+        self.assertIn('Пост 1', messages['fan@example.com'].body)
+        self.assertNotIn('Пост 0', messages['fan@example.com'].body)
+        self.assertEqual(Digest.objects.get().recipients, 2)
+
+    def test_inactive_users_skipped(self):
+        """Удаляемые подписчики и авторы не получают и не дают писем."""
+        Post.objects.create(text='Пост автора', author=self.authors[0])
+        Post.objects.create(text='Пост другого', author=self.authors[1])
+        User.objects.filter(id=self.fan.id).update(is_active=False)
+        User.objects.filter(id=self.authors[1].id).update(is_active=False)
+        self.assertEqual(digests.send(), 1)
+        outbox.deliver()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['reader@example.com'])
+        self.assertNotIn('Пост другого', mail.outbox[0].body)
+
+    def test_posts_sent_once(self):
+        """Следующая рассылка - только посты после прошлой."""
+        Post.objects.create(text='Старый пост', author=self.authors[0])
+        digests.send()
+        self.assertEqual(digests.send(), 0)
+        Post.objects.create(text='Новый пост', author=self.authors[0])
+        self.assertEqual(digests.send(), 1)
+        outbox.deliver()
+        self.assertNotIn('Старый пост', mail.outbox[-1].body)
+
+    def test_rerun_sends_each_letter_once(self):
+        """Повтор задачи после сбоя дошлёт остальным, но не повторит."""
+        Post.objects.create(text='Пост', author=self.authors[1])
+        connection = get_connection()
+        calls = []
+
+        def send_messages(messages):
+            calls.append(messages)
+            if len(calls) == 2:
+                raise ConnectionError('Сбой посреди рассылки')
+            return connection.send_messages(messages)
+
+        failing = mock.Mock(send_messages=send_messages)
+        with mock.patch.object(digests, 'SEND_CHUNK', 1):
+            with mock.patch.object(
+                digests, 'get_connection', return_value=failing
+            ):
+                with self.assertRaises(ConnectionError):
+                    digests.send()
+            self.assertEqual(digests.send(), 1)
+            self.assertEqual(digests.send(), 0)
+        outbox.deliver()
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            ['fan@example.com', 'reader@example.com'],
+        )
+        digest = Digest.objects.get()
+        self.assertEqual(digest.recipients, 2)
+        self.assertIsNotNone(digest.finished)
+
+    def test_window_claimed_once(self):
+        """Два запуска на одно окно: второй ничего не шлёт."""
+        Post.objects.create(text='Пост', author=self.authors[0])
+        digests.send()
+        Post.objects.create(text='Новый пост', author=self.authors[0])
+        previous = Digest.objects.get()
+        # Параллельный запуск успел забрать окно после previous
+        Digest.objects.create(
+            after_post_id=previous.last_post_id,
+            last_post_id=previous.last_post_id,
+            finished=previous.created,
+        )
+        self.assertIsNone(digests.claim())
+        self.assertEqual(digests.send(), 0)
@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import EXCERPT_LENGTH, Group, Post
+
+User = get_user_model()
+
+
+class ExcerptTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.long_post = Post.objects.create(
+            text='слово ' * 200, author=cls.author, group=cls.group
+        )
+        cls.short_post = Post.objects.create(
+            text='Короткий пост', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_excerpt_on_save(self):
+        self.assertTrue(self.long_post.truncated)
+        self.assertLessEqual(len(self.long_post.excerpt), EXCERPT_LENGTH)
+        self.assertTrue(self.long_post.excerpt.endswith('…'))
+        self.assertFalse(self.short_post.truncated)
+        self.assertEqual(self.short_post.excerpt, 'Короткий пост')
+
+    def test_excerpt_follows_text(self):
+        """Правка текста через update_fields пересчитывает и выдержку."""
+        post = Post.objects.get(id=self.long_post.id)
+        post.text = 'Стало коротко'
+        post.save(update_fields=['text'])
+        post.refresh_from_db()
+        self.assertEqual(post.excerpt, 'Стало коротко')
+        self.assertFalse(post.truncated)
+
+    def test_listings_skip_text(self):
+        """Ленты не читают полный текст и ведут к нему ссылкой."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+        ]
+        column = '"posts_post"."text"'
+        detail = reverse('posts:post_detail', args=[self.long_post.id])
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = Client().get(url)
+                self.assertFalse(
+                    [q['sql'] for q in queries if column in q['sql']]
+                )
+                self.assertContains(response, 'Читать дальше', count=1)
+                self.assertContains(response, 'href="%s"' % detail)
+                self.assertNotContains(response, self.long_post.text)
@@ -0,0 +1,82 @@
+import csv
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import export
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.staff = User.objects.create(username='staff', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text='Пост, "с кавычками"\nи переводом строки %d' % number,
+                author=cls.author, group=cls.group,
+            )
+            for number in range(7)
+        ]
+        Comment.objects.create(
+            text='Комментарий', post=cls.posts[0], author=cls.reader
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def test_command_csv(self):
+        """CSV с заголовком, текст с кавычками и переводами строк цел."""
+        out = StringIO()
+        call_command('export', 'posts', chunk_size=2, stdout=out)
+        rows = list(csv.reader(StringIO(out.getvalue(), newline='')))
+        self.assertEqual(rows[0], list(export.DATASETS['posts'][1]))
+        self.assertEqual(len(rows), 8)
+        self.assertEqual(rows[1][-1], self.posts[0].text)
+
+    def test_command_jsonl(self):
+        """JSONL: одна строка - один объект."""
+        out = StringIO()
+        call_command('export', 'follows', format='jsonl', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [{
+            'id': Follow.objects.get().id,
+            'user_id': self.reader.id,
+            'author_id': self.author.id,
+        }])
+
+    def test_chunks_bounded(self):
+        """Вывод идёт кусками, а не одной строкой на всю таблицу."""
+        original = export.LINES_PER_CHUNK
+        export.LINES_PER_CHUNK = 3
+        try:
+            chunks = list(export.stream('posts', 'jsonl', chunk_size=2))
+        finally:
+            export.LINES_PER_CHUNK = original
+        self.assertEqual([chunk.count('\n') for chunk in chunks], [3, 3, 1])
+
+    def test_staff_view_streams(self):
+        """Выгрузка в админке - только для персонала и потоком."""
+        url = reverse('export', kwargs={'dataset': 'comments', 'fmt': 'csv'})
+        client = Client()
+        client.force_login(self.reader)
+        self.assertEqual(client.get(url).status_code, 302)
+        client.force_login(self.staff)
+        response = client.get(url)
+        self.assertTrue(response.streaming)
+        self.assertIn('comments.csv', response['Content-Disposition'])
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn('Комментарий', content)
+        self.assertEqual(client.get(reverse(
+            'export', kwargs={'dataset': 'users', 'fmt': 'csv'}
+        )).status_code, 404)
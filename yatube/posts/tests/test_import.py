@@ -0,0 +1,178 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from posts import digests, importer
+from posts.models import Digest, Follow, Group, Post, PostImport
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImportPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        Image.new('RGB', (40, 30), 'red').save(
+            os.path.join(self.directory, 'photo.png')
+        )
+        with open(os.path.join(self.directory, 'broken.png'), 'wb') as file:
+            file.write(b'not an image')
+
+    def write_jsonl(self, records):
+        path = os.path.join(self.directory, 'posts.jsonl')
+        with open(path, 'w', encoding='utf-8') as file:
+            for record in records:
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        return path
+
+    def import_posts(self, path, **options):
+        err = StringIO()
+        call_command(
+            'import_posts', path, workers=1, stdout=StringIO(), stderr=err,
+            **options
+        )
+        return err.getvalue()
+
+    def test_import_jsonl(self):
+        """Автор и группа по именам, дата сохраняется, ошибки пропущены."""
+        path = self.write_jsonl([
+            {'text': 'Старый пост', 'author': 'author', 'group': 'group',
+             'pub_date': '2015-03-01T10:00:00'},
+            {'text': 'С картинкой', 'author': 'author', 'image': 'photo.png'},
+            {'text': 'Чужой', 'author': 'nobody'},
+            {'text': 'Битая картинка', 'author': 'author',
+             'image': 'broken.png'},
+        ])
+        errors = self.import_posts(path)
+        self.assertIn('Запись 3 пропущена', errors)
+        self.assertIn('Запись 4 пропущена', errors)
+        old = Post.objects.get(text='Старый пост')
+        self.assertEqual(old.group, self.group)
+        self.assertEqual(old.pub_date, timezone.make_aware(
+            datetime(2015, 3, 1, 10, 0)
+        ))
+        with_image = Post.objects.get(text='С картинкой')
+        self.assertTrue(with_image.image.name.startswith('posts/import/'))
+        self.assertTrue(os.path.exists(with_image.image.path))
+        checkpoint = PostImport.objects.get()
+        self.assertEqual(
+            (checkpoint.done, checkpoint.imported, checkpoint.skipped),
+            (4, 2, 2),
+        )
+        self.assertIsNotNone(checkpoint.finished)
+
+    def test_import_csv(self):
+        path = os.path.join(self.directory, 'posts.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            file.write('text,author,group\n"Пост, с запятой",author,\n')
+        self.import_posts(path)
+        post = Post.objects.get()
+        self.assertEqual(post.text, 'Пост, с запятой')
+        self.assertIsNone(post.group)
+
+    def test_resume_after_failure(self):
+        """Упавшая пачка откатывается целиком, повтор не дублирует посты."""
+        path = self.write_jsonl([
+            {'text': 'Пост %d' % number, 'author': 'author'}
+            for number in range(5)
+        ])
+        with mock.patch.object(
+            importer, 'purge', side_effect=[None, RuntimeError]
+        ):
+            with self.assertRaises(RuntimeError):
+                self.import_posts(path, batch_size=2)
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(PostImport.objects.get().done, 2)
+        self.import_posts(path, batch_size=2)
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            ['Пост %d' % number for number in range(5)],
+        )
+        self.import_posts(path, batch_size=2)
+        self.assertEqual(Post.objects.count(), 5)
+
+    def test_bad_json_line_skipped(self):
+        """Битая строка JSONL пропускается, нумерация не сбивается."""
+        path = os.path.join(self.directory, 'posts.jsonl')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('{"text": "Первый", "author": "author"}\n')
+            file.write('{"text": "Оборван\n')
+            file.write('["не", "объект"]\n')
+            file.write('{"text": "Четвёртый", "author": "author"}\n')
+        errors = self.import_posts(path)
+        self.assertIn('Запись 2 пропущена: неверный JSON', errors)
+        self.assertIn('Запись 3 пропущена: запись - не объект JSON', errors)
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            ['Первый', 'Четвёртый'],
+        )
+        self.assertEqual(PostImport.objects.get().skipped, 2)
+
+    def test_non_string_fields_skipped(self):
+        """Поле не строкой пропускает запись, а не всю загрузку."""
+        path = self.write_jsonl([
+            {'text': 42, 'author': 'author'},
+            {'text': 'Автор списком', 'author': ['author']},
+            {'text': 'Группа объектом', 'author': 'author', 'group': {}},
+            {'text': 'Дата числом', 'author': 'author', 'pub_date': 1},
+            {'text': 'Годный', 'author': 'author', 'group': None},
+        ])
+        errors = self.import_posts(path)
+        self.assertIn('Запись 1 пропущена: поле text - не строка', errors)
+        self.assertIn('Запись 2 пропущена: поле author - не строка', errors)
+        self.assertIn('Запись 3 пропущена: поле group - не строка', errors)
+        self.assertIn('Запись 4 пропущена: поле pub_date - не строка', errors)
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)), ['Годный']
+        )
+
+    @override_settings(
+        EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'
+    )
+    def test_old_posts_not_in_digest(self):
+        """Старые посты из импорта не попадают в рассылку подписчикам."""
+        reader = User.objects.create(
+            username='reader', email='reader@example.com'
+        )
+        Follow.objects.create(user=reader, author=self.author)
+        Post.objects.create(text='Прошлая рассылка', author=self.author)
+        digests.send()
+        path = self.write_jsonl([
+            {'text': 'Старый пост %d' % number, 'author': 'author',
+             'pub_date': '2015-03-01T10:00:00'}
+            for number in range(3)
+        ])
+        self.import_posts(path)
+        self.assertEqual(digests.send(), 0)
+        Post.objects.create(text='Новый пост', author=self.author)
+        self.assertEqual(digests.send(), 1)
+        digest = Digest.objects.latest('id')
+        posts = digests.new_posts(digest)[self.author.id]
+        self.assertEqual([post['excerpt'] for post in posts], ['Новый пост'])
@@ -0,0 +1,178 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Sum
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.cache import page_key
+from posts import likes
+from posts.models import Comment, Like, LikeCount, Post
+
+User = get_user_model()
+
+
+@override_settings(PAGE_CACHE_TIMEOUTS={})
+class LikeTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='HasNoName')
+        cls.posts = [
+            Post.objects.create(text='Пост %d' % number, author=cls.user)
+            for number in range(3)
+        ]
+        cls.comment = Comment.objects.create(
+            text='Комментарий', post=cls.posts[0], author=cls.user
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def like_count(self, **lookup):
+        return LikeCount.objects.filter(**lookup).aggregate(
+            total=Sum('count'))['total'] or 0
+
+    def test_like_once_per_user(self):
+        """Вторая отметка ничего не меняет, снятие уменьшает счётчик."""
+        post = self.posts[0]
+        url = reverse('posts:post_like', kwargs={'object_id': post.id})
+        self.authorized_client.post(url)
+        self.authorized_client.post(url)
+        self.assertEqual(Like.objects.filter(post=post).count(), 1)
+        self.assertEqual(self.like_count(post=post), 1)
+        self.authorized_client.post(
+            reverse('posts:post_unlike', kwargs={'object_id': post.id})
+        )
+        self.assertFalse(Like.objects.exists())
+        self.assertEqual(self.like_count(post=post), 0)
+
+    def test_counter_sharded(self):
+        """Отметки расходятся по строкам, сумма верна."""
+        users = [
+            User.objects.create(username='user%d' % number)
+            for number in range(40)
+        ]
+        with self.settings(LIKE_SHARDS=4):
+            for user in users:
+                likes.like(user, self.posts[1])
+            likes.unlike(users[0], self.posts[1])
+        shards = LikeCount.objects.filter(post=self.posts[1])
+        self.assertGreater(shards.count(), 1)
+        self.assertLessEqual(shards.count(), 4)
+        self.assertEqual(self.like_count(post=self.posts[1]), 39)
+
+    def test_comment_like_redirects_back(self):
+        """Отметка комментария возвращает на страницу из next."""
+        url = reverse('posts:comment_like', kwargs={
+            'object_id': self.comment.id
+        })
+        response = self.authorized_client.post(url, {'next': '/'})
+        self.assertRedirects(response, '/')
+        response = self.authorized_client.post(
+            url, {'next': 'https://example.com/'}
+        )
+        self.assertRedirects(response, reverse(
+            'posts:post_detail', kwargs={'post_id': self.posts[0].id}
+        ))
+        self.assertEqual(self.like_count(comment=self.comment), 1)
+
+    def test_get_changes_nothing(self):
+        """Ссылка GET не ставит отметку: только POST с CSRF-токеном."""
+        url = reverse(
+            'posts:post_like', kwargs={'object_id': self.posts[0].id}
+        )
+        response = self.authorized_client.get(url)
+        self.assertEqual(response.status_code, 405)
+        csrf_client = Client(enforce_csrf_checks=True)
+        csrf_client.force_login(self.user)
+        response = csrf_client.post(url)
+        self.assertTemplateUsed(response, 'core/403csrf.html')
+        self.assertFalse(Like.objects.exists())
+        page = csrf_client.get(reverse('posts:index'))
+        self.assertContains(page, 'name="csrfmiddlewaretoken"')
+        response = csrf_client.post(url, {
+            'csrfmiddlewaretoken': page.cookies['csrftoken'].value,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.like_count(post=self.posts[0]), 1)
+
+    def test_pages_without_per_post_queries(self):
+        """Счётчики и отметки зрителя не добавляют запросов на пост."""
+        for post in self.posts[:2]:
+            likes.like(self.user, post)
+        index = reverse('posts:index')
+        self.authorized_client.get(index)
+        with self.assertNumQueries(3):
+            # Число постов, посты с авторами и счётчиками, отметки зрителя
+            response = self.authorized_client.get(index)
+        content = response.content.decode()
+        self.assertEqual(content.count('btn-danger'), 2)
+        self.assertEqual(content.count('btn-outline-danger'), 1)
+        other = User.objects.create(username='other')
+        Post.objects.create(text='Ещё пост', author=other)
+        with self.assertNumQueries(3):
+            self.authorized_client.get(index)
+
+    def test_post_detail_shows_counts(self):
+        """Страница поста показывает отметки поста и комментариев."""
+        likes.like(self.user, self.comment)
+        response = self.authorized_client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.posts[0].id}
+        ))
+        self.assertEqual(response.context['post'].like_count, 0)
+        self.assertEqual(
+            response.context['comments'][0].like_count, 1
+        )
+        self.assertContains(response, reverse(
+            'posts:comment_unlike', kwargs={'object_id': self.comment.id}
+        ))
+
+    @override_settings(PAGE_CACHE_TIMEOUTS={'post_page': 60})
+    def test_comment_buttons_share_one_batch(self):
+        """id комментариев стоят в общем рендере один раз, а не у кнопок."""
+        post = self.posts[0]
+        Comment.objects.bulk_create([
+            Comment(text='Ещё %d' % number, post=post, author=self.user)
+            for number in range(20)
+        ])
+        likes.like(self.user, self.comment)
+        url = reverse('posts:post_detail', kwargs={'post_id': post.id})
+        self.authorized_client.get(url)
+        content, _ = cache.get(page_key(url, 'post_page'))
+        self.assertEqual(content.count('<!--fragment:like_batch?'), 1)
+        self.assertEqual(content.count('<!--fragment:like_button?'), 22)
+        self.assertNotIn('like_button?batch', content)
+        # Отметки поста и все отметки комментариев
+        with self.assertNumQueries(2):
+            response = self.authorized_client.get(url)
+        self.assertContains(response, reverse(
+            'posts:comment_unlike', kwargs={'object_id': self.comment.id}
+        ))
+
+    @override_settings(PAGE_CACHE_TIMEOUTS={'post_page': 60})
+    def test_like_expires_cached_pages(self):
+        """Отметка сбрасывает общий рендер и кэш прокси страниц поста."""
+        post = self.posts[1]
+        url = reverse('posts:post_detail', kwargs={'post_id': post.id})
+        guest_client = Client()
+        self.assertContains(guest_client.get(url), '♥ 0')
+        with mock.patch('posts.views.purge') as purge:
+            self.authorized_client.post(
+                reverse('posts:post_like', kwargs={'object_id': post.id})
+            )
+        self.assertContains(guest_client.get(url), '♥ 1')
+        purge.assert_called_once_with(
+            'index', 'post-%d' % post.id, 'author-%d' % self.user.id
+        )
+        with mock.patch('posts.views.purge') as purge:
+            self.authorized_client.post(
+                reverse('posts:comment_unlike', kwargs={
+                    'object_id': self.comment.id
+                })
+            )
+        # Отметки не было: кэши не трогаются
+        purge.assert_not_called()
@@ -0,0 +1,121 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, TransactionTestCase
+from django.test import override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class StandInProxy(HTTPServer):
+    """Заглушка обратного прокси: запоминает ключи из PURGE-запросов."""
+
+    def __init__(self):
+        self.purged = []
+        super().__init__(('127.0.0.1', 0), PurgeHandler)
+
+    @property
+    def url(self):
+        return 'http://%s:%d/' % self.server_address
+
+
+class PurgeHandler(BaseHTTPRequestHandler):
+    def do_PURGE(self):
+        self.server.purged.extend(self.headers['Surrogate-Key'].split())
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CacheHeadersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='HasNoName')
+        cls.group = Group.objects.create(
+            title='Тестовое название группы',
+            description='Тестовое описание',
+            slug='slug_test'
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст поста',
+            author=cls.user,
+            group=cls.group,
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def test_anonymous_pages_are_public(self):
+        """Анонимные страницы публичны и помечены ключами."""
+        pages = {
+            reverse('posts:index'): 'index',
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}): (
+                'group-%d' % self.group.id
+            ),
+            reverse('posts:profile', kwargs={'username': self.user}): (
+                'author-%d' % self.user.id
+            ),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}): (
+                'post-%d' % self.post.id
+            ),
+        }
+        for url, key in pages.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn('s-maxage=600', response['Cache-Control'])
+                self.assertNotIn('Cookie', response.get('Vary', ''))
+                self.assertIn(key, response['Surrogate-Key'].split())
+
+    def test_authorized_pages_are_private(self):
+        """Страницы авторизованного пользователя не кэшируются прокси."""
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertIn('private', response['Cache-Control'])
+
+
+class PurgeTests(TransactionTestCase):
+    def setUp(self):
+        self.proxy = StandInProxy()
+        thread = threading.Thread(target=self.proxy.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.user = User.objects.create(username='HasNoName')
+        self.author = User.objects.create(username='author')
+        self.post = Post.objects.create(
+            text='Тестовый текст поста', author=self.author
+        )
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def tearDown(self):
+        self.proxy.shutdown()
+        self.proxy.server_close()
+
+    def test_writes_purge_keys(self):
+        """Пост, комментарий и подписка сбрасывают свои ключи в прокси."""
+        with override_settings(PROXY_PURGE_URL=self.proxy.url):
+            self.authorized_client.post(
+                reverse('posts:post_create'), data={'text': 'Новый пост'}
+            )
+            self.authorized_client.post(
+                reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+                data={'text': 'Комментарий'},
+            )
+            self.authorized_client.get(
+                reverse('posts:profile_follow', kwargs={'username': 'author'})
+            )
+        self.assertIn('index', self.proxy.purged)
+        self.assertIn('author-%d' % self.user.id, self.proxy.purged)
+        self.assertIn('post-%d' % self.post.id, self.proxy.purged)
+        self.assertIn('author-%d' % self.author.id, self.proxy.purged)
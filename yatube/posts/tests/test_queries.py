@@ -0,0 +1,99 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+# Автор со счётчиками и подпиской зрителя, страница постов с группами
+PROFILE_QUERIES = 2
+# Число постов, страница постов с авторами, группами и счётчиками отметок
+INDEX_QUERIES = 2
+
+
+class ProfileQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        groups = [
+            Group.objects.create(
+                title='Группа %d' % number,
+                slug='group-%d' % number,
+                description='Тестовое описание',
+            )
+            for number in range(3)
+        ]
+        Post.objects.bulk_create([
+            Post(
+                text='Тестовый текст поста %d' % number,
+                author=cls.author,
+                group=groups[number % 3],
+            )
+            for number in range(15)
+        ])
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.url = reverse('posts:profile', kwargs={'username': 'author'})
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_guest_budget(self):
+        """Профиль для гостя собирается из двух запросов."""
+        with self.assertNumQueries(PROFILE_QUERIES):
+            response = self.guest_client.get(self.url)
+        self.assertEqual(response.context['count'], 15)
+        self.assertEqual(response.context['author'].follower_count, 1)
+
+    def test_reader_budget(self):
+        """Подписка зрителя не добавляет запросов."""
+        # Первый запрос кладёт в кэш сессию и пользователя
+        self.reader_client.get(self.url)
+        with self.assertNumQueries(PROFILE_QUERIES):
+            response = self.reader_client.get(self.url)
+        self.assertContains(
+            response,
+            reverse('posts:profile_unfollow', kwargs={'username': 'author'}),
+        )
+
+
+@override_settings(PAGE_CACHE_TIMEOUTS={})
+class IndexQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        authors = [
+            User.objects.create(username='author%d' % number)
+            for number in range(3)
+        ]
+        groups = [
+            Group.objects.create(
+                title='Группа %d' % number,
+                slug='group-%d' % number,
+                description='Тестовое описание',
+            )
+            for number in range(10)
+        ]
+        Post.objects.bulk_create([
+            Post(
+                text='Тестовый текст поста %d' % number,
+                author=authors[number % 3],
+                group=groups[number % 10],
+            )
+            for number in range(15)
+        ])
+
+    def test_posts_with_groups(self):
+        """Группы постов не добавляют запросов на пост."""
+        with self.assertNumQueries(INDEX_QUERIES):
+            response = Client().get(reverse('posts:index'))
+        self.assertContains(
+            response,
+            reverse('posts:group_posts', kwargs={'slug': 'group-9'}),
+        )
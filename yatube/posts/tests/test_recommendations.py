@@ -0,0 +1,87 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Follow, PendingRecommendation, Recommendation
+from posts.recommendations import Adjacency
+
+User = get_user_model()
+
+
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        names = ('reader', 'friend1', 'friend2', 'fan', 'top', 'second',
+                 'cofollowed')
+        cls.users = {
+            name: User.objects.create(username=name) for name in names
+        }
+        edges = (
+            ('reader', 'friend1'), ('reader', 'friend2'),
+            ('friend1', 'top'), ('friend2', 'top'), ('friend1', 'second'),
+            ('fan', 'friend1'), ('fan', 'cofollowed'),
+        )
+        for user, author in edges:
+            Follow.objects.create(
+                user=cls.users[user], author=cls.users[author]
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.users['reader'])
+
+    def recommended(self, name):
+        return list(
+            Recommendation.objects.filter(user=self.users[name])
+            .values_list('author__username', flat=True)
+        )
+
+    def test_adjacency(self):
+        """CSR отдаёт соседей без повторов, пустой массив для чужих."""
+        graph = Adjacency([(1, 2), (1, 2), (1, 5), (3, 1)])
+        self.assertEqual(list(graph[1]), [2, 5])
+        self.assertEqual(list(graph[3]), [1])
+        self.assertEqual(list(graph[2]), [])
+
+    def test_full_run_ranks_candidates(self):
+        """Друзья друзей и совместные подписки, без своих подписок."""
+        call_command('recommend', stdout=StringIO())
+        self.assertEqual(
+            self.recommended('reader'), ['top', 'second', 'cofollowed']
+        )
+        self.assertFalse(PendingRecommendation.objects.exists())
+
+    def test_follow_updates_incrementally(self):
+        """Подписка убирает автора сразу, --pending пересчитывает."""
+        call_command('recommend', stdout=StringIO())
+        self.reader_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': 'top'}
+        ))
+        self.assertNotIn('top', self.recommended('reader'))
+        self.assertTrue(PendingRecommendation.objects.filter(
+            user_id=self.users['reader'].id).exists())
+        out = StringIO()
+        call_command('recommend', pending=True, stdout=out)
+        self.assertIn('Пользователей: 1', out.getvalue())
+        self.assertEqual(self.recommended('reader'), ['second', 'cofollowed'])
+
+    def test_suggestions_on_own_pages(self):
+        """Подсказки видны в ленте и своём профиле, но не в чужом."""
+        call_command('recommend', stdout=StringIO())
+        top_url = reverse('posts:profile', kwargs={'username': 'top'})
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertContains(response, top_url)
+        response = self.reader_client.get(
+            reverse('posts:profile', kwargs={'username': 'reader'})
+        )
+        self.assertContains(response, top_url)
+        response = self.reader_client.get(
+            reverse('posts:profile', kwargs={'username': 'fan'})
+        )
+        self.assertNotContains(response, 'На кого подписаться')
@@ -0,0 +1,105 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db.models import Count
+from django.test import TestCase
+from django.utils import timezone
+
+from posts.management.commands.seed import make_chunk
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class SeedCommandTests(TestCase):
+    def test_seed_counts(self):
+        """Команда создаёт заданное число строк каждой таблицы."""
+        call_command(
+            'seed', users=50, groups=3, posts=200, comments=100, follows=150,
+            batch_size=40, stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.count(), 50)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertEqual(Follow.objects.count(), 150)
+        self.assertFalse(
+            Follow.objects.values('user', 'author')
+            .annotate(number=Count('id')).filter(number__gt=1).exists()
+        )
+        top = User.objects.annotate(
+            followers=Count('following')).order_by('-followers')[0]
+        self.assertGreater(top.followers, 150 / 50 * 3)
+
+    def test_seed_deterministic(self):
+        """Один и тот же seed даёт одинаковые данные."""
+        plan = {
+            'seed': 7,
+            'counts': {'users': 10, 'groups': 2, 'posts': 30},
+            'first': {'users': 1, 'groups': 1, 'posts': 1},
+            'epoch': timezone.now(),
+            'span': 3600,
+            'images': [],
+            'image_fraction': 0,
+        }
+
+        def rows(seed):
+            plan['seed'] = seed
+            return [
+                (post.author_id, post.group_id, post.text, post.pub_date)
+                for post in make_chunk(plan, 'posts', 0, 30)
+            ]
+        self.assertEqual(rows(7), rows(7))
+        self.assertNotEqual(rows(7), rows(8))
+
+    def dump(self):
+        return [
+            list(User.objects.order_by('id').values_list(
+                'username', 'password', 'date_joined')),
+            list(Post.objects.order_by('id').values_list(
+                'text', 'author_id', 'group_id', 'pub_date')),
+            list(Comment.objects.order_by('id').values_list(
+                'text', 'post_id', 'author_id', 'created')),
+            list(Follow.objects.order_by('id').values_list(
+                'user_id', 'author_id')),
+        ]
+
+    def test_seed_repeatable(self):
+        """Повторный запуск на пустой базе даёт те же строки."""
+        options = dict(
+            users=20, groups=2, posts=40, comments=30, follows=40,
+            stdout=StringIO(),
+        )
+        call_command('seed', **options)
+        first = self.dump()
+        for model in (Follow, Comment, Post, Group, User):
+            model.objects.all().delete()
+        call_command('seed', **options)
+        self.assertEqual(self.dump(), first)
+
+    def test_seed_after_hidden_rows(self):
+        """Скрытые посты и группы не отдают свои id новым строкам."""
+        author = User.objects.create(username='author')
+        group = Group.objects.create(title='Скрытая', slug='hidden')
+        post = Post.objects.create(text='Скрытый', author=author, group=group)
+        Post.all_objects.filter(id=post.id).update(hidden=True)
+        Group.all_objects.filter(id=group.id).update(hidden=True)
+        call_command(
+            'seed', users=5, groups=2, posts=10, comments=0, follows=0,
+            stdout=StringIO(),
+        )
+        self.assertEqual(Post.all_objects.count(), 11)
+        self.assertEqual(Group.all_objects.count(), 3)
+
+    def test_seed_dense_follows(self):
+        """Подписки почти на всех авторов не зацикливают выборку."""
+        call_command(
+            'seed', users=30, groups=0, posts=0, comments=0,
+            follows=30 * 29, stdout=StringIO(),
+        )
+        self.assertEqual(Follow.objects.count(), 30 * 29)
+
+    def test_seed_rejects_dangling_links(self):
+        with self.assertRaises(CommandError):
+            call_command(
+                'seed', users=5, groups=0, posts=0, comments=10, follows=0,
+                stdout=StringIO(),
+            )
@@ -0,0 +1,121 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.models import Job
+from posts import trending, view_counts
+from posts.models import Group, Post, PostActivity
+from posts.tasks import prune_activity
+
+User = get_user_model()
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='HasNoName')
+        cls.groups = [
+            Group.objects.create(
+                title='Группа %d' % number,
+                slug='group-%d' % number,
+                description='Тестовое описание',
+            )
+            for number in range(2)
+        ]
+        cls.commented = Post.objects.create(
+            text='Обсуждаемый пост', author=cls.user, group=cls.groups[0]
+        )
+        cls.viewed = Post.objects.create(
+            text='Просматриваемый пост', author=cls.user, group=cls.groups[1]
+        )
+        cls.old = Post.objects.create(text='Старый пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        view_counts.buffer.take()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def ranked_ids(self, kind):
+        return [object_id for object_id, _ in trending.ranking(kind)]
+
+    def test_comments_and_views_counted(self):
+        """Комментарии и просмотры попадают в текущий интервал."""
+        self.authorized_client.post(
+            reverse('posts:add_comment', args=[self.commented.id]),
+            data={'text': 'Комментарий'},
+        )
+        url = reverse('posts:post_view', kwargs={'post_id': self.viewed.id})
+        self.guest_client.get(url)
+        self.guest_client.get(url)
+        view_counts.flush()
+        activity = PostActivity.objects.get(post=self.viewed)
+        self.assertEqual(activity.views, 2)
+        self.assertEqual(activity.bucket, trending.current_bucket())
+        self.assertEqual(
+            self.ranked_ids('posts')[:2], [self.commented.id, self.viewed.id]
+        )
+        self.assertEqual(
+            self.ranked_ids('groups'), [self.groups[0].id, self.groups[1].id]
+        )
+
+    def test_decay_and_window(self):
+        """Старая активность весит меньше, вне окна - не считается."""
+        now = trending.current_bucket()
+        PostActivity.objects.create(post=self.old, bucket=now - 3, comments=1)
+        PostActivity.objects.create(post=self.viewed, bucket=now, views=3)
+        PostActivity.objects.create(
+            post=self.commented, bucket=now - 24, comments=100
+        )
+        self.assertEqual(
+            self.ranked_ids('posts'), [self.viewed.id, self.old.id]
+        )
+
+    def test_pruned_by_job(self):
+        """Пересчёт ничего не удаляет: это делает задача на интервал."""
+        now = trending.current_bucket()
+        PostActivity.objects.create(
+            post=self.commented, bucket=now - 24, comments=100
+        )
+        trending.refresh()
+        self.assertTrue(
+            PostActivity.objects.filter(post=self.commented).exists()
+        )
+        trending.bump(self.viewed.id, 'views')
+        trending.bump(self.old.id, 'views')
+        jobs = Job.objects.filter(name=prune_activity.name)
+        self.assertEqual(
+            list(jobs.values_list('key', flat=True)),
+            ['trending-prune:%d' % (now + 1)],
+        )
+        prune_activity()
+        self.assertFalse(
+            PostActivity.objects.filter(post=self.commented).exists()
+        )
+        self.assertEqual(PostActivity.objects.count(), 2)
+
+    def test_switcher_marks_tab(self):
+        """Вкладка текущей ленты подсвечена и во фрагменте."""
+        response = self.authorized_client.get(
+            reverse('posts:trending_posts')
+        )
+        self.assertContains(response, 'nav-link active', count=1)
+        self.assertContains(
+            response, 'class="nav-link active"\n           href="%s"'
+            % reverse('posts:trending_posts'),
+        )
+
+    def test_page_served_from_ranking(self):
+        """Страница строится по готовому списку: один запрос за постами."""
+        trending.bump(self.viewed.id, 'views')
+        url = reverse('posts:trending_posts')
+        self.guest_client.get(url)
+        trending.bump(self.commented.id, 'comments')
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(url)
+        self.assertEqual(list(response.context['page_obj']), [self.viewed])
+        response = self.guest_client.get(reverse('posts:trending_groups'))
+        self.assertEqual(list(response.context['groups']), [self.groups[1]])
@@ -0,0 +1,123 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import trending, view_counts
+from posts.models import Post, PostActivity
+
+User = get_user_model()
+
+
+@override_settings(VIEW_FLUSH_INTERVAL=3600, VIEW_BUFFER_MAX_POSTS=1000)
+class ViewCountsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='HasNoName')
+        cls.posts = [
+            Post.objects.create(text='Пост %d' % number, author=cls.user)
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        view_counts.buffer.take()
+        self.guest_client = Client()
+
+    def url(self, post):
+        return reverse('posts:post_view', kwargs={'post_id': post.id})
+
+    def test_views_buffered(self):
+        """Маячок не пишет в базу, а просмотр виден на странице поста."""
+        post = self.posts[0]
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(self.url(post))
+            response = self.guest_client.get(self.url(post))
+        self.assertFalse(queries.captured_queries)
+        self.assertEqual(response['Content-Type'], 'image/gif')
+        self.assertIn('no-cache', response['Cache-Control'])
+        post.refresh_from_db()
+        self.assertEqual(post.views, 0)
+        self.assertEqual(view_counts.pending(post.id), 2)
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id})
+        )
+        self.assertEqual(response.context['views'], 2)
+        self.assertContains(response, 'src="%s"' % self.url(post))
+
+    def test_cached_page_counted(self):
+        """Страница из общего кэша не мешает счёту: считает маячок."""
+        post = self.posts[0]
+        url = reverse('posts:post_detail', kwargs={'post_id': post.id})
+        self.guest_client.get(url)
+        self.guest_client.get(url)
+        self.assertEqual(view_counts.pending(post.id), 0)
+        self.guest_client.get(self.url(post))
+        self.assertEqual(view_counts.pending(post.id), 1)
+
+    def test_flushed_by_timer(self):
+        """Таймер сбрасывает буфер и без новых запросов."""
+        flushed = []
+        with mock.patch.object(
+            view_counts.buffer, 'flush', lambda: flushed.append(1)
+        ), mock.patch.object(view_counts, '_flusher_pid', 0), \
+                self.settings(VIEW_FLUSH_INTERVAL=0.01):
+            thread = view_counts.ensure_flusher()
+            try:
+                for _ in range(100):
+                    if flushed:
+                        break
+                    time.sleep(0.01)
+            finally:
+                view_counts._stopped.set()
+                thread.join()
+                view_counts._stopped.clear()
+        self.assertTrue(flushed)
+
+    def test_flush_batches_updates(self):
+        """Сброс - пачка UPDATE по приращениям, а не запрос на просмотр."""
+        for post, views in zip(self.posts, (3, 1, 1)):
+            for _ in range(views):
+                view_counts.record(post.id)
+        PostActivity.objects.create(
+            post=self.posts[0], bucket=trending.current_bucket(), comments=1
+        )
+        # Точка сохранения, проверка постов, вставка строк интервала
+        # по два UPDATE на каждое из двух приращений и очистка интервала
+        # в очереди задач (вставка в своей точке сохранения)
+        with self.assertNumQueries(11):
+            self.assertEqual(view_counts.flush(), 3)
+        self.assertEqual(
+            list(Post.objects.order_by('id').values_list('views', flat=True)),
+            [3, 1, 1],
+        )
+        activity = PostActivity.objects.get(post=self.posts[0])
+        self.assertEqual((activity.comments, activity.views), (1, 3))
+        self.assertEqual(view_counts.pending(self.posts[0].id), 0)
+        self.assertEqual(view_counts.flush(), 0)
+
+    def test_flush_when_buffer_full(self):
+        """Переполненный буфер сбрасывается после ответа."""
+        with self.settings(VIEW_BUFFER_MAX_POSTS=2):
+            self.guest_client.get(self.url(self.posts[0]))
+            self.assertEqual(Post.objects.get(id=self.posts[0].id).views, 0)
+            self.guest_client.get(self.url(self.posts[1]))
+        self.assertEqual(
+            sum(Post.objects.values_list('views', flat=True)), 2
+        )
+
+    def test_deleted_post_skipped(self):
+        """Просмотры удалённого поста не ломают сброс."""
+        post = Post.objects.create(text='Удалённый', author=self.user)
+        view_counts.record(post.id)
+        view_counts.record(self.posts[1].id)
+        post.delete()
+        view_counts.flush()
+        self.assertEqual(Post.objects.get(id=self.posts[1].id).views, 1)
+        self.assertEqual(PostActivity.objects.count(), 1)
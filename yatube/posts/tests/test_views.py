@@ -1,3 +1,5 @@
+import re
+
 from django.contrib.auth import get_user_model
 from django.test import TestCase, Client
 from django.urls import reverse
@@ -7,6 +9,13 @@ from posts.models import Follow, Group, Post
 
 User = get_user_model()
 
+# Токен CSRF в формах отметок свой в каждом ответе
+CSRF_TOKEN_RE = re.compile(rb'name="csrfmiddlewaretoken" value="[^"]*"')
+
+
+def page_content(response):
+    return CSRF_TOKEN_RE.sub(b'', response.content)
+
 
 class ViewsTests(TestCase):
     @classmethod
@@ -135,14 +144,14 @@ class ViewsTests(TestCase):
             author=ViewsTests.user
         )
         response = self.authorized_client.get(reverse('posts:index'))
-        post_create = response.content
+        post_create = page_content(response)
         post.delete()
         response = self.authorized_client.get(reverse('posts:index'))
-        post_delete = response.content
+        post_delete = page_content(response)
         self.assertEqual(post_create, post_delete)
         cache.clear()
         response = self.authorized_client.get(reverse('posts:index'))
-        cache_delete = response.content
+        cache_delete = page_content(response)
         self.assertNotEqual(cache_delete, post_delete)
 
     def test_follow_new_post(self):
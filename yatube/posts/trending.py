@@ -0,0 +1,129 @@
+"""Популярные посты и группы по скользящему окну активности.
+
+Комментарии и просмотры копятся в PostActivity по интервалам длиной
+TRENDING_BUCKET_SECONDS (просмотры - пачками через буфер view_counts).
+Рейтинг учитывает последние TRENDING_WINDOW_BUCKETS интервалов, каждый
+следующий в прошлое - с множителем TRENDING_DECAY. Пересчёт читает только
+строки окна, а не таблицу комментариев; готовые списки лежат в кэше
+TRENDING_REFRESH секунд, и страницы берут их оттуда.
+
+Пересчёт идёт внутри GET на реплике и ничего не пишет. Строки, ушедшие
+из окна, удаляет задача prune_activity: её ставит в очередь первая
+запись каждого интервала, а выполняется она в начале следующего.
+"""
+import heapq
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from core import jobs
+
+from .models import PostActivity
+
+RANKING_KEY = 'trending:ranking'
+
+
+def current_bucket():
+    return int(time.time() // settings.TRENDING_BUCKET_SECONDS)
+
+
+def oldest_bucket():
+    return current_bucket() - settings.TRENDING_WINDOW_BUCKETS + 1
+
+
+def schedule_prune():
+    """Ставит очистку на начало следующего интервала, одну на интервал."""
+    from .tasks import prune_activity
+
+    bucket = current_bucket() + 1
+    jobs.enqueue(
+        prune_activity, key='trending-prune:%d' % bucket,
+        run_at=datetime.fromtimestamp(
+            bucket * settings.TRENDING_BUCKET_SECONDS, timezone.utc
+        ),
+    )
+
+
+def prune():
+    """Удаляет активность, ушедшую из окна; возвращает число строк."""
+    deleted, _ = PostActivity.objects.filter(
+        bucket__lt=oldest_bucket()
+    ).delete()
+    return deleted
+
+
+def bump(post_id, field):
+    """Прибавляет единицу к comments или views поста в текущем интервале."""
+    lookup = {'post_id': post_id, 'bucket': current_bucket()}
+    increment = {field: F(field) + 1}
+    if PostActivity.objects.filter(**lookup).update(**increment):
+        return
+    try:
+        with transaction.atomic():
+            PostActivity.objects.create(**lookup, **{field: 1})
+    except IntegrityError:
+        # Строку успел создать параллельный запрос
+        PostActivity.objects.filter(**lookup).update(**increment)
+    else:
+        schedule_prune()
+
+
+def compute():
+    """Рейтинги постов и групп: {'posts': [(id, оценка)], 'groups': ...}."""
+    now = current_bucket()
+    oldest = oldest_bucket()
+    posts = defaultdict(float)
+    groups = defaultdict(float)
+    rows = PostActivity.objects.filter(bucket__gte=oldest).values_list(
+        'post_id', 'post__group_id', 'bucket', 'comments', 'views'
+    )
+    for post_id, group_id, bucket, comments, views in rows.iterator():
+        score = (
+            comments * settings.TRENDING_COMMENT_WEIGHT
+            + views * settings.TRENDING_VIEW_WEIGHT
+        ) * settings.TRENDING_DECAY ** (now - bucket)
+        posts[post_id] += score
+        if group_id is not None:
+            groups[group_id] += score
+    return {
+        'posts': top(posts),
+        'groups': top(groups),
+    }
+
+
+def top(scores):
+    return heapq.nlargest(
+        settings.TRENDING_SIZE, scores.items(),
+        key=lambda item: (item[1], item[0]),
+    )
+
+
+def ranking(kind):
+    """Готовый список [(id, оценка), ...] для 'posts' или 'groups'."""
+    rankings = cache.get(RANKING_KEY)
+    if rankings is None:
+        rankings = refresh()
+    return rankings[kind]
+
+
+def refresh():
+    rankings = compute()
+    cache.set(RANKING_KEY, rankings, settings.TRENDING_REFRESH)
+    return rankings
+
+
+def ordered(queryset, ranked):
+    """Объекты queryset в порядке рейтинга ranked, с оценкой в .score."""
+    scores = dict(ranked)
+    objects = queryset.in_bulk(list(scores))
+    result = []
+    for object_id, score in ranked:
+        if object_id in objects:
+            objects[object_id].score = score
+            result.append(objects[object_id])
+    return result
@@ -16,6 +16,8 @@ urlpatterns = [
     path('profile/<str:username>/', views.profile, name='profile'),
     # Просмотр записи
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    # Маячок просмотра записи
+    path('posts/<int:post_id>/view/', views.post_view, name='post_view'),
     # Создание записи
     path('create/', views.post_create, name='post_create'),
     # Редактирование записи
@@ -26,7 +28,35 @@ urlpatterns = [
         views.add_comment,
         name='add_comment'
     ),
+    # Отметки «нравится»
+    path(
+        'posts/<int:object_id>/like/',
+        views.like, {'kind': 'post'},
+        name='post_like'
+    ),
+    path(
+        'posts/<int:object_id>/unlike/',
+        views.unlike, {'kind': 'post'},
+        name='post_unlike'
+    ),
+    path(
+        'comments/<int:object_id>/like/',
+        views.like, {'kind': 'comment'},
+        name='comment_like'
+    ),
+    path(
+        'comments/<int:object_id>/unlike/',
+        views.unlike, {'kind': 'comment'},
+        name='comment_unlike'
+    ),
     path('follow/', views.follow_index, name='follow_index'),
+    # Популярное
+    path('trending/', views.trending_posts, name='trending_posts'),
+    path(
+        'trending/groups/',
+        views.trending_groups,
+        name='trending_groups'
+    ),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
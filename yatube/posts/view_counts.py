@@ -0,0 +1,189 @@
+"""Счётчики просмотров постов с буфером в памяти.
+
+Просмотр считает не страница поста (её отдают общий кэш и прокси, мимо
+Django), а картинка-маячок на ней: ответ маячка не кэшируется нигде.
+Маячок не пишет в базу: процесс копит приращения в памяти и сбрасывает
+их пачкой UPDATE в Post.views и в PostActivity текущего интервала
+(оттуда их берёт trending) - после ответа (сигнал request_finished),
+когда в буфере набралось VIEW_BUFFER_MAX_POSTS постов, и по таймеру
+раз в VIEW_FLUSH_INTERVAL секунд, даже если запросов больше нет. При
+нормальном завершении процесса буфер сбрасывается (atexit); таймер и
+atexit включает start_flusher() в yatube/wsgi.py.
+
+Цена буфера. Счётчики в базе отстают от настоящих не больше чем на
+VIEW_FLUSH_INTERVAL секунд просмотров каждого процесса. Если процесс
+упадёт или будет убит, эти же несброшенные просмотры пропадут: не
+больше VIEW_FLUSH_INTERVAL секунд трафика (или VIEW_BUFFER_MAX_POSTS
+постов) на процесс. Ошибка базы при сбросе ничего не теряет -
+приращения возвращаются в буфер до следующей попытки.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F
+
+from . import trending
+from .models import Post, PostActivity
+
+logger = logging.getLogger(__name__)
+
+# Прозрачный GIF 1x1 - ответ маячка
+PIXEL = (
+    b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff'
+    b'!\xf9\x04\x01\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00'
+    b'\x01\x00\x00\x02\x02D\x01\x00;'
+)
+
+# Столько id в одном IN (...), чтобы не упереться в лимит параметров SQLite
+CHUNK_SIZE = 500
+
+
+class ViewBuffer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        self.flushed = time.monotonic()
+
+    def add(self, post_id):
+        with self.lock:
+            self.counts[post_id] += 1
+
+    def pending(self, post_id):
+        """Просмотры поста, ещё не попавшие в базу."""
+        with self.lock:
+            return self.counts.get(post_id, 0)
+
+    def due(self):
+        return len(self.counts) >= settings.VIEW_BUFFER_MAX_POSTS or (
+            time.monotonic() - self.flushed >= settings.VIEW_FLUSH_INTERVAL
+        )
+
+    def take(self):
+        with self.lock:
+            counts, self.counts = self.counts, Counter()
+            self.flushed = time.monotonic()
+        return counts
+
+    def flush(self):
+        """Записывает накопленное; возвращает число обновлённых постов."""
+        counts = self.take()
+        if not counts:
+            return 0
+        try:
+            with transaction.atomic():
+                write(counts)
+        except DatabaseError:
+            logger.exception('Не удалось сохранить просмотры')
+            with self.lock:
+                self.counts.update(counts)
+            return 0
+        return len(counts)
+
+
+def by_increment(counts):
+    """{приращение: [id постов]} - один UPDATE на каждое приращение."""
+    groups = defaultdict(list)
+    for post_id, views in counts.items():
+        groups[views].append(post_id)
+    return groups
+
+
+def chunks(ids):
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield ids[start:start + CHUNK_SIZE]
+
+
+def write(counts):
+    bucket = trending.current_bucket()
+    for chunk in chunks(list(counts)):
+        # Пост могли удалить, пока просмотры лежали в буфере
+        alive = Post.objects.filter(id__in=chunk).values_list('id', flat=True)
+        # Недостающие строки интервала; существующие не трогаем
+        PostActivity.objects.bulk_create(
+            [PostActivity(post_id=post_id, bucket=bucket)
+             for post_id in alive],
+            ignore_conflicts=True,
+        )
+    activity = PostActivity.objects.filter(bucket=bucket)
+    for views, ids in by_increment(counts).items():
+        for chunk in chunks(ids):
+            Post.objects.filter(id__in=chunk).update(views=F('views') + views)
+            activity.filter(post_id__in=chunk).update(
+                views=F('views') + views
+            )
+    trending.schedule_prune()
+
+
+buffer = ViewBuffer()
+
+
+def record(post_id):
+    post_id = int(post_id)
+    buffer.add(post_id)
+    ensure_flusher()
+
+
+def pending(post_id):
+    return buffer.pending(post_id)
+
+
+def flush():
+    return buffer.flush()
+
+
+def flush_if_due(**kwargs):
+    """Сбрасывает буфер после ответа, а не во время него."""
+    if buffer.due():
+        buffer.flush()
+
+
+# pid процесса, в котором работает таймер; None - таймер не включён
+_flusher_pid = None
+_stopped = threading.Event()
+
+
+def start_flusher():
+    """Включает сброс по таймеру и при выходе процесса."""
+    global _flusher_pid
+    if _flusher_pid is None:
+        atexit.register(stop_flusher)
+        _flusher_pid = 0
+    ensure_flusher()
+
+
+def ensure_flusher():
+    """Запускает таймер в этом процессе, если его ещё нет.
+
+    Поток не переживает fork: воркер, порождённый после start_flusher(),
+    запускает свой при первом просмотре. Возвращает новый поток.
+    """
+    global _flusher_pid
+    if _flusher_pid is None or _flusher_pid == os.getpid():
+        return None
+    _flusher_pid = os.getpid()
+    thread = threading.Thread(
+        target=flush_periodically, name='view-counts', daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def flush_periodically():
+    while not _stopped.wait(settings.VIEW_FLUSH_INTERVAL):
+        try:
+            buffer.flush()
+        finally:
+            # У потока своё соединение; не держим его между сбросами
+            connections.close_all()
+
+
+def stop_flusher():
+    """Останавливает таймер и сбрасывает остаток буфера."""
+    _stopped.set()
+    flush()
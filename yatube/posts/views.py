@@ -1,75 +1,156 @@
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db.models import (BooleanField, Count, Exists, IntegerField,
+                              OuterRef, Subquery, Value)
+from django.db.models.functions import Coalesce
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.urls import reverse
+from django.utils.http import is_safe_url
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_POST
 
+from core.cache import expire_page, shared_cache_page
+from core.proxy import purge, set_surrogate_keys
+from core.replicas import read_replica
+from core.sqlite import call_with_retry, save_with_retry
+
+from . import export as data_export
+from . import likes, trending, view_counts
 from .forms import PostForm, CommentForm
 from .models import Follow, Group, Post
 from .models import User
 
 
-def paginator(post_list, request):
+def paginator(post_list, request, count=None):
     paginator = Paginator(post_list, 10)
+    if count is not None:
+        # Число объектов уже известно, отдельный COUNT(*) не нужен
+        paginator.count = count
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
 
 
-@cache_page(1, key_prefix='index_page')
+def post_keys(post):
+    """Surrogate-ключи страниц, на которых виден пост."""
+    keys = ['post-%d' % post.id, 'author-%d' % post.author_id]
+    if post.group_id:
+        keys.append('group-%d' % post.group_id)
+    return keys
+
+
+def page_keys(page_obj):
+    return ['post-%d' % post.id for post in page_obj]
+
+
+def count_of(model, field):
+    """Подзапрос: число строк model, у которых field - текущая строка."""
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by()
+        .values(field).annotate(count=Count('pk')).values('count'),
+        output_field=IntegerField(),
+    ), 0)
+
+
+def profile_author(request, username):
+    """Автор со счётчиками и подпиской зрителя - одним запросом."""
+    if request.user.is_authenticated:
+        viewer_follows = Exists(Follow.objects.filter(
+            user=request.user, author=OuterRef('pk')
+        ))
+    else:
+        viewer_follows = Value(False, output_field=BooleanField())
+    authors = User.objects.annotate(
+        post_count=count_of(Post, 'author'),
+        follower_count=count_of(Follow, 'author'),
+        viewer_follows=viewer_follows,
+    )
+    # Неактивный автор удаляется в фоне, см. deletion.py
+    return get_object_or_404(authors, username=username, is_active=True)
+
+
+@read_replica
+@shared_cache_page('index_page')
 def index(request):
-    post_list = Post.objects.all().order_by('-pub_date')
-    page_obj = paginator(post_list, request)
+    # Ленты показывают выдержку, полный текст не читается
+    post_list = Post.objects.select_related('author', 'group').defer(
+        'text'
+    ).annotate(like_count=likes.total('post')).order_by('-pub_date')
+    # Без аннотации: COUNT(*) не должен считать отметки всех постов
+    page_obj = paginator(post_list, request, count=Post.objects.count())
     context = {
         'page_obj': page_obj,
     }
-    return render(request, 'posts/index.html', context)
+    response = render(request, 'posts/index.html', context)
+    return set_surrogate_keys(response, 'index', *page_keys(page_obj))
 
 
+@read_replica
+@shared_cache_page('group_page')
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all().order_by('-pub_date')
+    posts = group.posts.defer('text').order_by('-pub_date')
     page_obj = paginator(posts, request)
     context = {
         'group': group,
         'posts': posts,
         'page_obj': page_obj,
     }
-    return render(request, 'posts/group_list.html', context)
+    response = render(request, 'posts/group_list.html', context)
+    return set_surrogate_keys(
+        response, 'group-%d' % group.id, *page_keys(page_obj)
+    )
 
 
+@read_replica
+@shared_cache_page('profile_page')
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    page_obj = paginator(post_list, request)
-    count = author.posts.all().count()
+    author = profile_author(request, username)
+    post_list = author.posts.select_related('group').defer('text')
+    page_obj = paginator(post_list, request, count=author.post_count)
+    # Кнопка подписки - персональный фрагмент, см. posts/fragments.py;
+    # ответ для зрителя уже есть в аннотации
+    request.known_follows = {author.username: author.viewer_follows}
     context = {
         'author': author,
-        'count': count,
+        'count': author.post_count,
         'page_obj': page_obj,
-        'following': None,
     }
-    if request.user.is_authenticated and request.user != author:
-        following = (
-            Follow.objects.filter(
-                user=request.user).filter(author=author).exists()
-        )
-        context['following'] = following
-        return render(request, 'posts/profile.html', context)
-    return render(request, 'posts/profile.html', context)
+    response = render(request, 'posts/profile.html', context)
+    return set_surrogate_keys(
+        response, 'author-%d' % author.id, *page_keys(page_obj)
+    )
 
 
+@read_replica
+@shared_cache_page('post_page')
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.annotate(like_count=likes.total('post')), id=post_id
+    )
     count = post.author.posts.all().count()
     comment_form = CommentForm()
-    comments = post.comments.all().filter(post=post_id)
+    comments = post.comments.filter(
+        author__is_active=True
+    ).select_related('author').annotate(like_count=likes.total('comment'))
     context = {
         'count': count,
         'post': post,
+        # На момент рендера: страница живёт в кэшах, считает маячок
+        'views': post.views + view_counts.pending(post.id),
         'comments': comments,
         'form': comment_form,
     }
-    return render(request, 'posts/post_detail.html', context)
+    response = render(request, 'posts/post_detail.html', context)
+    return set_surrogate_keys(response, *post_keys(post))
+
+
+@never_cache
+def post_view(request, post_id):
+    """Маячок просмотра поста: прозрачная картинка 1x1 мимо кэшей."""
+    view_counts.record(post_id)
+    return HttpResponse(view_counts.PIXEL, content_type='image/gif')
 
 
 @login_required
@@ -82,7 +163,11 @@ def post_create(request):
     if form.is_valid():
         new_post = form.save(commit=False)
         new_post.author = author
-        new_post.save()
+        save_with_retry(new_post)
+        expire_page(
+            reverse('posts:profile', args=[author.username]), 'profile_page'
+        )
+        purge('index', *post_keys(new_post))
         return redirect('posts:profile', author)
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -92,13 +177,18 @@ def post_edit(request, post_id):
     instance = get_object_or_404(Post, id=post_id)
     if instance.author != request.user:
         return redirect('posts:post_detail', post_id)
+    old_keys = post_keys(instance)
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
         instance=instance
     )
     if form.is_valid():
-        form.save()
+        save_with_retry(form.save(commit=False))
+        expire_page(
+            reverse('posts:post_detail', args=[post_id]), 'post_page'
+        )
+        purge(*old_keys, *post_keys(instance))
         return redirect('posts:post_detail', post_id)
     context = {
         'is_edit': True,
@@ -109,19 +199,91 @@ def post_edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(Post.objects.defer('text'), id=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+
+        def write():
+            comment.save()
+            trending.bump(post.id, 'comments')
+        call_with_retry(write)
+        expire_page(
+            reverse('posts:post_detail', args=[post_id]), 'post_page'
+        )
+        purge('post-%d' % post.id)
     return redirect('posts:post_detail', post_id=post_id)
 
 
+def like_redirect(request, obj):
+    next_url = request.POST.get('next')
+    if next_url and is_safe_url(next_url, {request.get_host()}):
+        return redirect(next_url)
+    post_id = obj.id if isinstance(obj, Post) else obj.post_id
+    return redirect('posts:post_detail', post_id=post_id)
+
+
+def expire_likes(obj):
+    """Сбрасывает кэши страниц, на которых виден счётчик отметок obj."""
+    if isinstance(obj, Post):
+        post_id, keys = obj.id, ['index', *post_keys(obj)]
+    else:
+        post_id, keys = obj.post_id, ['post-%d' % obj.post_id]
+    expire_page(reverse('posts:post_detail', args=[post_id]), 'post_page')
+    purge(*keys)
+
+
+@login_required
+@require_POST
+def like(request, kind, object_id):
+    obj = get_object_or_404(
+        likes.KINDS[kind].objects.defer('text'), id=object_id
+    )
+    if call_with_retry(lambda: likes.like(request.user, obj)):
+        expire_likes(obj)
+    return like_redirect(request, obj)
+
+
+@login_required
+@require_POST
+def unlike(request, kind, object_id):
+    obj = get_object_or_404(
+        likes.KINDS[kind].objects.defer('text'), id=object_id
+    )
+    if call_with_retry(lambda: likes.unlike(request.user, obj)):
+        expire_likes(obj)
+    return like_redirect(request, obj)
+
+
+@read_replica
+def trending_posts(request):
+    ranked = trending.ranking('posts')
+    posts = trending.ordered(
+        Post.objects.select_related('author', 'group').defer('text'), ranked
+    )
+    context = {
+        'page_obj': paginator(posts, request),
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+@read_replica
+def trending_groups(request):
+    ranked = trending.ranking('groups')
+    context = {
+        'groups': trending.ordered(Group.objects.all(), ranked),
+    }
+    return render(request, 'posts/trending_groups.html', context)
+
+
+@read_replica
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
+    post_list = Post.objects.filter(
+        author__following__user=request.user
+    ).defer('text')
     page_obj = paginator(post_list, request)
     context = {
         'page_obj': page_obj
@@ -134,14 +296,14 @@ def profile_follow(request, username):
     # Подписаться на автора
     author = get_object_or_404(User, username=username)
     user = request.user
-    following = (
-        Follow.objects.filter(
-            user=request.user).filter(author=author).exists()
-    )
-    if request.user.is_authenticated and (
-        request.user != author and following is False
-    ):
-        Follow.objects.get_or_create(user=user, author=author)
+    if request.user.is_authenticated and request.user != author:
+        call_with_retry(
+            lambda: Follow.objects.get_or_create(user=user, author=author)
+        )
+        expire_page(
+            reverse('posts:profile', args=[author.username]), 'profile_page'
+        )
+        purge('author-%d' % author.id)
         return redirect('posts:profile', username=author)
     return redirect('users:login')
 
@@ -151,5 +313,25 @@ def profile_unfollow(request, username):
     # Дизлайк, отписка
     author = get_object_or_404(User, username=username)
     user = request.user
-    Follow.objects.filter(user=user, author=author).delete()
+    call_with_retry(
+        lambda: Follow.objects.filter(user=user, author=author).delete()
+    )
+    expire_page(
+        reverse('posts:profile', args=[author.username]), 'profile_page'
+    )
+    purge('author-%d' % author.id)
     return redirect('posts:profile', username=author)
+
+
+def export(request, dataset, fmt):
+    """Потоковая выгрузка для персонала (через admin_view), см. export.py."""
+    if dataset not in data_export.DATASETS or fmt not in data_export.FORMATS:
+        raise Http404
+    response = StreamingHttpResponse(
+        data_export.stream(dataset, fmt),
+        content_type=data_export.FORMATS[fmt],
+    )
+    response['Content-Disposition'] = (
+        'attachment; filename="%s.%s"' % (dataset, fmt)
+    )
+    return response
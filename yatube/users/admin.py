@@ -0,0 +1,17 @@
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
+
+from posts import deletion
+from posts.admin import BackgroundDeleteMixin, delete_in_background
+
+User = get_user_model()
+
+
+class BackgroundDeleteUserAdmin(BackgroundDeleteMixin, UserAdmin):
+    actions = [delete_in_background(deletion.delete_user)]
+    background_delete = staticmethod(deletion.delete_user)
+
+
+admin.site.unregister(User)
+admin.site.register(User, BackgroundDeleteUserAdmin)
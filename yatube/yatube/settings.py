@@ -41,20 +41,26 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
-    'core',
+    'core.apps.CoreConfig',
     'about',
+    'api',
     'sorl.thumbnail',
     'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.timing.ServerTimingMiddleware',
+    'core.middleware.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.proxy.ProxyCacheMiddleware',
+    'core.middleware.replicas.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.profiler.ProfilerMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
@@ -88,9 +94,97 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'OPTIONS': {
+            # Сколько секунд писатель ждёт снятия блокировки
+            'timeout': 5,
+        },
     }
 }
 
+# PRAGMA для каждого подключения SQLite, см. core/sqlite.py. Профиль
+# базы выбирает переменная окружения YATUBE_DB_PROFILE: production
+# включает настройки ниже, иначе у SQLite настройки по умолчанию
+SQLITE_PRODUCTION_PRAGMAS = {
+    'journal_mode': 'wal',
+    # В режиме WAL normal не теряет целостность, только последние коммиты
+    # при отключении питания
+    'synchronous': 'normal',
+    # Отрицательное значение - в КиБ: 64 МБ кэша страниц
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'memory',
+}
+DB_PROFILE = os.environ.get('YATUBE_DB_PROFILE', 'default')
+SQLITE_PRAGMAS = (
+    SQLITE_PRODUCTION_PRAGMAS if DB_PROFILE == 'production' else {}
+)
+SQLITE_LOCK_RETRIES = 3
+SQLITE_LOCK_RETRY_DELAY = 0.05
+
+# Реплики только для чтения: псевдонимы из DATABASES, см. core/replicas.py
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+REPLICA_APPS = ('posts', 'auth')
+# Сколько секунд после записи посетитель читает из основной базы
+REPLICA_PIN_SECONDS = 10
+REPLICA_PIN_COOKIE = 'primary_until'
+# Запись в эти модели не закрепляет посетителя за основной базой
+REPLICA_PIN_EXEMPT = ('posts.postactivity',)
+
+# Сессия читается из общего кэша sessions, запись идёт и в кэш, и в базу
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'sessions'
+# Пользователь по id сессии тоже берётся из кэша sessions, см. core/auth.py
+AUTHENTICATION_BACKENDS = ['core.auth.CachedModelBackend']
+USER_CACHE_TIMEOUT = 5 * 60
+
+# Рекомендации авторов, см. posts/recommendations.py
+RECOMMEND_LIMIT = 10
+RECOMMEND_FOF_WEIGHT = 1.0
+RECOMMEND_COFOLLOW_WEIGHT = 1.0
+RECOMMEND_MAX_FANOUT = 200
+
+# Популярное, см. posts/trending.py
+TRENDING_BUCKET_SECONDS = 60 * 60
+TRENDING_WINDOW_BUCKETS = 24
+TRENDING_DECAY = 0.8
+TRENDING_COMMENT_WEIGHT = 5
+TRENDING_VIEW_WEIGHT = 1
+TRENDING_SIZE = 50
+TRENDING_REFRESH = 60
+
+# Просмотры постов копятся в памяти процесса и пишутся в базу пачкой раз
+# в VIEW_FLUSH_INTERVAL секунд (таймер, см. wsgi.py) или при
+# VIEW_BUFFER_MAX_POSTS постах в буфере. Столько же просмотров процесс
+# теряет при падении; при штатном выходе буфер сбрасывается.
+VIEW_FLUSH_INTERVAL = 10
+VIEW_BUFFER_MAX_POSTS = 1000
+
+# Фоновые задачи (core/jobs.py, manage.py worker): сколько одновременно,
+# как часто проверять пустую очередь, через сколько секунд без отчёта
+# задачу можно отдать другому воркеру, сколько попыток и пауза перед
+# первым повтором (дальше растёт вдвое), сколько хранить выполненные.
+JOB_CONCURRENCY = 4
+JOB_POLL_INTERVAL = 1
+JOB_VISIBILITY_TIMEOUT = 300
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = 10
+JOB_KEEP_SECONDS = 7 * 24 * 60 * 60
+
+# Фоновое удаление (posts/deletion.py): строк в одной транзакции и
+# сколько секунд работает одна задача, прежде чем передать дело следующей
+PURGE_BATCH_SIZE = 500
+PURGE_JOB_SECONDS = 60
+
+# Выгрузка (manage.py export, /admin/export/): строк за одно чтение из базы
+EXPORT_CHUNK_SIZE = 2000
+
+# Загрузка (manage.py import_posts): постов в одной транзакции
+IMPORT_BATCH_SIZE = 1000
+
+# На сколько строк разбит счётчик отметок «нравится» одного объекта
+LIKE_SHARDS = 16
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -138,9 +232,28 @@ LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
 #  подключаем движок filebased.EmailBackend
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма складываются в исходящие (core/mail.py) и уходят из фоновой
+# задачи через OUTBOX_BACKEND
+EMAIL_BACKEND = 'core.mail.OutboxBackend'
+OUTBOX_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+# Письма за столько секунд уходят одной задачей, пачками по
+# OUTBOX_BATCH_SIZE через одно соединение
+OUTBOX_BATCH_DELAY = 5
+OUTBOX_BATCH_SIZE = 100
+# Попытки отправки, пауза перед первым повтором (дальше вдвое больше)
+# и на сколько секунд отправитель забирает письма себе
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_DELAY = 60
+OUTBOX_LOCK_SECONDS = 300
+
+# Письма подписчикам о новых постах: не чаще раза в DIGEST_INTERVAL
+# секунд, в письме не больше DIGEST_MAX_POSTS постов
+DIGEST_INTERVAL = 60 * 60
+DIGEST_MAX_POSTS = 20
+# Адрес сайта для ссылок в письмах
+SITE_URL = 'http://127.0.0.1:8000'
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
@@ -150,9 +263,59 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    # Общий для всех процессов кэш сессий и пользователей: выход, смена
+    # пароля или блокировка в одном процессе сбрасывают запись для всех.
+    # Файлы, а не база: чтение из кэша не должно стоить запроса к БД.
+    # Для нескольких серверов - memcached или Redis на том же алиасе
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'sessions'),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+# Время жизни общего (один на всех посетителей) рендера страниц, секунды.
+# 0 - страница не кэшируется.
+PAGE_CACHE_TIMEOUTS = {
+    'index_page': 1,
+    'group_page': 0,
+    'profile_page': 0,
+    'post_page': 0,
 }
 
+# Кэширующий обратный прокси: сколько секунд он хранит анонимные страницы
+# и куда отправлять PURGE-запросы с Surrogate-Key (None - не отправлять).
+PROXY_CACHE_MAX_AGE = 600
+PROXY_PURGE_URL = None
+PROXY_PURGE_TIMEOUT = 2
+
+# sorl-thumbnail с учётом времени работы для Server-Timing
+THUMBNAIL_BACKEND = 'core.timing.TimedThumbnailBackend'
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
+
+# Журнал медленных запросов (None - выключен), размер файла и число копий
+SLOW_QUERY_THRESHOLD_MS = 100
+SLOW_QUERY_LOG = os.path.join(BASE_DIR, 'logs', 'slow_queries.jsonl')
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUP_COUNT = 5
+
+# Профилирование запросов по токену сотрудника: каталог профилей,
+# срок жизни токена и период сэмплирования стеков, секунды
+PROFILER_DIR = os.path.join(BASE_DIR, 'profiles')
+PROFILER_TOKEN_MAX_AGE = 60 * 60
+PROFILER_SAMPLE_INTERVAL = 0.001
+
+# Метрики Prometheus: файлы процессов и период их обновления, секунды.
+# /metrics отдаётся сотрудникам и по заголовку Authorization: Bearer
+# METRICS_TOKEN (None - только сотрудникам): за прокси все запросы
+# приходят с 127.0.0.1, и проверка адреса ничего не защищает
+METRICS_DIR = os.path.join(BASE_DIR, 'metrics')
+METRICS_FLUSH_INTERVAL = 5
+METRICS_TOKEN = None
+
+# manage.py test пишет метрики во временный каталог, а не в METRICS_DIR
+TEST_RUNNER = 'core.test_runner.TestRunner'
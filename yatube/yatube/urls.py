@@ -3,6 +3,9 @@ from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import metrics, profile_download, profiles
+from posts.views import export
+
 handler404 = 'core.views.page_not_found'
 handler500 = 'core.views.server_error'
 handler403 = 'core.views.permission_denied'
@@ -12,8 +15,25 @@ urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
+    path(
+        'admin/profiles/',
+        admin.site.admin_view(profiles),
+        name='profiles'
+    ),
+    path(
+        'admin/profiles/<str:name>.<str:extension>',
+        admin.site.admin_view(profile_download),
+        name='profile_download'
+    ),
+    path(
+        'admin/export/<str:dataset>.<str:fmt>',
+        admin.site.admin_view(export),
+        name='export'
+    ),
     path('admin/', admin.site.urls),
     path('about/', include('about.urls', namespace='about')),
+    path('api/v1/', include('api.urls', namespace='api')),
+    path('metrics', metrics, name='metrics'),
 ]
 
 if settings.DEBUG:
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Буфер просмотров сбрасывается и в простое, и при выходе процесса
+from posts import view_counts  # noqa: E402
+
+view_counts.start_flusher()